@@ -0,0 +1,363 @@
+import datetime
+import threading
+
+import numpy as np
+
+import database
+
+# In-memory earnings statistics over every commission, archived ones included
+# (see database.archive_completed), so history doesn't drop out of the totals.
+#
+# The engine keeps the columns the statistics need in compact NumPy arrays:
+# prices as float64 (NaN when missing), dates as int32 days since 1970-01-01
+# (NO_DATE when missing) and status, type and client as small integer codes.
+# A few derived columns are stored beside them (income, income month,
+# turnaround, open deadline) and are zeroed for rows that don't count, so
+# every statistic is a whole-array bincount or sum with no filtering copies.
+#
+# refresh() brings the arrays up to date from the database change log: after
+# the first load only the rows changed since the last call are read and
+# patched in place.
+#
+#   engine = analytics.get_engine()
+#   engine.refresh()
+#   engine.income_by_month()       # [("2025-05", 1240.0), ...]
+#   engine.report()                # refresh and every statistic at once, for the dashboard
+
+NO_DATE = np.iinfo(np.int32).min
+NOT_DUE = np.iinfo(np.int32).max
+COMPLETED = "Completed"
+UNTYPED = "Other"   # same label get_income_by_type uses for commissions without a type
+PERCENTILES = (10, 25, 50, 75, 90)
+TREND_WINDOW = 3    # months in the rolling revenue average
+# deleted rows are only removed from the arrays once they are this share of them
+COMPACT_RATIO = 0.25
+MIN_CAPACITY = 1024
+LOAD_CHUNK = 50000
+
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+# Categories hands out integer codes for the distinct values of a text column
+class Categories:
+    def __init__(self, labels=()):
+        self.labels = []
+        self.codes = {}
+        for label in labels:
+            self.code(label)
+
+    def code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class AnalyticsEngine:
+    FIELDS = (
+        ("ids", np.int64), ("price", np.float64), ("deadline", np.int32), ("created", np.int32),
+        ("completed", np.int32), ("status", np.int8), ("type", np.int16), ("client", np.int32),
+        ("alive", np.bool_),
+        # derived; all zero (or NOT_DUE) for deleted rows
+        ("income", np.float64),       # price of completed commissions, else 0
+        ("month", np.int32),          # 1 + months since 1970-01 the income is dated in, 0 if undated
+        ("turnaround", np.int32),     # days from created to completed, 0 if unknown
+        ("has_turnaround", np.bool_),
+        ("due", np.int32),            # deadline of unfinished commissions, else NOT_DUE
+    )
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._db_name = None
+        self._revision = None
+        self._days = {}
+        self._reset(0)
+
+    def _reset(self, capacity):
+        capacity = max(capacity, MIN_CAPACITY)
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.size = 0
+        self.dead = 0
+        # prices of the live rows, kept sorted so percentiles are a lookup
+        self.sorted_prices = np.zeros(0)
+        self.statuses = Categories(("Not Started", "In Progress", COMPLETED))
+        self.types = Categories()
+        self.clients = Categories()
+
+    # _day turns a YYYY-MM-DD string into days since the epoch. Dates repeat a
+    # lot, so each distinct string is only parsed once.
+    def _day(self, text):
+        if not text:
+            return NO_DATE
+        day = self._days.get(text)
+        if day is None:
+            try:
+                day = datetime.date.fromisoformat(text).toordinal() - _EPOCH
+            except (TypeError, ValueError):
+                day = NO_DATE
+            self._days[text] = day
+        return day
+
+    def _encode(self, rows):
+        day = self._day
+        n = len(rows)
+        ids, clients, types, prices, deadlines, statuses, created, completed = zip(*rows) if n else ([],) * 8
+        columns = {
+            "ids": np.fromiter(ids, np.int64, n),
+            "price": np.fromiter((np.nan if p is None else p for p in prices), np.float64, n),
+            "deadline": np.fromiter(map(day, deadlines), np.int32, n),
+            "created": np.fromiter(map(day, created), np.int32, n),
+            "completed": np.fromiter(map(day, completed), np.int32, n),
+            "status": np.fromiter(map(self.statuses.code, (s or "" for s in statuses)), np.int8, n),
+            "type": np.fromiter(map(self.types.code, (t or UNTYPED for t in types)), np.int16, n),
+            "client": np.fromiter(map(self.clients.code, clients), np.int32, n),
+            "alive": np.ones(n, np.bool_),
+        }
+
+        done = columns["status"] == self.statuses.codes[COMPLETED]
+        columns["income"] = np.where(done, np.nan_to_num(columns["price"]), 0.0)
+        # income is dated by completion day where known, else by deadline
+        dated = np.where(columns["completed"] != NO_DATE, columns["completed"], columns["deadline"])
+        months = dated.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + 1
+        columns["month"] = np.where(done & (dated != NO_DATE), np.maximum(months, 1), 0)
+        has_turnaround = done & (columns["created"] != NO_DATE) & (columns["completed"] != NO_DATE)
+        columns["turnaround"] = np.where(has_turnaround, columns["completed"] - columns["created"], 0)
+        columns["has_turnaround"] = has_turnaround
+        columns["due"] = np.where(~done & (columns["deadline"] != NO_DATE), columns["deadline"], NOT_DUE)
+        return columns
+
+    def _append(self, columns):
+        n = len(columns["ids"])
+        if self.size + n > len(self.ids):
+            capacity = max(2 * len(self.ids), self.size + n)
+            for name, dtype in self.FIELDS:
+                grown = np.zeros(capacity, dtype=dtype)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+        for name, _ in self.FIELDS:
+            getattr(self, name)[self.size:self.size + n] = columns[name]
+        self.size += n
+
+    # _kill tombstones the rows at positions so they drop out of every statistic
+    def _kill(self, positions):
+        self.alive[positions] = False
+        self.income[positions] = 0.0
+        self.month[positions] = 0
+        self.turnaround[positions] = 0
+        self.has_turnaround[positions] = False
+        self.due[positions] = NOT_DUE
+        self.dead += len(positions)
+
+    def _compact(self):
+        keep = self.alive[:self.size]
+        count = int(keep.sum())
+        for name, _ in self.FIELDS:
+            column = getattr(self, name)
+            column[:count] = column[:self.size][keep]
+        self.size = count
+        self.dead = 0
+
+    # _update_sorted_prices removes the `removed` prices from sorted_prices and
+    # inserts the `added` ones, without re-sorting everything
+    def _update_sorted_prices(self, removed, added):
+        removed = np.sort(removed[~np.isnan(removed)])
+        if len(removed):
+            positions = np.searchsorted(self.sorted_prices, removed)
+            # equal prices each take the next slot of their run
+            positions += np.arange(len(removed)) - np.searchsorted(removed, removed)
+            self.sorted_prices = np.delete(self.sorted_prices, positions)
+        added = np.sort(added[~np.isnan(added)])
+        if len(added):
+            self.sorted_prices = np.insert(self.sorted_prices, np.searchsorted(self.sorted_prices, added), added)
+
+    # reload reads every commission from scratch
+    def reload(self):
+        with self._lock:
+            # the revision is taken first, so anything written while the rows are
+            # being read is applied again by the next refresh
+            revision = database.get_revision()
+            self._reset(database.count_commissions("All", include_archived=True))
+            batch = []
+            for row in database.iter_analytics_rows(include_archived=True):
+                batch.append(row)
+                if len(batch) == LOAD_CHUNK:
+                    self._append(self._encode(batch))
+                    batch = []
+            if batch:
+                self._append(self._encode(batch))
+            prices = self.price[:self.size]
+            self.sorted_prices = np.sort(prices[~np.isnan(prices)])
+            self._db_name = database.DB_NAME
+            self._revision = revision
+
+    # refresh applies the changes made since the last refresh (or reloads
+    # everything if the change log no longer reaches back that far). Returns
+    # True if anything changed.
+    def refresh(self):
+        with self._lock:
+            if self._revision is None or self._db_name != database.DB_NAME:
+                self.reload()
+                return True
+            result = database.get_changes_since(self._revision)
+            if result is None:
+                self.reload()
+                return True
+            revision, changed, deleted = result
+            if changed or deleted:
+                if not self._apply([row.id for row in changed] + deleted):
+                    self.reload()
+                    return True
+            self._revision = revision
+            return bool(changed or deleted)
+
+    def _positions(self, ids):
+        # positions of the loaded rows with these ids, and which ids were found
+        loaded = self.ids[:self.size]
+        positions = np.searchsorted(loaded, ids)
+        found = positions < self.size
+        found[found] = loaded[positions[found]] == ids[found]
+        return positions, found
+
+    # _apply re-reads the commissions in ids and patches them in place; ids no
+    # longer found anywhere are dropped. A commission deleted from the active
+    # table because it was archived is found in the archive and stays. Returns
+    # False when patching isn't possible (a new id lower than ones already loaded).
+    def _apply(self, ids):
+        columns = self._encode(sorted(database.get_analytics_rows(ids, include_archived=True)))
+        positions, found = self._positions(columns["ids"])
+        if not found.all() and self.size and columns["ids"][~found][0] <= self.ids[self.size - 1]:
+            return False
+
+        deleted_ids = sorted(set(ids) - set(columns["ids"].tolist()))
+        gone, gone_found = self._positions(np.asarray(deleted_ids, np.int64))
+        gone = gone[gone_found]
+        gone = gone[self.alive[gone]]
+        replaced = positions[found]
+        replaced_alive = replaced[self.alive[replaced]]
+        self._update_sorted_prices(
+            np.concatenate([self.price[gone], self.price[replaced_alive]]), columns["price"]
+        )
+
+        self._kill(gone)
+        self.dead -= len(replaced) - len(replaced_alive)
+        for name, _ in self.FIELDS:
+            getattr(self, name)[replaced] = columns[name][found]
+        self._append({name: column[~found] for name, column in columns.items()})
+
+        if self.dead > COMPACT_RATIO * self.size:
+            self._compact()
+        return True
+
+    @staticmethod
+    def _ranked(totals, labels):
+        order = np.argsort(-totals, kind="stable")
+        return [(labels[i], float(totals[i])) for i in order if totals[i] > 0]
+
+    # _monthly returns (first_month, totals) for completed income by month.
+    # Months without income in between are included as 0.
+    def _monthly(self):
+        totals = np.bincount(self.month[:self.size], weights=self.income[:self.size])[1:]
+        nonzero = np.flatnonzero(totals)
+        if not len(nonzero):
+            return 0, np.zeros(0)
+        return int(nonzero[0]), totals[nonzero[0]:nonzero[-1] + 1]
+
+    @staticmethod
+    def _month_label(month):
+        return str(np.datetime64(int(month), "M"))
+
+    def income_by_month(self):
+        with self._lock:
+            first, totals = self._monthly()
+        return [(self._month_label(first + i), float(v)) for i, v in enumerate(totals)]
+
+    def income_by_type(self):
+        with self._lock:
+            totals = np.bincount(self.type[:self.size], weights=self.income[:self.size], minlength=len(self.types))
+            return self._ranked(totals, self.types.labels)
+
+    def income_by_client(self, top=10):
+        with self._lock:
+            totals = np.bincount(self.client[:self.size], weights=self.income[:self.size], minlength=len(self.clients))
+            if top is not None and len(totals) > top:
+                best = np.argpartition(-totals, top)[:top]
+                return self._ranked(totals[best], [self.clients.labels[i] for i in best])
+            return self._ranked(totals, self.clients.labels)
+
+    # price_percentiles returns {percentile: price} over every priced commission
+    def price_percentiles(self, percentiles=PERCENTILES):
+        with self._lock:
+            prices = self.sorted_prices
+            if not len(prices):
+                return {}
+            # linear interpolation between the closest ranks, like np.percentile
+            ranks = np.asarray(percentiles, np.float64) / 100 * (len(prices) - 1)
+            low = np.floor(ranks).astype(np.int64)
+            high = np.minimum(low + 1, len(prices) - 1)
+            values = prices[low] + (prices[high] - prices[low]) * (ranks - low)
+            return {p: float(v) for p, v in zip(percentiles, values)}
+
+    # average_turnaround returns the mean days from creation to completion over
+    # completed commissions whose dates are both known, or None if there are none
+    def average_turnaround(self):
+        with self._lock:
+            count = int(np.count_nonzero(self.has_turnaround[:self.size]))
+            if not count:
+                return None
+            return float(self.turnaround[:self.size].sum(dtype=np.int64)) / count
+
+    # overdue_rate returns (overdue, open_with_deadline, rate): how many unfinished
+    # commissions with a deadline are past it as of today
+    def overdue_rate(self, today=None):
+        today = (today or datetime.date.today()).toordinal() - _EPOCH
+        with self._lock:
+            due = self.due[:self.size]
+            total = int(np.count_nonzero(due != NOT_DUE))
+            overdue = int(np.count_nonzero(due < today))
+        return overdue, total, (overdue / total if total else 0.0)
+
+    # revenue_trend returns [(month, income, rolling_average), ...] where the
+    # rolling average covers the last `window` months
+    def revenue_trend(self, window=TREND_WINDOW):
+        with self._lock:
+            first, totals = self._monthly()
+        if not len(totals):
+            return []
+        sums = np.cumsum(totals)
+        rolling = sums.copy()
+        rolling[window:] -= sums[:-window]
+        rolling /= np.minimum(np.arange(1, len(totals) + 1), window)
+        return [(self._month_label(first + i), float(v), float(r)) for i, (v, r) in enumerate(zip(totals, rolling))]
+
+    # report refreshes the arrays and returns every statistic in one dict
+    def report(self):
+        with self._lock:
+            self.refresh()
+            return {
+                "income_by_month": self.income_by_month(),
+                "income_by_type": self.income_by_type(),
+                "income_by_client": self.income_by_client(),
+                "price_percentiles": self.price_percentiles(),
+                "average_turnaround": self.average_turnaround(),
+                "overdue": self.overdue_rate(),
+                "revenue_trend": self.revenue_trend(),
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+# get_engine returns the shared AnalyticsEngine, so the arrays are only
+# loaded once per process
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AnalyticsEngine()
+        return _engine
@@ -0,0 +1,273 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import database
+
+# Online backups of the commissions database.
+#
+# snapshot() copies the live database with SQLite's backup API while the app
+# keeps running. The copy is made PAGES_PER_STEP pages at a time from a read
+# transaction on its own connection: in WAL mode that never blocks writers,
+# and because the source snapshot is fixed for the whole copy, writes made
+# meanwhile don't force the backup to start over. A passive checkpoint first
+# folds the WAL into the main file (without waiting on anyone) so the copy
+# mostly reads the main file.
+#
+# Each snapshot is written to a temporary file, switched out of WAL mode so it
+# is a single self-contained file, checked with PRAGMA integrity_check and only
+# then renamed to backups/<name>-YYYYmmdd-HHMMSS.db. The archive file (see
+# database.archive_completed) is copied alongside under the same timestamp.
+# Only the newest KEEP_SNAPSHOTS are kept.
+#
+#   backup.snapshot()                          # one snapshot now, returns its path
+#   scheduler = backup.BackupScheduler(3600)   # one every hour on a background thread
+#   backup.restore(backup.list_snapshots()[-1])
+#
+# restore() verifies a snapshot and copies it back over the live database (and
+# archive) as a single backup step per file, which SQLite applies as one write
+# transaction: other connections (and other processes) see either the old data
+# or the restored data, never a mix.
+
+BACKUP_DIR = "backups"
+KEEP_SNAPSHOTS = 10
+PAGES_PER_STEP = 256
+# pause between steps, to leave disk bandwidth for the app on slow disks
+STEP_PAUSE_S = 0.0
+BACKUP_INTERVAL_S = 3600
+STAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class BackupError(Exception):
+    pass
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _snapshot_name(path, stamp):
+    return f"{_stem(path)}-{stamp}.db"
+
+
+# list_snapshots returns the snapshots of DB_NAME in backup_dir, oldest first
+def list_snapshots(backup_dir=None):
+    backup_dir = backup_dir or BACKUP_DIR
+    prefix = _stem(database.DB_NAME) + "-"
+    try:
+        names = os.listdir(backup_dir)
+    except FileNotFoundError:
+        return []
+    stamps = []
+    for name in names:
+        stamp = name[len(prefix):-3] if name.startswith(prefix) and name.endswith(".db") else None
+        try:
+            datetime.datetime.strptime(stamp or "", STAMP_FORMAT)
+        except ValueError:
+            continue
+        stamps.append(stamp)
+    return [os.path.join(backup_dir, prefix + stamp + ".db") for stamp in sorted(stamps)]
+
+
+# verify returns PRAGMA integrity_check's messages for a database file
+# (["ok"] when it is sound)
+def verify(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+
+
+def _copy(source_path, dest_path, pages, pause_s, progress):
+    source = sqlite3.connect(source_path, timeout=database.PRAGMAS["busy_timeout"] / 1000)
+    try:
+        source.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        # hold one read transaction for the whole copy, so it sees a single
+        # snapshot of the data however many steps it takes
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        def step(status, remaining, total):
+            if progress is not None:
+                progress(total - remaining, total)
+            if pause_s:
+                time.sleep(pause_s)
+
+        dest = sqlite3.connect(dest_path)
+        try:
+            source.backup(dest, pages=pages, progress=step)
+            # a backup of a WAL database is marked WAL too; make it a plain single file
+            dest.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dest.close()
+    finally:
+        source.close()
+
+    problems = verify(dest_path)
+    if problems != ["ok"]:
+        os.remove(dest_path)
+        raise BackupError(f"Snapshot of {source_path} failed integrity_check: {'; '.join(problems[:5])}")
+
+
+# snapshot backs up DB_NAME (and its archive, if there is one) into backup_dir
+# and returns the new snapshot's path. progress(pages_done, pages_total) is
+# called after each step.
+def snapshot(backup_dir=None, keep=None, pages=PAGES_PER_STEP, pause_s=STEP_PAUSE_S, progress=None):
+    backup_dir = backup_dir or BACKUP_DIR
+    os.makedirs(backup_dir, exist_ok=True)
+    # make sure the file exists and its schema is current before copying it
+    database.get_connection()
+
+    stamp = datetime.datetime.now().strftime(STAMP_FORMAT)
+    while os.path.exists(os.path.join(backup_dir, _snapshot_name(database.DB_NAME, stamp))):
+        # two snapshots within a second; wait for the next stamp
+        time.sleep(0.2)
+        stamp = datetime.datetime.now().strftime(STAMP_FORMAT)
+
+    sources = [database.DB_NAME]
+    if os.path.exists(database.archive_path()):
+        sources.append(database.archive_path())
+
+    # the archive goes first, so a snapshot listed by list_snapshots is always complete
+    written = []
+    try:
+        for source_path in reversed(sources):
+            final = os.path.join(backup_dir, _snapshot_name(source_path, stamp))
+            partial = final + ".partial"
+            _copy(source_path, partial, pages, pause_s, progress)
+            os.replace(partial, final)
+            written.append(final)
+    except BaseException:
+        for path in written:
+            os.remove(path)
+        raise
+
+    rotate(backup_dir, KEEP_SNAPSHOTS if keep is None else keep)
+    return written[-1]
+
+
+# rotate deletes all but the newest `keep` snapshots (and their archive copies)
+def rotate(backup_dir=None, keep=KEEP_SNAPSHOTS):
+    backup_dir = backup_dir or BACKUP_DIR
+    snapshots = list_snapshots(backup_dir)
+    for path in snapshots[:max(0, len(snapshots) - keep)]:
+        archive = _archive_snapshot(path)
+        os.remove(path)
+        if os.path.exists(archive):
+            os.remove(archive)
+
+
+def _archive_snapshot(path):
+    stamp = _stem(path)[len(_stem(database.DB_NAME)) + 1:]
+    return os.path.join(os.path.dirname(path), _snapshot_name(database.archive_path(), stamp))
+
+
+# restore replaces the live database and its archive with a snapshot. A
+# snapshot taken before anything was archived has no archive copy; the live
+# archive is then emptied, so the two files always come from the same moment.
+#
+# Both replacements are staged (copied next to the live files and verified)
+# before either is swapped in. Each copy back is one transaction; if the main
+# one fails, the archive is put back as it was. Afterwards the schema is
+# brought up to date and the change log restarted, so caches, the analytics
+# engine and open views all reload.
+def restore(path):
+    problems = verify(path)
+    if problems != ["ok"]:
+        raise BackupError(f"{path} failed integrity_check: {'; '.join(problems[:5])}")
+    archive = _archive_snapshot(path)
+    if os.path.exists(archive) and verify(archive) != ["ok"]:
+        raise BackupError(f"{archive} failed integrity_check")
+
+    live_archive = database.archive_path()
+    staged_main = database.DB_NAME + ".restore"
+    staged_archive = live_archive + ".restore"
+    previous_archive = live_archive + ".previous"
+    try:
+        _copy(path, staged_main, -1, 0, None)
+        if os.path.exists(archive):
+            _copy(archive, staged_archive, -1, 0, None)
+        elif os.path.exists(live_archive):
+            _empty_archive(staged_archive)
+        else:
+            staged_archive = None
+
+        if staged_archive is not None:
+            if os.path.exists(live_archive):
+                _copy(live_archive, previous_archive, -1, 0, None)
+            _copy_back(staged_archive, live_archive)
+        try:
+            # read just before the copy, which holds the write lock while it
+            # runs, so few writes (if any) can get a revision past it;
+            # restart_change_log leaves room for those
+            last_rev = database.get_revision()
+            _copy_back(staged_main, database.DB_NAME)
+        except BaseException:
+            if os.path.exists(previous_archive):
+                _copy_back(previous_archive, live_archive)
+            raise
+    finally:
+        for staged in (staged_main, staged_archive, previous_archive):
+            if staged is not None and os.path.exists(staged):
+                os.remove(staged)
+
+    database.initialize_database()
+    database.restart_change_log(last_rev)
+
+
+def _copy_back(snapshot_path, live_path):
+    source = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+    dest = sqlite3.connect(live_path, timeout=database.PRAGMAS["busy_timeout"] / 1000)
+    try:
+        # pages=-1: everything in one step, i.e. one atomic write transaction
+        source.backup(dest, pages=-1)
+        dest.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    finally:
+        dest.close()
+        source.close()
+
+
+# _empty_archive writes an archive file with the archive's tables and no rows
+def _empty_archive(dest_path):
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("ATTACH DATABASE ? AS archive", (dest_path,))
+        for statement in database.ARCHIVE_SQL:
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# BackupScheduler takes a snapshot every interval_s seconds on a background
+# thread until stop() is called. A failed snapshot is recorded in last_error
+# and retried at the next interval.
+class BackupScheduler:
+    def __init__(self, interval_s=BACKUP_INTERVAL_S, backup_dir=None, keep=None, run_now=False):
+        self.interval_s = interval_s
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.last_snapshot = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._run_now = run_now
+        self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        wait = 0 if self._run_now else self.interval_s
+        while not self._stop.wait(wait):
+            try:
+                self.last_snapshot = snapshot(self.backup_dir, self.keep)
+                self.last_error = None
+            except (sqlite3.Error, OSError, BackupError) as e:
+                self.last_error = e
+            wait = self.interval_s
+
+    # stop lets a snapshot in progress finish, then ends the thread
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,2 @@
+# Benchmarks for the Art Commission Tracker. Run a module with python -m, e.g.
+#   python -m benchmarks.startup
@@ -0,0 +1,125 @@
+# Seeded synthetic data for benchmarks. The same (rows, seed) always produces
+# the same commissions, so timings from different commits are comparable.
+import datetime
+import itertools
+import os
+import random
+import shutil
+
+import database
+
+TYPE_WEIGHTS = {
+    "Portrait": 22, "Half Body": 20, "Full Body": 16, "Chibi": 14,
+    "Emote": 18, "Environment": 5, "Other": 5,
+}
+# rough base prices; actual prices are log-normally spread around these
+TYPE_BASE_PRICE = {
+    "Portrait": 45, "Half Body": 60, "Full Body": 90, "Chibi": 30,
+    "Emote": 20, "Environment": 140, "Other": 50,
+}
+FIRST_NAMES = [
+    "Alex", "Bethany", "Jordan", "Chloe", "Evelyn", "Marcus", "Nina", "Daniel", "Sophia", "Ryan",
+    "Maya", "Luis", "Priya", "Kenji", "Amara", "Oscar", "Hana", "Mateo", "Zoe", "Idris",
+]
+LAST_NAMES = [
+    "Rivera", "Cole", "Lee", "Martinez", "Brooks", "Thompson", "Patel", "Kim", "Nguyen", "O'Connor",
+    "Johnson", "Fernandez", "Sato", "Okafor", "Silva", "Novak", "Haddad", "Larsen", "Moreau", "Chen",
+]
+TITLE_WORDS = [
+    "OC", "Fantasy", "Warrior", "Portrait", "Emote", "Pack", "Chibi", "Couple", "Sticker", "Scene",
+    "Twitch", "D&D", "Character", "Illustration", "Landscape", "Pet", "Reference", "Sheet", "Icon", "Banner",
+]
+NOTE_WORDS = [
+    "soft", "shading", "pastel", "background", "armor", "glowing", "weapon", "line", "art", "flat",
+    "colors", "warm", "lighting", "transparent", "neon", "cyberpunk", "outfit", "custom", "expressive",
+    "semi-realistic", "sketch", "watercolor", "cel", "rim", "light", "dynamic", "pose", "smile",
+]
+
+# deadlines are spread around this fixed date, not today, to keep runs reproducible
+ANCHOR_DATE = datetime.date(2025, 6, 1)
+
+
+# generate_rows yields n rows in add_commissions_many format
+def generate_rows(n, seed=0):
+    rng = random.Random(seed)
+    # a few regulars account for most commissions, like a real client list
+    clients = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(max(50, n // 40))]
+    client_cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(clients))))
+    types = list(TYPE_WEIGHTS)
+    type_weights = list(TYPE_WEIGHTS.values())
+
+    for _ in range(n):
+        client = rng.choices(clients, cum_weights=client_cum_weights)[0]
+        type_ = rng.choices(types, type_weights)[0]
+        title = " ".join(rng.sample(TITLE_WORDS, rng.randint(2, 4)))
+        price = round(TYPE_BASE_PRICE[type_] * rng.lognormvariate(0, 0.35), 2)
+
+        offset = int(rng.gauss(-60, 150))
+        if rng.random() < 0.08:
+            deadline = None
+        else:
+            deadline = (ANCHOR_DATE + datetime.timedelta(days=offset)).isoformat()
+
+        # past deadlines are mostly finished, future ones mostly not
+        if offset < -30:
+            status = rng.choices(["Completed", "In Progress", "Not Started"], [90, 7, 3])[0]
+        elif offset < 30:
+            status = rng.choices(["Completed", "In Progress", "Not Started"], [35, 45, 20])[0]
+        else:
+            status = rng.choices(["Completed", "In Progress", "Not Started"], [5, 30, 65])[0]
+
+        notes = " ".join(rng.choices(NOTE_WORDS, k=rng.randint(0, 30))).capitalize()
+        yield client, title, type_, price, deadline, status, notes
+
+
+# backdate replaces the creation and completion dates the triggers stamped with
+# today: commissions are created 10-59 days before their deadline and finished
+# up to 8 days before it. The offsets come from the id, so they are reproducible.
+def backdate():
+    with database.transaction() as conn:
+        conn.execute(f"""
+            UPDATE commission_dates AS d
+            SET created_at = date(c.base, '-' || (10 + d.id * 7919 % 50) || ' days'),
+                completed_at = CASE WHEN d.completed_at IS NOT NULL
+                                    THEN date(c.base, '-' || (d.id * 104729 % 9) || ' days') END
+            FROM (SELECT id, COALESCE(deadline, '{ANCHOR_DATE.isoformat()}') AS base
+                  FROM commissions) AS c
+            WHERE c.id = d.id
+        """)
+
+
+# populate fills db_path (which should not exist yet) with n generated rows
+def populate(db_path, n, seed=0, chunk=10000):
+    previous = database.DB_NAME
+    database.DB_NAME = db_path
+    try:
+        database.initialize_database()
+        batch = []
+        for row in generate_rows(n, seed):
+            batch.append(row)
+            if len(batch) >= chunk:
+                database.add_commissions_many(batch)
+                batch = []
+        if batch:
+            database.add_commissions_many(batch)
+        backdate()
+        database.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        database.close_connections()
+        database.DB_NAME = previous
+
+
+# prepared_database returns a fresh copy of an n-row database at dest. The
+# generated original is kept in data_dir, so the slow fill only happens once
+# per (n, seed, schema version).
+def prepared_database(n, seed, data_dir, dest):
+    os.makedirs(data_dir, exist_ok=True)
+    template = os.path.join(data_dir, f"commissions_{n}_seed{seed}_v{database.SCHEMA_VERSION}.db")
+    if not os.path.exists(template):
+        partial = template + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        populate(partial, n, seed)
+        os.replace(partial, template)
+    shutil.copyfile(template, dest)
+    return dest
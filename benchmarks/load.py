@@ -0,0 +1,188 @@
+# Load test for server.py: starts the server in a subprocess on a seeded
+# synthetic database, then drives it from localhost with an increasing number
+# of concurrent keep-alive clients and reports throughput and latency.
+#
+#   python -m benchmarks.load --rows 100000 --concurrency 1 4 16 64 --duration 10
+#
+# Each client loops over a mixed workload: mostly list pages and single
+# commission reads, some revalidations with If-None-Match (which should come
+# back 304), summaries, and a share of writes (PATCH and mark-complete).
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import datagen
+from benchmarks.run import DEFAULT_DATA_DIR
+
+DEFAULT_CONCURRENCY = [1, 4, 16, 64]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (weight, kind) of each request type in the mix
+WORKLOAD = [
+    (35, "list"),
+    (25, "get"),
+    (15, "revalidate"),
+    (10, "summary"),
+    (5, "income"),
+    (7, "patch"),
+    (3, "complete"),
+]
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None, headers=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(data)}"]
+        head += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get("content-length") or 0)
+        payload = await self.reader.readexactly(length) if length else b""
+        return status, response_headers, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def worker(client, rng, n, deadline, latencies, counts, etags):
+    kinds = [kind for _, kind in WORKLOAD]
+    weights = [weight for weight, _ in WORKLOAD]
+    statuses = ["All", "Not Started", "In Progress", "Completed"]
+    sorts = ["deadline", "client", "price", "id"]
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        comm_id = rng.randint(1, n)
+        start = time.perf_counter()
+        if kind == "list":
+            status, _, _ = await client.request(
+                "GET", f"/commissions?status={rng.choice(statuses).replace(' ', '+')}"
+                       f"&sort={rng.choice(sorts)}&limit=50")
+        elif kind == "get":
+            status, headers, _ = await client.request("GET", f"/commissions/{comm_id}")
+            if "etag" in headers:
+                etags[comm_id % 256] = (comm_id, headers["etag"])
+        elif kind == "revalidate":
+            cached = etags.get(comm_id % 256)
+            if cached is None:
+                continue
+            status, _, _ = await client.request("GET", f"/commissions/{cached[0]}",
+                                                headers={"If-None-Match": cached[1]})
+        elif kind == "summary":
+            status, _, _ = await client.request("GET", "/summary")
+        elif kind == "income":
+            status, _, _ = await client.request("GET", "/income-by-type")
+        elif kind == "patch":
+            status, _, _ = await client.request("PATCH", f"/commissions/{comm_id}",
+                                                {"price": round(rng.uniform(10, 200), 2)})
+        else:
+            status, _, _ = await client.request("POST", f"/commissions/{comm_id}/complete")
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        counts[status] = counts.get(status, 0) + 1
+
+
+async def run_level(host, port, n, concurrency, duration, seed):
+    clients = [Client(host, port) for _ in range(concurrency)]
+    await asyncio.gather(*(c.connect() for c in clients))
+    latencies, counts, etags = {}, {}, {}
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(c, random.Random(seed * 1000 + i), n, deadline, latencies, counts, etags)
+        for i, c in enumerate(clients)
+    ))
+    elapsed = time.perf_counter() - start
+    for c in clients:
+        c.close()
+
+    everything = sorted(t for times in latencies.values() for t in times)
+    return {
+        "concurrency": concurrency,
+        "requests": len(everything),
+        "throughput_rps": len(everything) / elapsed,
+        "p50_ms": percentile(everything, 0.50) * 1000,
+        "p95_ms": percentile(everything, 0.95) * 1000,
+        "p99_ms": percentile(everything, 0.99) * 1000,
+        "status_counts": {str(k): v for k, v in sorted(counts.items())},
+        "by_kind_p50_ms": {kind: statistics.median(times) * 1000 for kind, times in sorted(latencies.items())},
+    }
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def start_server(db_path, readers):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--db", db_path, "--port", "0",
+         "--readers", str(readers)],
+        stdout=subprocess.PIPE, text=True, cwd=ROOT,
+    )
+    line = process.stdout.readline()
+    if not line.startswith("listening on http://"):
+        process.kill()
+        raise RuntimeError(f"server did not start: {line!r}")
+    host, port = line.strip().rsplit("/", 1)[1].rsplit(":", 1)
+    return process, host, int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test server.py on localhost.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = datagen.prepared_database(args.rows, args.seed, args.data_dir, os.path.join(tmp, "load.db"))
+        process, host, port = start_server(db_path, args.readers)
+        try:
+            print(f"{args.rows} rows, {args.readers} readers, {args.duration:g}s per level")
+            print(f"{'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_level(host, port, args.rows, concurrency, args.duration, args.seed))
+                results.append(result)
+                print(f"{concurrency:>8} {result['throughput_rps']:>9.1f} {result['p50_ms']:>8.2f} "
+                      f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}  {result['status_counts']}", flush=True)
+        finally:
+            process.terminate()
+            process.wait()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"rows": args.rows, "readers": args.readers, "levels": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
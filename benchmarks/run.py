@@ -0,0 +1,363 @@
+# Benchmark suite: times every public database.py function that reads or
+# writes commissions (all of them except NOT_BENCHMARKED below) and the Treeview
+# fill path (and the analytics engine, when numpy is installed) against seeded
+# synthetic databases, writes the results as JSON and optionally compares them
+# with a saved baseline.
+#
+#   python -m benchmarks.run --sizes 1000 100000 1000000 --out results.json
+#   python -m benchmarks.run --baseline results.json      # flags regressions
+#
+# Generated databases are kept in --data-dir (default benchmarks/.data) so
+# only the first run at a given size pays for filling them. Every run works
+# on a fresh copy, so the write benchmarks never change the saved data.
+import argparse
+import collections
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import database
+from benchmarks import datagen
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+# public database.py functions with no benchmark: connection and cache
+# plumbing, instrumentation, schema setup that runs once at start, query plan
+# helpers, and get_overdue / get_due_within, which run get_commissions_due_between
+# relative to today (it is timed directly, relative to the data's fixed date).
+# Anything else added to database.py needs a benchmark below.
+NOT_BENCHMARKED = {
+    "get_connection", "close_connections", "transaction",
+    "clear_cache", "get_cache_stats", "reset_cache_stats",
+    "validate_commission", "sort_key", "archive_path",
+    "enable_instrumentation", "disable_instrumentation", "instrumentation_enabled",
+    "get_metrics", "export_metrics",
+    "initialize_database", "migrate", "get_schema_version", "restart_change_log",
+    "enable_commission_stats", "disable_commission_stats", "stats_table_enabled",
+    "explain_query_plan", "get_commissions_plan",
+    "get_overdue", "get_due_within",
+}
+
+# a benchmark is repeated until it has run this long (or MAX_REPEATS times)
+MIN_TOTAL_S = 0.2
+MAX_REPEATS = 50
+# median slowdown, relative to the baseline, that counts as a regression
+DEFAULT_THRESHOLD = 0.20
+# differences smaller than this are timer noise, whatever the ratio
+MIN_DELTA_S = 0.00005
+
+
+def time_call(fn, repeats=None):
+    times = []
+    total = 0.0
+    while True:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+        if repeats is not None:
+            if len(times) >= repeats:
+                break
+        elif total >= MIN_TOTAL_S or len(times) >= MAX_REPEATS:
+            break
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "repeats": len(times),
+    }
+
+
+# read_benchmarks returns (name, callable) pairs covering the read API
+def read_benchmarks(n, rng):
+    ids = [rng.randint(1, n) for _ in range(64)]
+    id_iter = iter(ids * 1000)
+    benches = []
+
+    for status in ("All", "In Progress"):
+        for sort_by in database.SORT_COLUMNS:
+            benches.append((f"get_commissions[{status},{sort_by}]",
+                            lambda s=status, k=sort_by: database.get_commissions(s, k)))
+
+    week_end = (datagen.ANCHOR_DATE + datetime.timedelta(days=7)).isoformat()
+
+    def deep_page(status, sort_by, pages=10):
+        key = None
+        for _ in range(pages):
+            _, key = database.get_commissions_page(status, sort_by, key)
+            if key is None:
+                break
+
+    benches += [
+        ("get_commission_by_id", lambda: database.get_commission_by_id(next(id_iter))),
+        ("get_commissions_by_status[Completed]", lambda: database.get_commissions_by_status("Completed")),
+        ("get_summary", database.get_summary),
+        ("get_income_by_type", database.get_income_by_type),
+        ("get_dashboard_stats", database.get_dashboard_stats),
+        ("count_commissions[All]", lambda: database.count_commissions("All")),
+        ("count_commissions[In Progress]", lambda: database.count_commissions("In Progress")),
+        ("get_active_commissions[10]", lambda: database.get_active_commissions(10)),
+        # relative to the generator's fixed date rather than today, like get_overdue / get_due_within
+        ("get_commissions_due_between[overdue]",
+         lambda: database.get_commissions_due_between(None, datagen.ANCHOR_DATE.isoformat())),
+        ("get_commissions_due_between[week]",
+         lambda: database.get_commissions_due_between(datagen.ANCHOR_DATE.isoformat(), week_end)),
+        ("get_commissions_page[first,deadline]", lambda: database.get_commissions_page("All", "deadline")),
+        ("get_commissions_page[first,client]", lambda: database.get_commissions_page("In Progress", "client")),
+        ("get_commissions_page[10 pages,price]", lambda: deep_page("All", "price")),
+        ("search_commissions[prefix]", lambda: database.search_commissions("glow")),
+        ("search_commissions[two words,status]", lambda: database.search_commissions("pastel back", "Completed")),
+        ("get_revision", database.get_revision),
+        ("get_changes_since[latest]", lambda: database.get_changes_since(database.get_revision())),
+        ("iter_commissions[All,id]", lambda: consume(database.iter_commissions())),
+        ("iter_commissions[In Progress,client]",
+         lambda: consume(database.iter_commissions("In Progress", "client"))),
+        ("iter_analytics_rows", lambda: consume(database.iter_analytics_rows())),
+        ("get_analytics_rows[64]", lambda: database.get_analytics_rows(ids)),
+        ("get_completed_prices", database.get_completed_prices),
+        ("get_import_progress", lambda: database.get_import_progress("bench")),
+        ("check_commission_stats", database.check_commission_stats),
+    ]
+    return benches
+
+
+# consume reads an iterator to the end without keeping the rows
+def consume(rows):
+    collections.deque(rows, maxlen=0)
+
+
+# write_benchmarks returns (name, callable, repeats) triples; they run after the
+# reads because they change the data
+def write_benchmarks(n, rng):
+    new_rows = list(datagen.generate_rows(1000, seed=rng.randint(0, 10 ** 6)))
+    k = min(1000, n // 4)
+    sample = rng.sample(range(1, n + 1), 4 * k)
+    singles, batch_update, batch_mark, batch_delete = (
+        iter(sample[:k]), sample[k:2 * k], sample[2 * k:3 * k], sample[3 * k:]
+    )
+
+    def update_one():
+        cid = next(singles)
+        database.update_commission(cid, "Bench Client", "Bench Title", "Emote", 25.0, "2025-06-01", "In Progress", "")
+
+    # archive what was completed more than half a year before the data's fixed
+    # date, then move up to k of those commissions back (none that the writes
+    # before it delete or reopen)
+    cutoff = datagen.ANCHOR_DATE - datetime.timedelta(days=180)
+    archive_days = (datetime.date.today() - cutoff).days
+    taken = set(sample) - set(batch_mark)
+    archived = [cid for (cid,) in database.get_connection().execute("""
+        SELECT c.id FROM commissions c JOIN commission_dates d ON d.id = c.id
+        WHERE c.status = 'Completed' AND d.completed_at < ? ORDER BY c.id LIMIT ?
+    """, (cutoff.isoformat(), 5 * k)) if cid not in taken][:k]
+    old = (datagen.ANCHOR_DATE - datetime.timedelta(days=365)).isoformat()
+
+    return [
+        ("add_commission", lambda: database.add_commission(*new_rows[0]), 20),
+        ("update_commission", update_one, 20),
+        ("mark_complete", lambda: database.mark_complete(next(singles)), 20),
+        ("delete_commission", lambda: database.delete_commission(next(singles)), 20),
+        ("add_commissions_many[1000]", lambda: database.add_commissions_many(new_rows), 1),
+        (f"update_commissions_many[{k}]", lambda: database.update_commissions_many(
+            (cid, "Bench", "Batch", "Chibi", 30.0, "2025-07-01", "Not Started", "") for cid in batch_update), 1),
+        (f"mark_complete_many[{k}]", lambda: database.mark_complete_many(batch_mark), 1),
+        (f"delete_commissions[{k}]", lambda: database.delete_commissions(batch_delete), 1),
+        ("mark_complete_where[type,due_before]", lambda: database.mark_complete_where(
+            type_="Environment", due_before=datagen.ANCHOR_DATE.isoformat()), 1),
+        ("delete_where[status,due_before]", lambda: database.delete_where(
+            status="Not Started", due_before=old), 1),
+        ("add_import_chunk[1000]", lambda: database.add_import_chunk("bench", new_rows, 1000), 1),
+        ("clear_import_progress", lambda: database.clear_import_progress("bench"), 1),
+        ("archive_completed", lambda: database.archive_completed(archive_days), 1),
+        ("count_archived[All]", lambda: database.count_archived("All"), None),
+        (f"unarchive_commissions[{len(archived)}]", lambda: database.unarchive_commissions(archived), 1),
+        ("rebuild_commission_stats", database.rebuild_commission_stats, 1),
+        ("prune_changes[keep 1000]", lambda: database.prune_changes(keep=1000), 1),
+    ]
+
+
+# analytics_benchmarks returns (name, callable, repeats) triples for the NumPy
+# analytics engine, or [] if numpy isn't installed. The full load is timed once;
+# the rest run against the loaded arrays.
+def analytics_benchmarks():
+    try:
+        import analytics
+    except ImportError:
+        return []
+    engine = analytics.AnalyticsEngine()
+    return [
+        ("analytics.reload", engine.reload, 1),
+        ("analytics.refresh[no changes]", engine.refresh, None),
+        ("analytics.report", engine.report, None),
+        ("analytics.income_by_month", engine.income_by_month, None),
+        ("analytics.income_by_client", engine.income_by_client, None),
+        ("analytics.price_percentiles", engine.price_percentiles, None),
+    ]
+
+
+# chart_benchmarks times drawing the dashboard charts from scratch and from the
+# chart cache, or returns [] without numpy and matplotlib
+def chart_benchmarks():
+    try:
+        import analytics
+        import charts
+        import matplotlib  # noqa: F401
+    except ImportError:
+        return []
+    data = charts.dashboard_data(database.get_dashboard_stats(), analytics.get_engine().report())
+
+    def cold():
+        charts.clear_cache()
+        charts.render_dashboard(data)
+
+    return [
+        ("charts.render_dashboard[cold]", cold, 3),
+        ("charts.render_dashboard[cached]", lambda: charts.render_dashboard(data), None),
+    ]
+
+
+def table_values(r):
+    # same formatting as App.table_values
+    price_display = f"${r.price:.2f}" if r.price is not None else ""
+    return (r.id, r.client, r.title, r.type, price_display, r.deadline or "", r.status)
+
+
+# treeview_benchmarks times filling a ttk.Treeview on a hidden Tk root, both the
+# old way (every row) and the paged way App.refresh_table uses now
+def treeview_benchmarks():
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:
+        return [], f"no Tk display available ({e.__class__.__name__}: {e})"
+    root.withdraw()
+
+    cols = ("id", "client", "title", "type", "price", "deadline", "status")
+    tree = ttk.Treeview(root, columns=cols, show="headings")
+
+    def fill(rows):
+        tree.delete(*tree.get_children())
+        for r in rows:
+            tree.insert("", "end", iid=str(r.id), values=table_values(r))
+        root.update_idletasks()
+
+    benches = [
+        ("treeview_fill[all rows]", lambda: fill(database.get_commissions("All", "deadline")), 3),
+        ("treeview_fill[first page]", lambda: fill(database.get_commissions_page("All", "deadline")[0]), None),
+    ]
+    return benches, root
+
+
+def run_size(n, seed, data_dir, use_cache):
+    rng = random.Random(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        datagen.prepared_database(n, seed, data_dir, db_path)
+        print(f"  data ready in {time.perf_counter() - start:.1f}s", flush=True)
+
+        previous_db, previous_cache = database.DB_NAME, database.CACHE_SIZE
+        database.DB_NAME = db_path
+        database.CACHE_SIZE = previous_cache if use_cache else 0
+        database.clear_cache()
+        try:
+            for name, fn in read_benchmarks(n, rng):
+                results[name] = time_call(fn)
+
+            for name, fn, repeats in analytics_benchmarks() + chart_benchmarks():
+                results[name] = time_call(fn, repeats)
+
+            tree_benches, root_or_reason = treeview_benchmarks()
+            if tree_benches:
+                for name, fn, repeats in tree_benches:
+                    results[name] = time_call(fn, repeats)
+                root_or_reason.destroy()
+            else:
+                print(f"  treeview benchmarks skipped: {root_or_reason}")
+
+            for name, fn, repeats in write_benchmarks(n, rng):
+                results[name] = time_call(fn, repeats)
+        finally:
+            database.close_connections()
+            database.DB_NAME = previous_db
+            database.CACHE_SIZE = previous_cache
+            database.clear_cache()
+    return results
+
+
+# compare returns (name, baseline_s, current_s, ratio) for every benchmark whose
+# median got slower than baseline by more than threshold
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    regressions = []
+    for size, benches in current["results"].items():
+        old_benches = baseline.get("results", {}).get(size, {})
+        for name, stats in benches.items():
+            old = old_benches.get(name)
+            if not old or old["median_s"] <= 0:
+                continue
+            ratio = stats["median_s"] / old["median_s"]
+            if ratio > 1 + threshold and stats["median_s"] - old["median_s"] > MIN_DELTA_S:
+                regressions.append((f"{name} @ {size} rows", old["median_s"], stats["median_s"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark database.py and the Treeview fill path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--cache", action="store_true", help="leave the query cache on (off by default)")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "seed": args.seed,
+            "cache": args.cache,
+            "schema_version": database.SCHEMA_VERSION,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+
+    for n in args.sizes:
+        print(f"{n} rows", flush=True)
+        results = run_size(n, args.seed, args.data_dir, args.cache)
+        report["results"][str(n)] = results
+        for name, stats in results.items():
+            print(f"  {name:<42} {stats['median_s'] * 1000:10.3f} ms")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for name, old, new, ratio in regressions:
+                print(f"  {name:<56} {old * 1000:9.3f} ms -> {new * 1000:9.3f} ms  ({ratio:.2f}x)")
+            return 1
+        print("\nno regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# Cold start benchmark: how long `import database` takes and how long it takes
+# ui.py to put its first window on screen. Each measurement runs in a fresh
+# interpreter against a throwaway database, so nothing is cached between runs.
+#
+#   python -m benchmarks.startup [--runs 5] [--json results.json]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_DATABASE = """
+import time
+t0 = time.perf_counter()
+import database
+print(time.perf_counter() - t0)
+"""
+
+FIRST_QUERY = """
+import sys, time
+t0 = time.perf_counter()
+import database
+database.DB_NAME = sys.argv[1]
+database.get_summary()
+print(time.perf_counter() - t0)
+"""
+
+FIRST_WINDOW = """
+import sys, time
+t0 = time.perf_counter()
+import database
+database.DB_NAME = sys.argv[1]
+database.initialize_database()
+import customtkinter as ctk
+import ui
+root = ctk.CTk()
+app = ui.App(root)
+root.update()
+elapsed = time.perf_counter() - t0
+root.destroy()
+app.db.shutdown(wait=True)
+print(elapsed)
+print("matplotlib" in sys.modules)
+"""
+
+
+def run_snippet(snippet, db_path):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", snippet, db_path],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        last_line = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+        raise RuntimeError(last_line)
+    return wall, proc.stdout.split()
+
+
+def measure(name, snippet, runs):
+    inner, wall, extra = [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(runs):
+            db_path = os.path.join(tmp, f"startup_{i}.db")
+            try:
+                w, out = run_snippet(snippet, db_path)
+            except RuntimeError as e:
+                return {"name": name, "skipped": str(e)}
+            wall.append(w)
+            inner.append(float(out[0]))
+            extra.extend(out[1:])
+
+    result = {
+        "name": name,
+        "runs": runs,
+        "median_s": statistics.median(inner),
+        "min_s": min(inner),
+        "process_wall_median_s": statistics.median(wall),
+    }
+    if name == "first_window":
+        result["matplotlib_imported"] = "True" in extra
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure database import time and time to first window.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = [
+        measure("import_database", IMPORT_DATABASE, args.runs),
+        measure("first_query", FIRST_QUERY, args.runs),
+        measure("first_window", FIRST_WINDOW, args.runs),
+    ]
+
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['name']:<16} skipped: {r['skipped']}")
+        else:
+            print(f"{r['name']:<16} median {r['median_s'] * 1000:8.1f} ms   "
+                  f"min {r['min_s'] * 1000:8.1f} ms   "
+                  f"whole process {r['process_wall_median_s'] * 1000:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Compares concurrent write throughput of the direct path (every thread calls
+# database.update_commission, one commit each) with write_queue's group
+# commit, on copies of a seeded synthetic database.
+#
+#   python -m benchmarks.writes --threads 1 4 16 --writes 2000
+#   python -m benchmarks.writes --synchronous FULL
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import database
+from benchmarks import datagen
+from benchmarks.run import DEFAULT_DATA_DIR
+import write_queue
+
+DEFAULT_THREADS = [1, 4, 16]
+
+
+def update_args(rng, n):
+    return (rng.randint(1, n), "Bench Client", "Bench Title", "Emote", round(rng.uniform(10, 200), 2),
+            "2025-06-01", rng.choice(["Not Started", "In Progress", "Completed"]), "")
+
+
+def run_direct(n, threads, writes, synchronous):
+    latencies, errors = [], []
+
+    def work(index):
+        rng = random.Random(index)
+        database.get_connection().execute(f"PRAGMA synchronous = {synchronous}")
+        for _ in range(writes // threads):
+            start = time.perf_counter()
+            try:
+                database.update_commission(*update_args(rng, n))
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    return run_threads(work, threads), latencies, errors
+
+
+def run_queue(n, threads, writes, synchronous, max_batch, max_delay_ms):
+    latencies, errors = [], []
+    writes_queue = write_queue.GroupCommitQueue(max_batch=max_batch, max_delay_ms=max_delay_ms, synchronous=synchronous)
+
+    def work(index):
+        rng = random.Random(index)
+        for _ in range(writes // threads):
+            start = time.perf_counter()
+            try:
+                writes_queue.submit(database.update_commission, *update_args(rng, n)).result()
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    elapsed = run_threads(work, threads)
+    writes_queue.close()
+    return elapsed, latencies, errors, dict(writes_queue.stats)
+
+
+def run_threads(work, count):
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(count)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - start
+
+
+def summarize(elapsed, latencies, errors):
+    latencies.sort()
+    return {
+        "writes_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+        "errors": len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Direct writes vs group commit.")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--threads", type=int, nargs="+", default=DEFAULT_THREADS)
+    parser.add_argument("--writes", type=int, default=2000, help="total writes per run")
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"],
+                        help="same setting for both paths (the app uses NORMAL)")
+    parser.add_argument("--max-batch", type=int, default=write_queue.MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=write_queue.MAX_DELAY_MS,
+                        help="extra wait for a batch to fill (the library default; every writer here "
+                             "blocks on its own result, so a delay only adds latency)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    args = parser.parse_args(argv)
+
+    previous_db, previous_cache = database.DB_NAME, database.CACHE_SIZE
+    database.CACHE_SIZE = 0
+    print(f"{args.writes} updates per run, synchronous={args.synchronous}, "
+          f"queue max_batch={args.max_batch} max_delay_ms={args.max_delay_ms:g}")
+    print(f"{'threads':>8} {'path':<7} {'writes/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}  batches")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for threads in args.threads:
+                for path in ("direct", "queue"):
+                    db_path = os.path.join(tmp, f"{path}_{threads}.db")
+                    datagen.prepared_database(args.rows, args.seed, args.data_dir, db_path)
+                    database.DB_NAME = db_path
+                    database.initialize_database()
+                    if path == "direct":
+                        result = summarize(*run_direct(args.rows, threads, args.writes, args.synchronous))
+                        batches = ""
+                    else:
+                        elapsed, latencies, errors, stats = run_queue(
+                            args.rows, threads, args.writes, args.synchronous, args.max_batch, args.max_delay_ms)
+                        result = summarize(elapsed, latencies, errors)
+                        batches = f"{stats['batches']} (retries {stats['retries']})"
+                    database.close_connections()
+                    print(f"{threads:>8} {path:<7} {result['writes_per_s']:>10.0f} {result['p50_ms']:>8.2f} "
+                          f"{result['p99_ms']:>8.2f} {result['errors']:>7}  {batches}", flush=True)
+    finally:
+        database.close_connections()
+        database.DB_NAME, database.CACHE_SIZE = previous_db, previous_cache
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+# Dashboard charts, rendered to PNG with matplotlib's Agg backend.
+#
+# Rendering never touches Tk, so it can run on a worker thread; the UI only
+# turns the finished PNG into a PhotoImage. Every image is cached under a hash
+# of the numbers it was drawn from (plus its size), so reopening the dashboard
+# when nothing changed costs a dictionary lookup instead of a redraw, and a
+# chart whose numbers did change gets a new key and is drawn again. Charts are
+# cached one by one, so a status change only redraws the charts it affects.
+#
+#   data = charts.dashboard_data(database.get_dashboard_stats(), analytics.get_engine().report())
+#   images = charts.render_dashboard(data)     # {name: PNG bytes, or None when there is nothing to draw}
+
+# how many rendered images are kept (four per dashboard state)
+CHART_CACHE_SIZE = 32
+DPI = 100
+
+BROWN = "#5A3E2B"
+BROWN_DARK = "#3E2A1D"
+ACCENT = "#B08968"
+OVERDUE_RED = "#A63D2F"
+STATUS_COLORS = {"Not Started": ACCENT, "In Progress": BROWN, "Completed": BROWN_DARK}
+
+_cache = OrderedDict()        # (name, data hash, size) -> PNG bytes
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+# matplotlib's object API works off the Tk thread, but its font and text
+# caches are shared, so only one chart is drawn at a time
+_render_lock = threading.Lock()
+
+
+def _income_by_type(fig, data):
+    ax = fig.add_subplot()
+    ax.pie([value for _, value in data], labels=[label for label, _ in data],
+           autopct="%1.1f%%", startangle=90, textprops={"fontsize": 8})
+    ax.set_title("Income by Commission Type")
+
+
+def _status_breakdown(fig, data):
+    counts, overdue = data
+    ax = fig.add_subplot()
+    labels = list(counts)
+    ax.barh(labels, [counts[label] for label in labels], color=[STATUS_COLORS.get(s, ACCENT) for s in labels])
+    # overdue commissions are also counted in Not Started / In Progress
+    ax.barh(["Overdue"], [overdue], color=OVERDUE_RED)
+    ax.invert_yaxis()
+    ax.set_title("Commissions by Status")
+    ax.tick_params(labelsize=8)
+
+
+def _top_clients(fig, data):
+    ax = fig.add_subplot()
+    rows = data[::-1]
+    ax.barh([label for label, _ in rows], [value for _, value in rows], color=BROWN)
+    ax.set_title("Top Clients by Income")
+    ax.tick_params(labelsize=8)
+
+
+def _revenue(fig, data):
+    ax = fig.add_subplot()
+    months = range(len(data))
+    ax.bar(months, [row[1] for row in data], color=ACCENT, label="Income")
+    ax.plot(months, [row[2] for row in data], color=BROWN_DARK, label="Rolling average")
+    step = max(1, len(data) // 12)
+    ax.set_xticks(list(months)[::step], [row[0] for row in data][::step], rotation=45, fontsize=8)
+    ax.set_title("Revenue Over Time")
+    ax.tick_params(axis="y", labelsize=8)
+
+    total = ax.twinx()
+    running, cumulative = 0.0, []
+    for row in data:
+        running += row[1]
+        cumulative.append(running)
+    total.plot(months, cumulative, color=BROWN, linestyle="--", label="Total so far")
+    total.tick_params(labelsize=8)
+    lines, labels = ax.get_legend_handles_labels()
+    more_lines, more_labels = total.get_legend_handles_labels()
+    ax.legend(lines + more_lines, labels + more_labels, fontsize=8, loc="upper left")
+
+
+# CHARTS maps each chart name to (draw function, size in inches), in the order
+# the dashboard lays them out
+CHARTS = {
+    "income_by_type": (_income_by_type, (4.1, 3.1)),
+    "status": (_status_breakdown, (4.1, 3.1)),
+    "top_clients": (_top_clients, (4.1, 3.1)),
+    "revenue": (_revenue, (8.2, 3.4)),
+}
+
+
+# dashboard_data picks out what each chart draws from get_dashboard_stats()
+# and an analytics report. The result is plain tuples and numbers, so it can
+# be hashed and handed between threads.
+def dashboard_data(dashboard_stats, report):
+    (total, completed, in_progress, not_started, income), income_by_type = dashboard_stats
+    counts = {"Not Started": not_started, "In Progress": in_progress, "Completed": completed}
+    return {
+        "income_by_type": tuple(tuple(row) for row in income_by_type),
+        "status": (counts, report["overdue"][0]),
+        "top_clients": tuple(tuple(row) for row in report["income_by_client"]),
+        "revenue": tuple(tuple(row) for row in report["revenue_trend"]),
+    }
+
+
+def _has_data(name, data):
+    if name == "status":
+        return any(data[0].values())
+    return bool(data)
+
+
+def data_hash(data):
+    return hashlib.blake2b(repr(data).encode(), digest_size=16).hexdigest()
+
+
+# render returns chart `name` drawn from `data` as PNG bytes, from the cache
+# when the same data has been drawn before
+def render(name, data, dpi=DPI):
+    draw, size = CHARTS[name]
+    key = (name, data_hash(data), size, dpi)
+    with _cache_lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return png
+        _cache_stats["misses"] += 1
+
+    # matplotlib takes a while to import, so it is only loaded once a chart is drawn
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    with _render_lock:
+        fig = Figure(figsize=size, dpi=dpi)
+        FigureCanvasAgg(fig)
+        draw(fig, data)
+        fig.tight_layout()
+        out = BytesIO()
+        fig.savefig(out, format="png", facecolor="white")
+        png = out.getvalue()
+
+    with _cache_lock:
+        _cache[key] = png
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return png
+
+
+# render_dashboard renders every chart in CHARTS; charts with nothing to show are None
+def render_dashboard(data):
+    return {name: render(name, data[name]) if _has_data(name, data[name]) else None for name in CHARTS}
+
+
+# png_to_base64 is the form tk.PhotoImage(data=...) accepts
+def png_to_base64(png):
+    return base64.b64encode(png).decode("ascii")
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def cache_info():
+    with _cache_lock:
+        return {"size": len(_cache), "max_size": CHART_CACHE_SIZE, **_cache_stats}
@@ -0,0 +1,334 @@
+# Command-line access to the commissions database for scripts and scheduled
+# jobs. Only database.py is imported (never Tk, customtkinter or matplotlib),
+# so a command starts in milliseconds. Results go to stdout as JSON (lists as
+# JSON Lines, one commission per line, or CSV); errors go to stderr as JSON
+# with a non-zero exit code.
+#
+#   python cli.py list --status "In Progress" --sort deadline
+#   python cli.py add --client Ana --title "Fox OC" --type Chibi --price 30
+#   python cli.py update 12 --status "In Progress"
+#   python cli.py mark-complete --status "In Progress" --due-before 2025-07-01
+#   python cli.py delete --ids - < ids.txt      # ids read from stdin in batches
+#   python cli.py summary --archived          # totals including archived commissions
+#   python cli.py income-by-type --csv
+#   python cli.py archive --older-than 365     # move old Completed commissions to the archive
+#   python cli.py quote < requests.jsonl       # {"type": "Chibi", "characters": 2, ...} per line
+#   python cli.py backup --keep 10             # online snapshot into backups/
+#   python cli.py restore backups/commissions-20250601-120000.db
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+
+import database
+
+# ids read from stdin are written this many per transaction
+ID_BATCH = 500
+# quote requests read from stdin are priced this many per quote_many call
+QUOTE_BATCH = 10000
+
+EXIT_ERROR = 1
+
+
+def emit(obj):
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False))
+    sys.stdout.write("\n")
+
+
+def fail(message):
+    sys.stderr.write(json.dumps({"error": message}) + "\n")
+    return EXIT_ERROR
+
+
+# read_ids yields batches of ids: from the command line, or from stdin
+# (whitespace or comma separated) when the only id given is "-"
+def read_ids(ids, batch_size=ID_BATCH):
+    if ids == ["-"]:
+        words = (word for line in sys.stdin for word in line.replace(",", " ").split())
+    else:
+        words = iter(ids)
+    batch = []
+    for word in words:
+        try:
+            batch.append(int(word))
+        except ValueError:
+            raise ValueError(f"Not a commission id: {word!r}") from None
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def filters_from(args):
+    return {
+        "status": args.status,
+        "type_": args.type,
+        "client": args.client,
+        "due_before": args.due_before,
+        "overdue": args.overdue,
+    }
+
+
+# has_filter is False when the filters would match every commission; status
+# "All" is no filter at all
+def has_filter(args):
+    filters = filters_from(args)
+    if filters["status"] == "All":
+        filters["status"] = None
+    return any(value not in (None, False) for value in filters.values())
+
+
+def cmd_add(args):
+    row = database.validate_commission(args.client, args.title, args.type, args.price,
+                                       args.deadline, args.status, args.notes)
+    emit({"id": database.add_commission(*row)})
+
+
+def cmd_update(args):
+    current = database.get_commission_by_id(args.id)
+    if current is None:
+        return fail(f"Commission {args.id} not found")
+    changes = {
+        "client": args.client, "title": args.title, "type": args.type, "price": args.price,
+        "deadline": args.deadline, "status": args.status, "notes": args.notes,
+    }
+    values = [changes[name] if changes[name] is not None else getattr(current, name)
+              for name in database.COLUMNS[1:]]
+    row = database.validate_commission(*values)
+    database.update_commission(args.id, *row)
+    emit({"updated": 1, "id": args.id})
+
+
+# mark-complete and delete either take explicit ids (batched through the *_many
+# functions) or filters, which run as one set-based statement
+def cmd_mark_complete(args):
+    if args.ids:
+        emit({"updated": sum(database.mark_complete_many(batch) for batch in read_ids(args.ids))})
+    elif has_filter(args) or args.all:
+        emit({"updated": database.mark_complete_where(**filters_from(args))})
+    else:
+        return fail("Give ids (or - to read them from stdin), at least one filter, or --all")
+
+
+def cmd_delete(args):
+    if args.ids:
+        emit({"deleted": sum(database.delete_commissions(batch) for batch in read_ids(args.ids))})
+    elif has_filter(args) or args.all:
+        emit({"deleted": database.delete_where(**filters_from(args))})
+    else:
+        return fail("Give ids (or - to read them from stdin), at least one filter, or --all")
+
+
+def cmd_list(args):
+    rows = database.iter_commissions(sort_by=args.sort, include_archived=args.archived, **filters_from(args))
+    fields = database.COLUMNS if args.notes else database.LIST_COLUMNS
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(fields)
+    for count, row in enumerate(rows):
+        if args.limit is not None and count >= args.limit:
+            break
+        values = [getattr(row, name) for name in fields]
+        if args.csv:
+            writer.writerow(values)
+        else:
+            emit(dict(zip(fields, values)))
+
+
+def cmd_summary(args):
+    total, completed, in_progress, not_started, income = database.get_summary(args.archived)
+    emit({
+        "total": total, "completed": completed, "in_progress": in_progress,
+        "not_started": not_started, "income": income,
+    })
+
+
+def cmd_income_by_type(args):
+    rows = database.get_income_by_type(args.archived)
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(("type", "income"))
+        writer.writerows(rows)
+    else:
+        emit({type_: income for type_, income in rows})
+
+
+def cmd_archive(args):
+    emit({"archived": database.archive_completed(args.older_than), "archive": database.archive_path()})
+
+
+def cmd_unarchive(args):
+    emit({"unarchived": sum(database.unarchive_commissions(batch) for batch in read_ids(args.ids))})
+
+
+# quote reads one JSON request per line from stdin and prints it back with a
+# "quote" field added, pricing QUOTE_BATCH requests per call
+def cmd_quote(args):
+    import pricing
+    try:
+        rates = pricing.RateTable.load(args.rates) if args.rates else pricing.get_rate_table()
+    except OSError as e:
+        return fail(f"Cannot read rate table: {e}")
+
+    def flush(batch):
+        quotes = rates.quote_many(
+            [r.get("type") for r in batch],
+            characters=[r.get("characters") or 1 for r in batch],
+            backgrounds=[r.get("background") for r in batch],
+            deadlines=[r.get("deadline") for r in batch],
+        )
+        for request, price in zip(batch, quotes.tolist()):
+            emit({**request, "quote": price})
+
+    batch = []
+    for number, line in enumerate(sys.stdin, start=1):
+        if not line.strip():
+            continue
+        try:
+            batch.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number}: {e}") from None
+        if len(batch) == QUOTE_BATCH:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+def cmd_backup(args):
+    import backup
+    path = backup.snapshot(args.dir, args.keep)
+    emit({"snapshot": path, "kept": len(backup.list_snapshots(args.dir))})
+
+
+def cmd_backups(args):
+    import backup
+    for path in backup.list_snapshots(args.dir):
+        emit({"snapshot": path, "bytes": os.path.getsize(path)})
+
+
+def cmd_restore(args):
+    import backup
+    try:
+        backup.restore(args.snapshot)
+    except backup.BackupError as e:
+        return fail(str(e))
+    emit({"restored": args.snapshot, "total": database.count_commissions()})
+
+
+def add_archived_arg(parser):
+    parser.add_argument("--archived", action="store_true", help="include archived commissions")
+
+
+def add_filter_args(parser):
+    parser.add_argument("--status", help='only this status ("All" for any)')
+    parser.add_argument("--type", help="only this commission type")
+    parser.add_argument("--client", help="only this client (case-insensitive)")
+    parser.add_argument("--due-before", metavar="YYYY-MM-DD", help="only deadlines before this date")
+    parser.add_argument("--overdue", action="store_true", help="only unfinished commissions past their deadline")
+
+
+def add_field_args(parser, defaults):
+    parser.add_argument("--client", default=defaults.get("client"))
+    parser.add_argument("--title", default=defaults.get("title"))
+    parser.add_argument("--type", default=defaults.get("type"))
+    parser.add_argument("--price", default=defaults.get("price"))
+    parser.add_argument("--deadline", metavar="YYYY-MM-DD", default=defaults.get("deadline"))
+    parser.add_argument("--status", default=defaults.get("status"))
+    parser.add_argument("--notes", default=defaults.get("notes"))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Manage commissions without the GUI.")
+    parser.add_argument("--db", help=f"database file (default {database.DB_NAME})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("add", help="add one commission, prints its id")
+    add_field_args(p, {"status": "Not Started"})
+    p.set_defaults(func=cmd_add)
+
+    p = commands.add_parser("update", help="change some fields of one commission")
+    p.add_argument("id", type=int)
+    add_field_args(p, {})
+    p.set_defaults(func=cmd_update)
+
+    p = commands.add_parser("mark-complete", help="mark commissions Completed by id or filter")
+    p.add_argument("--ids", nargs="+", metavar="ID", help='ids to mark, or "-" to read them from stdin')
+    add_filter_args(p)
+    p.add_argument("--all", action="store_true", help="mark every commission when no filter is given")
+    p.set_defaults(func=cmd_mark_complete)
+
+    p = commands.add_parser("delete", help="delete commissions by id or filter")
+    p.add_argument("--ids", nargs="+", metavar="ID", help='ids to delete, or "-" to read them from stdin')
+    add_filter_args(p)
+    p.add_argument("--all", action="store_true", help="delete every commission when no filter is given")
+    p.set_defaults(func=cmd_delete)
+
+    p = commands.add_parser("list", help="print commissions as JSON Lines (or CSV)")
+    add_filter_args(p)
+    p.add_argument("--sort", default="id", choices=sorted(database.SORT_COLUMNS))
+    p.add_argument("--limit", type=int)
+    p.add_argument("--notes", action="store_true", help="include the notes column")
+    p.add_argument("--csv", action="store_true")
+    add_archived_arg(p)
+    p.set_defaults(func=cmd_list)
+
+    p = commands.add_parser("summary", help="print commission counts and income")
+    add_archived_arg(p)
+    p.set_defaults(func=cmd_summary)
+
+    p = commands.add_parser("income-by-type", help="print completed income per type")
+    p.add_argument("--csv", action="store_true")
+    add_archived_arg(p)
+    p.set_defaults(func=cmd_income_by_type)
+
+    p = commands.add_parser("archive", help="move old Completed commissions into the archive file")
+    p.add_argument("--older-than", type=int, metavar="DAYS", default=database.ARCHIVE_AFTER_DAYS,
+                   help=f"completed more than this many days ago (default {database.ARCHIVE_AFTER_DAYS})")
+    p.set_defaults(func=cmd_archive)
+
+    p = commands.add_parser("quote", help="price JSON Lines requests from stdin with the rate table")
+    p.add_argument("--rates", metavar="FILE",
+                   help="rate table JSON (default pricing_rates.json if present, else defaults calibrated from history)")
+    p.set_defaults(func=cmd_quote)
+
+    p = commands.add_parser("backup", help="take an online snapshot of the database")
+    p.add_argument("--dir", help="snapshot directory (default backups)")
+    p.add_argument("--keep", type=int, help="snapshots to keep (default 10)")
+    p.set_defaults(func=cmd_backup)
+
+    p = commands.add_parser("backups", help="list snapshots, oldest first")
+    p.add_argument("--dir", help="snapshot directory (default backups)")
+    p.set_defaults(func=cmd_backups)
+
+    p = commands.add_parser("restore", help="replace the database with a snapshot")
+    p.add_argument("snapshot")
+    p.set_defaults(func=cmd_restore)
+
+    p = commands.add_parser("unarchive", help="move archived commissions back by id")
+    p.add_argument("--ids", nargs="+", metavar="ID", required=True,
+                   help='ids to move back, or "-" to read them from stdin')
+    p.set_defaults(func=cmd_unarchive)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        database.DB_NAME = args.db
+    try:
+        return args.func(args) or 0
+    except (ValueError, sqlite3.Error) as e:
+        return fail(str(e))
+    except BrokenPipeError:
+        # e.g. piped into head; nothing more to print
+        return 0
+    except OSError as e:
+        return fail(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,336 @@
+import atexit
+import datetime
+import functools
+import logging
+import os
 import sqlite3
+import threading
+import time
+import types
+from collections import OrderedDict
+from contextlib import contextmanager
+from operator import attrgetter
+
 DB_NAME = "commissions.db"
 
+# the statuses and commission types the app offers (the forms, pricing)
+STATUS_OPTIONS = ["Not Started", "In Progress", "Completed"]
+TYPE_OPTIONS = ["Portrait", "Half Body", "Full Body", "Chibi", "Emote", "Environment", "Other"]
+
+# Tuning applied to every connection when it is first opened
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -16000,     # negative = KiB, so ~16 MB of page cache
+    "mmap_size": 268435456,   # 256 MB
+    "temp_store": "MEMORY",
+}
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_all_connections = []
+_connections_lock = threading.Lock()
+_generation = 0  # bumped by close_connections so other threads reopen
+_initialized = set()          # DB files initialize_database has run on
+_init_lock = threading.RLock()
+
+
+def _open_connection(db_name):
+    conn = sqlite3.connect(
+        db_name,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    if _metrics is not None:
+        conn.set_trace_callback(_trace_statement)
+    return conn
+
+# get_connection returns this thread's connection, opening it on first use.
+# Connections are kept open and reused, so callers must NOT close them.
 def get_connection():
-    return sqlite3.connect(DB_NAME)
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        if _local.db_name == DB_NAME and _local.generation == _generation:
+            return conn
+        # DB_NAME was changed or close_connections ran, drop the old one
+        _discard_connection(conn)
 
-# initialize_database function creates the database that will store all commissions 
-def initialize_database():
+    conn = _open_connection(DB_NAME)
+    _local.conn = conn
+    _local.db_name = DB_NAME
+    _local.generation = _generation
+    with _connections_lock:
+        _all_connections.append(conn)
+    _ensure_initialized()
+    return conn
+
+# The schema is brought up to date the first time any thread connects to a
+# file, rather than when this module is imported
+def _ensure_initialized():
+    if DB_NAME in _initialized:
+        return
+    with _init_lock:
+        if DB_NAME not in _initialized:
+            initialize_database()
+
+
+def _discard_connection(conn):
+    with _connections_lock:
+        if conn in _all_connections:
+            _all_connections.remove(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+# close_connections closes every connection opened by any thread; safe to call more than once
+def close_connections():
+    global _generation
+    with _connections_lock:
+        conns = list(_all_connections)
+        _all_connections.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.commit()
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.conn = None
+
+
+atexit.register(close_connections)
+
+
+# _commit commits unless the caller is inside a transaction() block,
+# in which case the block commits once at the end
+def _commit(conn):
+    if getattr(_local, "tx_depth", 0) == 0:
+        conn.commit()
+        _count_commit()
+
+# Every PRUNE_EVERY commits the change log is pruned again, so a GUI or server
+# that runs for weeks keeps it at about CHANGE_LOG_KEEP entries instead of
+# letting it grow with every write (initialize_database only prunes at start)
+PRUNE_EVERY = 1000
+_commits_since_prune = 0
+_prune_lock = threading.Lock()
+
+def _count_commit():
+    global _commits_since_prune
+    with _prune_lock:
+        _commits_since_prune += 1
+        if _commits_since_prune < PRUNE_EVERY:
+            return
+        _commits_since_prune = 0
+    try:
+        prune_changes()
+    except sqlite3.OperationalError:
+        # the file is busy; the write itself is committed, so try again later
+        conn = get_connection()
+        if conn.in_transaction:
+            conn.rollback()
+
+# transaction groups several writes into a single commit (and a single fsync).
+# Blocks can be nested; only the outermost one commits. The outermost block
+# starts with BEGIN IMMEDIATE (unless the caller already began one), which takes
+# the write lock up front and keeps schema changes inside the transaction too:
+# in sqlite3's default mode CREATE, ALTER and DROP would otherwise commit on
+# their own. Any exception rolls back everything done inside the block.
+#
+#   with database.transaction():
+#       database.add_commission(...)
+#       database.mark_complete(3)
+@contextmanager
+def transaction():
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
+    depth = getattr(_local, "tx_depth", 0)
+    if depth == 0 and not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    _local.tx_depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        _local.tx_depth = depth
+        if depth == 0:
+            conn.rollback()
+            _flush_tx_invalidations()
+        raise
+    _local.tx_depth = depth
+    if depth == 0:
+        conn.commit()
+        _flush_tx_invalidations()
+        _count_commit()
+
+
+# Read-through cache for the hot read functions. Entries are either tied to one
+# commission id (get_commission_by_id) or to the whole table (lists, counts,
+# summaries). Every write function calls _invalidate with the ids it touched,
+# which drops those rows' entries and every table-wide entry.
+#
+# Other processes (the CLI, the server, a restore) write to the same file, so
+# before every lookup the cache also compares the change log's newest revision
+# with the one it last saw. When it has moved, the ids logged in between are
+# invalidated the same way, and everything is dropped if the log no longer
+# covers the gap.
+CACHE_SIZE = 256
+
+_cache = OrderedDict()        # key -> (value, commission id or None for table-wide)
+_cache_lock = threading.Lock()
+_cache_generation = 0         # bumped by every invalidation
+_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_cache_revs = {}              # DB_NAME -> change log revision the cache has caught up with
+_sync_lock = threading.Lock()
+
+_MISSING = object()
+
+
+def _cached(row_scoped=False):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if CACHE_SIZE <= 0:
+                return fn(*args, **kwargs)
+            key = (fn.__name__, DB_NAME, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return fn(*args, **kwargs)  # e.g. a list argument, just don't cache
+
+            conn = get_connection()
+            if conn.in_transaction:
+                # this thread's uncommitted writes aren't in the cache's view of the data
+                return fn(*args, **kwargs)
+            _sync_cache(conn)
+
+            with _cache_lock:
+                entry = _cache.get(key, _MISSING)
+                if entry is not _MISSING:
+                    _cache.move_to_end(key)
+                    _cache_stats["hits"] += 1
+                else:
+                    _cache_stats["misses"] += 1
+                generation = _cache_generation
+            if entry is not _MISSING:
+                value, _ = entry
+                return list(value) if isinstance(value, _FrozenList) else value
+
+            result = fn(*args, **kwargs)
+            # lists are stored as tuples so callers can't change a cached result
+            value = _FrozenList(result) if isinstance(result, list) else result
+
+            # don't keep results read inside an open transaction (they may be
+            # rolled back) or that raced with a write on another thread
+            if not conn.in_transaction:
+                with _cache_lock:
+                    if generation == _cache_generation:
+                        scope = _row_id(args[0]) if row_scoped and args else None
+                        _cache[key] = (value, scope)
+                        while len(_cache) > CACHE_SIZE:
+                            _cache.popitem(last=False)
+            return result
+        return wrapper
+    return decorate
+
+
+class _FrozenList(tuple):
+    pass
+
+
+def _row_id(comm_id):
+    try:
+        return int(comm_id)
+    except (TypeError, ValueError):
+        return comm_id
+
+# _invalidate drops cached results affected by writing the commissions in ids.
+# inserted=True also drops cached "not found" lookups, since new ids now exist.
+def _invalidate(ids=(), inserted=False):
+    global _cache_generation
+    ids = {_row_id(cid) for cid in ids}
+    with _cache_lock:
+        _cache_generation += 1
+        _cache_stats["invalidations"] += 1
+        for key, (value, scope) in list(_cache.items()):
+            if scope is None or scope in ids or (inserted and value is None):
+                del _cache[key]
+
+    if getattr(_local, "tx_depth", 0) > 0:
+        # invalidate again when the transaction commits, so nothing another
+        # thread cached from the pre-commit state survives
+        pending_ids, pending_inserted = getattr(_local, "tx_invalidations", None) or (set(), False)
+        _local.tx_invalidations = (pending_ids | ids, pending_inserted or inserted)
+
+
+# _sync_cache invalidates what was written to DB_NAME since the cache last
+# caught up with the change log, including writes by other processes
+def _sync_cache(conn):
+    rev = conn.execute("SELECT IFNULL(MAX(rev), 0) FROM changes").fetchone()[0]
+    if _cache_revs.get(DB_NAME) == rev:
+        return
+    with _sync_lock:
+        known = _cache_revs.get(DB_NAME)
+        if known == rev:
+            return
+        ids = None if known is None or rev < known else _changed_ids(conn, known, rev)
+        if ids is None:
+            clear_cache()
+        else:
+            _invalidate(ids, inserted=True)
+        _cache_revs[DB_NAME] = rev
+
+
+def _flush_tx_invalidations():
+    pending = getattr(_local, "tx_invalidations", None)
+    if pending is not None:
+        _local.tx_invalidations = None
+        _invalidate(*pending)
+
+# clear_cache empties the query cache
+def clear_cache():
+    global _cache_generation
+    with _cache_lock:
+        _cache.clear()
+        _cache_generation += 1
+
+# get_cache_stats returns hit/miss/invalidation counters and the current size
+def get_cache_stats():
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_cache))
+
+# reset_cache_stats zeroes the hit/miss/invalidation counters
+def reset_cache_stats():
+    with _cache_lock:
+        for name in _cache_stats:
+            _cache_stats[name] = 0
+
+# _canonical_deadlines rewrites the deadlines the old form accepted but that
+# aren't strict YYYY-MM-DD yet: it checked them with strptime("%Y-%m-%d"), which
+# allows unpadded months and days like 2025-3-4, so those become 2025-03-04
+# exactly as validate_commission would store them now
+def _canonical_deadlines(conn):
+    updates = []
+    for comm_id, deadline in conn.execute(
+        "SELECT id, deadline FROM commissions WHERE deadline IS NOT date(deadline, '+0 days')"
+    ):
+        try:
+            deadline = datetime.datetime.strptime(deadline.strip(), "%Y-%m-%d").date().isoformat()
+        except (AttributeError, ValueError):
+            continue
+        updates.append((deadline, comm_id))
+    conn.executemany("UPDATE commissions SET deadline = ? WHERE id = ?", updates)
+
+# MIGRATIONS holds the schema history. Each entry is a list of statements
+# (or functions taking the connection, for steps SQL can't express) that
+# upgrades the database by one version; the current version is stored in
+# PRAGMA user_version. Only ever append to this list, never edit old entries.
+MIGRATIONS = [
+    # 1: base table
+    [
+        """
         CREATE TABLE IF NOT EXISTS commissions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             client TEXT NOT NULL,
@@ -19,9 +341,335 @@ def initialize_database():
             status TEXT,
             notes TEXT
         )
-    """)
-    conn.commit()
-    conn.close()
+        """,
+    ],
+    # 2: indexes for status filters and every get_commissions sort order
+    [
+        "CREATE INDEX IF NOT EXISTS idx_commissions_status ON commissions(status)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_status_deadline ON commissions(status, deadline)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_deadline ON commissions(deadline)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_price ON commissions(price)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_client_nocase ON commissions(client COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_title_nocase ON commissions(title COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_type_nocase ON commissions(type COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_status_nocase ON commissions(status COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_status_price ON commissions(status, price)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_status_client ON commissions(status, client COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_status_title ON commissions(status, title COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_commissions_status_type ON commissions(status, type COLLATE NOCASE)",
+    ],
+    # 3: change log, one row per written commission, for incremental refreshes
+    [
+        """
+        CREATE TABLE IF NOT EXISTS changes (
+            rev INTEGER PRIMARY KEY AUTOINCREMENT,
+            commission_id INTEGER NOT NULL,
+            op TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_changes_insert AFTER INSERT ON commissions
+        BEGIN
+            INSERT INTO changes (commission_id, op) VALUES (NEW.id, 'I');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_changes_update AFTER UPDATE ON commissions
+        BEGIN
+            INSERT INTO changes (commission_id, op) VALUES (NEW.id, 'U');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_changes_delete AFTER DELETE ON commissions
+        BEGIN
+            INSERT INTO changes (commission_id, op) VALUES (OLD.id, 'D');
+        END
+        """,
+    ],
+    # 4: partial index holding only active rows, in deadline order
+    [
+        """
+        CREATE INDEX IF NOT EXISTS idx_commissions_active_deadline ON commissions(deadline)
+        WHERE status IN ('Not Started', 'In Progress')
+        """,
+    ],
+    # 5: full-text index over client, title and notes, kept in sync by triggers
+    [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS commissions_fts USING fts5(
+            client, title, notes,
+            content='commissions', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commissions_fts_insert AFTER INSERT ON commissions
+        BEGIN
+            INSERT INTO commissions_fts (rowid, client, title, notes)
+            VALUES (NEW.id, NEW.client, NEW.title, NEW.notes);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commissions_fts_delete AFTER DELETE ON commissions
+        BEGIN
+            INSERT INTO commissions_fts (commissions_fts, rowid, client, title, notes)
+            VALUES ('delete', OLD.id, OLD.client, OLD.title, OLD.notes);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commissions_fts_update AFTER UPDATE OF client, title, notes ON commissions
+        BEGIN
+            INSERT INTO commissions_fts (commissions_fts, rowid, client, title, notes)
+            VALUES ('delete', OLD.id, OLD.client, OLD.title, OLD.notes);
+            INSERT INTO commissions_fts (rowid, client, title, notes)
+            VALUES (NEW.id, NEW.client, NEW.title, NEW.notes);
+        END
+        """,
+        "INSERT INTO commissions_fts (commissions_fts) VALUES ('rebuild')",
+    ],
+    # 6: how far each (resumable) file import has got
+    [
+        """
+        CREATE TABLE IF NOT EXISTS import_progress (
+            source TEXT PRIMARY KEY,
+            rows_done INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+    ],
+    # 7: when each commission was created and completed, for turnaround stats.
+    # Kept beside commissions so its row shape does not change; rows that
+    # existed before this migration have unknown (NULL) dates.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS commission_dates (
+            id INTEGER PRIMARY KEY,
+            created_at TEXT,
+            completed_at TEXT
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commission_dates_insert AFTER INSERT ON commissions
+        BEGIN
+            INSERT OR REPLACE INTO commission_dates (id, created_at, completed_at)
+            VALUES (NEW.id, date('now', 'localtime'),
+                    CASE WHEN NEW.status = 'Completed' THEN date('now', 'localtime') END);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commission_dates_status AFTER UPDATE OF status ON commissions
+        WHEN NEW.status IS NOT OLD.status
+        BEGIN
+            INSERT INTO commission_dates (id, completed_at)
+            VALUES (NEW.id, CASE WHEN NEW.status = 'Completed' THEN date('now', 'localtime') END)
+            ON CONFLICT (id) DO UPDATE SET completed_at = excluded.completed_at;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commission_dates_delete AFTER DELETE ON commissions
+        BEGIN
+            DELETE FROM commission_dates WHERE id = OLD.id;
+        END
+        """,
+    ],
+    # 8: deadlines are strict YYYY-MM-DD text or NULL, so they sort and range-scan
+    # as dates. Dates the old form accepted are rewritten in that format and
+    # blank ones become NULL; anything that isn't a real date is moved to the
+    # end of the notes (so nothing typed is lost) and becomes NULL too.
+    # date(x, '+0 days') is used because plain date() lets through days like Feb 30.
+    [
+        _canonical_deadlines,
+        """
+        UPDATE commissions
+        SET notes = TRIM(IFNULL(notes, '') || char(10) || 'Deadline: ' || deadline, char(10))
+        WHERE TRIM(deadline) != '' AND date(deadline, '+0 days') IS NOT substr(deadline, 1, 10)
+        """,
+        """
+        UPDATE commissions
+        SET deadline = CASE WHEN date(deadline, '+0 days') IS substr(deadline, 1, 10)
+                            THEN substr(deadline, 1, 10) END
+        WHERE deadline IS NOT date(deadline, '+0 days')
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commissions_deadline_insert BEFORE INSERT ON commissions
+        WHEN NEW.deadline IS NOT NULL AND NEW.deadline IS NOT date(NEW.deadline, '+0 days')
+        BEGIN
+            SELECT RAISE(ABORT, 'Deadline must be in YYYY-MM-DD format.');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commissions_deadline_update BEFORE UPDATE OF deadline ON commissions
+        WHEN NEW.deadline IS NOT NULL AND NEW.deadline IS NOT date(NEW.deadline, '+0 days')
+        BEGIN
+            SELECT RAISE(ABORT, 'Deadline must be in YYYY-MM-DD format.');
+        END
+        """,
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# get_schema_version returns the migration level the database file is at
+def get_schema_version():
+    conn = get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+# migrate applies every pending migration, each one in its own transaction,
+# so an existing commissions.db is upgraded in place. A migration that fails
+# is rolled back whole and can simply be run again.
+def migrate():
+    conn = get_connection()
+    version = get_schema_version()
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"{DB_NAME} is at schema version {version}, newer than this app supports ({SCHEMA_VERSION})"
+        )
+
+    for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with transaction():
+            # another process may have applied it since the version was read
+            if get_schema_version() >= target:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+    return get_schema_version()
+
+# initialize_database function creates the database that will store all commissions
+# and brings its schema up to date. It runs automatically on first connect and is
+# safe to call again; when nothing needs changing it only reads.
+def initialize_database():
+    with _init_lock:
+        migrate()
+        prune_changes()
+        if USE_STATS_TABLE:
+            enable_commission_stats()
+        _initialized.add(DB_NAME)
+
+COLUMNS = ("id", "client", "title", "type", "price", "deadline", "status", "notes")
+# what the commission lists show; everything except the (possibly long) notes
+LIST_COLUMNS = COLUMNS[:-1]
+_LIST_SELECT = f"SELECT {', '.join(LIST_COLUMNS)} FROM commissions"
+# columns are always named, so a migration that adds one can't shift the records
+_DETAIL_SELECT = f"SELECT {', '.join(COLUMNS)} FROM commissions"
+
+
+# Commission is one row of a commission list: every column but notes.
+# CommissionDetail adds notes and is what get_commission_by_id and
+# iter_commissions return. Both still unpack, index and iterate like the
+# tuples they replace, in COLUMNS order. Records can be shared through the
+# query cache, so treat them as read-only.
+class Commission:
+    __slots__ = LIST_COLUMNS
+    FIELDS = LIST_COLUMNS
+    _values = attrgetter(*LIST_COLUMNS)
+
+    def __init__(self, id, client, title, type, price, deadline, status):
+        self.id = id
+        self.client = client
+        self.title = title
+        self.type = type
+        self.price = price
+        self.deadline = deadline
+        self.status = status
+
+    def __iter__(self):
+        return iter(self._values(self))
+
+    def __getitem__(self, index):
+        return self._values(self)[index]
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, Commission):
+            return NotImplemented
+        return type(self) is type(other) and self._values(self) == other._values(other)
+
+    def __hash__(self):
+        return hash(self._values(self))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.FIELDS, self))
+        return f"{type(self).__name__}({fields})"
+
+
+class CommissionDetail(Commission):
+    __slots__ = ("notes",)
+    FIELDS = COLUMNS
+    _values = attrgetter(*COLUMNS)
+
+    def __init__(self, id, client, title, type, price, deadline, status, notes):
+        self.id = id
+        self.client = client
+        self.title = title
+        self.type = type
+        self.price = price
+        self.deadline = deadline
+        self.status = status
+        self.notes = notes
+
+
+# sqlite3 row factories, set per cursor so other queries keep plain tuples
+def _commission_row(cursor, row):
+    return Commission(*row)
+
+def _commission_detail_row(cursor, row):
+    return CommissionDetail(*row)
+
+def _fetch_commissions(sql, params=()):
+    cursor = get_connection().cursor()
+    cursor.row_factory = _commission_row
+    return cursor.execute(sql, params).fetchall()
+
+# validate_commission checks and normalizes one commission the way the add/edit
+# form does: client and title are required, price must be a number (blank is 0)
+# and deadline, if given, must be a YYYY-MM-DD date (blank is None). Text fields
+# must be strings or None, since values can also come from JSON or files.
+# Raises ValueError with a message fit to show the user; returns
+# (client, title, type_, price, deadline, status, notes).
+def validate_commission(client, title, type_, price, deadline, status, notes):
+    client = _text(client, "Client")
+    title = _text(title, "Title")
+    if not client or not title:
+        raise ValueError("Client and Title are required fields.")
+
+    if isinstance(price, str):
+        price = price.strip()
+    if price in (None, ""):
+        price = 0.0
+    elif isinstance(price, bool) or not isinstance(price, (int, float, str)):
+        raise ValueError("Price must be a number.")
+    else:
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            raise ValueError("Price must be a number.") from None
+
+    deadline = _text(deadline, "Deadline")
+    if deadline:
+        try:
+            deadline = datetime.datetime.strptime(deadline, "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            raise ValueError("Deadline must be in YYYY-MM-DD format.") from None
+    else:
+        deadline = None
+
+    type_ = _text(type_, "Type") or None
+    status = _text(status, "Status")
+    notes = _text(notes, "Notes")
+    return client, title, type_, price, deadline, status, notes
+
+def _text(value, label):
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{label} must be text.")
+    return value.strip()
 
 # add_commission function takes in the commission info and adds a commission to the database 
 def add_commission(client, title, type_, price, deadline, status, notes):
@@ -29,18 +677,20 @@ def add_commission(client, title, type_, price, deadline, status, notes):
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO commissions (client, title, type, price, deadline, status, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, NULLIF(?, ''), ?, ?)
     """, (client, title, type_, price, deadline, status, notes))
-    conn.commit()
-    conn.close()
+    _commit(conn)
+    _invalidate(inserted=True)
+    return cursor.lastrowid
 
 # get_commission returns one commission by its unique ID
+@_cached(row_scoped=True)
 def get_commission_by_id(comm_id):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM commissions WHERE id = ?", (comm_id,))
+    cursor.row_factory = _commission_detail_row
+    cursor.execute(f"{_DETAIL_SELECT} WHERE id = ?", (comm_id,))
     row = cursor.fetchone()
-    conn.close()
     return row
 
 # update_commission updates/overwrites the information for a specific commission
@@ -49,112 +699,1086 @@ def update_commission(comm_id, client, title, type_, price, deadline, status, no
     cursor = conn.cursor()
     cursor.execute("""
         UPDATE commissions
-        SET client=?, title=?, type=?, price=?, deadline=?, status=?, notes=?
+        SET client=?, title=?, type=?, price=?, deadline=NULLIF(?, ''), status=?, notes=?
         WHERE id=?
     """, (client, title, type_, price, deadline, status, notes, comm_id))
-    conn.commit()
-    conn.close()
+    _commit(conn)
+    _invalidate([comm_id])
 
 # delete_commission gets a commission according to its ID and deletes it from the database
 def delete_commission(comm_id):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM commissions WHERE id = ?", (comm_id,))
-    conn.commit()
-    conn.close()
+    _commit(conn)
+    _invalidate([comm_id])
 
 # mark_complete takes a commission according to its ID and updates its status column in the database
 def mark_complete(comm_id):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("UPDATE commissions SET status = 'Completed' WHERE id = ?", (comm_id,))
-    conn.commit()
-    conn.close()
+    _commit(conn)
+    _invalidate([comm_id])
 
-# get_commissions_by_status grabs commissions that matches a certain status
-def get_commissions_by_status(status):
+# add_commissions_many inserts many commissions in one transaction.
+# rows is an iterable of (client, title, type_, price, deadline, status, notes)
+def add_commissions_many(rows):
+    conn = get_connection()
+    with transaction():
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO commissions (client, title, type, price, deadline, status, notes)
+            VALUES (?, ?, ?, ?, NULLIF(?, ''), ?, ?)
+        """, rows)
+        _invalidate(inserted=True)
+        return cursor.rowcount
+
+# update_commissions_many overwrites many commissions in one transaction.
+# rows is an iterable of (comm_id, client, title, type_, price, deadline, status, notes),
+# the same argument order as update_commission
+def update_commissions_many(rows):
+    rows = list(rows)
+    conn = get_connection()
+    with transaction():
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE commissions
+            SET client=?, title=?, type=?, price=?, deadline=NULLIF(?, ''), status=?, notes=?
+            WHERE id=?
+        """, ((*row[1:], row[0]) for row in rows))
+        _invalidate(row[0] for row in rows)
+        return cursor.rowcount
+
+# delete_commissions deletes every commission in comm_ids in one transaction
+def delete_commissions(comm_ids):
+    comm_ids = list(comm_ids)
+    conn = get_connection()
+    with transaction():
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM commissions WHERE id = ?", ((cid,) for cid in comm_ids))
+        _invalidate(comm_ids)
+        return cursor.rowcount
+
+# mark_complete_many marks every commission in comm_ids as Completed in one transaction
+def mark_complete_many(comm_ids):
+    comm_ids = list(comm_ids)
+    conn = get_connection()
+    with transaction():
+        cursor = conn.cursor()
+        cursor.executemany(
+            "UPDATE commissions SET status = 'Completed' WHERE id = ?",
+            ((cid,) for cid in comm_ids),
+        )
+        _invalidate(comm_ids)
+        return cursor.rowcount
+
+# _filter_where turns filter keyword arguments into SQL conditions and params:
+#   status    one status ("All" or None for any)
+#   type_     one commission type
+#   client    client name, case-insensitive
+#   due_before  deadline earlier than this YYYY-MM-DD date
+#   overdue   True for unfinished commissions whose deadline has passed
+def _filter_where(status=None, type_=None, client=None, due_before=None, overdue=False):
+    clauses, params = [], []
+    if not (status is None or status == "All"):
+        clauses.append("status = ?")
+        params.append(status)
+    if type_ is not None:
+        clauses.append("type = ?")
+        params.append(type_)
+    if client is not None:
+        clauses.append("client = ? COLLATE NOCASE")
+        params.append(client)
+    if due_before is not None:
+        clauses.append("deadline < ?")
+        params.append(due_before)
+    if overdue:
+        clauses.append("status IS NOT 'Completed' AND deadline < date('now', 'localtime')")
+    return clauses, params
+
+# mark_complete_where marks every commission matching the filters (see
+# _filter_where) as Completed with a single UPDATE. Returns how many changed.
+def mark_complete_where(**filters):
+    clauses, params = _filter_where(**filters)
+    clauses.append("status IS NOT 'Completed'")
+    return _write_where("UPDATE commissions SET status = 'Completed'", clauses, params)
+
+# delete_where deletes every commission matching the filters with a single
+# DELETE; with no filters that is every commission. Returns how many were deleted.
+def delete_where(**filters):
+    return _write_where("DELETE FROM commissions", *_filter_where(**filters))
+
+def _write_where(statement, clauses, params):
+    if clauses:
+        statement += " WHERE " + " AND ".join(clauses)
+    conn = get_connection()
+    with transaction():
+        # RETURNING hands back the touched ids for cache invalidation without a second scan
+        ids = [row[0] for row in conn.execute(statement + " RETURNING id", params)]
+        _invalidate(ids)
+    return len(ids)
+
+# iter_commissions streams commissions in id order (or sort_by order) without
+# loading them all: rows are fetched chunk_size at a time, so memory stays flat
+# however big the table is. Everything comes from one read snapshot. filters
+# narrow it down like mark_complete_where; include_archived=True adds archived
+# commissions.
+def iter_commissions(status=None, sort_by="id", chunk_size=1000, **filters):
+    return _iter_query(*_commissions_query(status, sort_by, ", ".join(COLUMNS), **filters), chunk_size=chunk_size,
+                       row_factory=_commission_detail_row)
+
+def _iter_query(sql, params=(), chunk_size=1000, row_factory=None):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM commissions WHERE status = ?", (status,))
-    rows = cursor.fetchall()
-    conn.close()
+    cursor.row_factory = row_factory
+    cursor.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+ANALYTICS_COLUMNS = ("id", "client", "type", "price", "deadline", "status", "created_at", "completed_at")
+_ANALYTICS_SELECT = """
+    SELECT c.id, c.client, c.type, c.price, c.deadline, c.status, d.created_at, d.completed_at
+    FROM commissions c LEFT JOIN commission_dates d ON d.id = c.id
+"""
+# archived commissions keep their dates in the archive row itself. A commission
+# caught mid-unarchive (in both places) is only read from commissions.
+_ARCHIVED_ANALYTICS_SELECT = """
+    SELECT a.id, a.client, a.type, a.price, a.deadline, a.status, a.created_at, a.completed_at
+    FROM archive.commissions a
+    WHERE NOT EXISTS (SELECT 1 FROM main.commissions m WHERE m.id = a.id)
+"""
+
+# iter_analytics_rows streams just the ANALYTICS_COLUMNS of every commission in
+# id order (no title or notes), for building in-memory statistics.
+# include_archived adds archived commissions, still in id order.
+def iter_analytics_rows(chunk_size=10000, include_archived=False):
+    if include_archived and _attach_archive(get_connection()):
+        sql = f"SELECT * FROM ({_ANALYTICS_SELECT} UNION ALL {_ARCHIVED_ANALYTICS_SELECT}) ORDER BY id"
+        return _iter_query(sql, chunk_size=chunk_size)
+    return _iter_query(_ANALYTICS_SELECT + " ORDER BY c.id", chunk_size=chunk_size)
+
+# get_analytics_rows returns ANALYTICS_COLUMNS for the given commission ids,
+# looking in the archive too with include_archived
+def get_analytics_rows(comm_ids, include_archived=False):
+    conn = get_connection()
+    archived = include_archived and _attach_archive(conn)
+    comm_ids = list(comm_ids)
+    rows = []
+    for start in range(0, len(comm_ids), 500):
+        chunk = comm_ids[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        rows += conn.execute(f"{_ANALYTICS_SELECT} WHERE c.id IN ({placeholders})", chunk).fetchall()
+        if archived:
+            rows += conn.execute(f"{_ARCHIVED_ANALYTICS_SELECT} AND a.id IN ({placeholders})", chunk).fetchall()
     return rows
 
-def get_commissions(status=None, sort_by="deadline"):
+# get_completed_prices returns (type, price) for every Completed commission
+# with a price above 0, archived ones too with include_archived, for
+# calibrating the quote rates from what was actually charged
+def get_completed_prices(include_archived=False):
+    sql, params = _with_archived("SELECT type, price FROM commissions",
+                                 ["status = 'Completed'", "price > 0"], [], include_archived)
+    return get_connection().execute(sql, params).fetchall()
+
+# get_import_progress returns how many rows of `source` an earlier import committed
+def get_import_progress(source):
+    conn = get_connection()
+    row = conn.execute("SELECT rows_done FROM import_progress WHERE source = ?", (source,)).fetchone()
+    return row[0] if row else 0
+
+# add_import_chunk inserts rows and records that `rows_done` rows of `source`
+# have been consumed, in the same transaction, so a resumed import never
+# duplicates or skips a chunk
+def add_import_chunk(source, rows, rows_done):
+    conn = get_connection()
+    with transaction():
+        add_commissions_many(rows)
+        conn.execute("""
+            INSERT INTO import_progress (source, rows_done, updated_at) VALUES (?, ?, datetime('now'))
+            ON CONFLICT (source) DO UPDATE SET rows_done = excluded.rows_done, updated_at = excluded.updated_at
+        """, (source, rows_done))
+
+# clear_import_progress forgets an import, so the same source would be read from the start
+def clear_import_progress(source):
+    conn = get_connection()
+    conn.execute("DELETE FROM import_progress WHERE source = ?", (source,))
+    _commit(conn)
+
+# CHANGE_LOG_KEEP is how many of the newest change log entries prune_changes keeps
+CHANGE_LOG_KEEP = 10000
+# how far restart_change_log skips ahead, to stay above revisions handed out
+# by writes that raced with the restart
+RESTART_REV_GAP = 1000
+
+# get_revision returns the newest change log revision (0 if nothing has been written).
+# Remember it before reading rows, then pass it to get_changes_since later on.
+def get_revision():
+    conn = get_connection()
+    return conn.execute("SELECT IFNULL(MAX(rev), 0) FROM changes").fetchone()[0]
+
+# get_changes_since returns (revision, changed_rows, deleted_ids) describing every
+# commission written after revision `since`. changed_rows are full rows as they
+# are now; deleted_ids are commissions that no longer exist. Returns None if the
+# log has been pruned past `since` or restarted after it (restart_change_log),
+# in which case the caller should reload.
+def get_changes_since(since):
+    conn = get_connection()
+    # separate subqueries so each is a single b-tree seek (MIN and MAX together scan)
+    oldest, newest = conn.execute(
+        "SELECT (SELECT MIN(rev) FROM changes), (SELECT MAX(rev) FROM changes)"
+    ).fetchone()
+    if newest is None or newest < since:
+        # the log only moves backwards when the data was replaced under it
+        return None if since else (0, [], [])
+    if newest == since:
+        return since, [], []
+    ids = _changed_ids(conn, since, newest, oldest)
+    if ids is None:
+        return None
+
+    rows = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        for row in _fetch_commissions(f"{_LIST_SELECT} WHERE id IN ({placeholders})", chunk):
+            rows[row.id] = row
+
+    changed = [rows[cid] for cid in ids if cid in rows]
+    deleted = [cid for cid in ids if cid not in rows]
+    return newest, changed, deleted
+
+# _changed_ids returns the ids of the commissions written in revisions
+# (since, newest], or None when the log no longer covers all of them: it was
+# pruned past since, or restarted (an 'R' row) somewhere in the range
+def _changed_ids(conn, since, newest, oldest=None):
+    if oldest is None:
+        oldest = conn.execute("SELECT MIN(rev) FROM changes").fetchone()[0]
+    if oldest is None or oldest > since + 1:
+        return None
+    if conn.execute(
+        "SELECT 1 FROM changes WHERE rev > ? AND rev <= ? AND op = 'R' LIMIT 1", (since, newest)
+    ).fetchone():
+        return None
+    return [row[0] for row in conn.execute(
+        "SELECT DISTINCT commission_id FROM changes WHERE rev > ? AND rev <= ?", (since, newest)
+    )]
+
+# prune_changes trims the change log down to its newest CHANGE_LOG_KEEP entries.
+# It runs at start and then every PRUNE_EVERY commits; a reader holding a
+# revision older than what is kept gets None from get_changes_since and reloads.
+def prune_changes(keep=None):
+    keep = CHANGE_LOG_KEEP if keep is None else keep
+    conn = get_connection()
+    # separate subqueries so each is a single b-tree seek (MIN and MAX together scan)
+    oldest, newest = conn.execute(
+        "SELECT (SELECT MIN(rev) FROM changes), (SELECT MAX(rev) FROM changes)"
+    ).fetchone()
+    if newest is None or newest - oldest < keep:
+        return
+    conn.execute("DELETE FROM changes WHERE rev <= ?", (newest - keep,))
+    _commit(conn)
+
+# restart_change_log empties the change log and continues it RESTART_REV_GAP
+# past after_rev with a restart ('R') row. get_changes_since returns None for
+# any revision before that row, so every reader reloads, including one that saw
+# a write made after after_rev was read. For when the data was replaced
+# wholesale (a restored backup) and the log no longer describes what readers
+# have seen.
+def restart_change_log(after_rev):
+    conn = get_connection()
+    seq = after_rev + RESTART_REV_GAP
+    with transaction():
+        conn.execute("DELETE FROM changes")
+        updated = conn.execute(
+            "UPDATE sqlite_sequence SET seq = ? WHERE name = 'changes'", (seq,)
+        ).rowcount
+        if not updated:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('changes', ?)", (seq,))
+        # the marker row lands at seq + 1; commission id 0 never exists
+        conn.execute("INSERT INTO changes (commission_id, op) VALUES (0, 'R')")
+    clear_cache()
+
+# get_commissions_by_status grabs commissions that matches a certain status
+@_cached()
+def get_commissions_by_status(status):
+    rows = _fetch_commissions(f"{_LIST_SELECT} WHERE status = ?", (status,))
+    return rows
+
+# ACTIVE_STATUSES are the statuses idx_commissions_active_deadline covers
+ACTIVE_STATUSES = ("Not Started", "In Progress")
+_ACTIVE_STATUSES_SQL = "('Not Started', 'In Progress')"
+
+# get_active_commissions returns the first `limit` commissions with one of
+# `statuses`, soonest deadline first. For the default statuses the filter is
+# written out literally and pinned to the partial index (without ANALYZE data
+# the planner would rather use the status index and sort), so only `limit`
+# index entries are read however large the table is.
+@_cached()
+def get_active_commissions(limit=10, statuses=ACTIVE_STATUSES):
+    statuses = tuple(statuses)
+    if set(statuses) == set(ACTIVE_STATUSES):
+        sql = (
+            f"{_LIST_SELECT} INDEXED BY idx_commissions_active_deadline "
+            f"WHERE status IN {_ACTIVE_STATUSES_SQL} ORDER BY deadline LIMIT ?"
+        )
+        params = (limit,)
+    else:
+        placeholders = ", ".join("?" * len(statuses))
+        sql = f"{_LIST_SELECT} WHERE status IN ({placeholders}) ORDER BY deadline LIMIT ?"
+        params = (*statuses, limit)
+    return _fetch_commissions(sql, params)
+
+# get_commissions_due_between returns commissions whose deadline falls between
+# start and end (YYYY-MM-DD, both inclusive; None leaves that end open), soonest
+# first. Commissions without a deadline are never included. statuses=None means
+# any status. Each case is a range scan of a deadline index: the partial active
+# index for ACTIVE_STATUSES, (status, deadline) for other statuses, and the
+# plain deadline index for any status.
+@_cached()
+def get_commissions_due_between(start=None, end=None, statuses=ACTIVE_STATUSES, limit=None):
+    clauses, params = ["deadline IS NOT NULL"], []
+    if start is not None:
+        clauses.append("deadline >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("deadline <= ?")
+        params.append(end)
+
+    if statuses is None:
+        sql = f"{_LIST_SELECT} INDEXED BY idx_commissions_deadline"
+    elif set(statuses) == set(ACTIVE_STATUSES):
+        sql = f"{_LIST_SELECT} INDEXED BY idx_commissions_active_deadline"
+        clauses.append(f"status IN {_ACTIVE_STATUSES_SQL}")
+    else:
+        statuses = tuple(statuses)
+        sql = f"{_LIST_SELECT} INDEXED BY idx_commissions_status_deadline"
+        clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+
+    sql += " WHERE " + " AND ".join(clauses) + " ORDER BY deadline, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return _fetch_commissions(sql, params)
+
+# get_overdue returns unfinished commissions whose deadline was before today,
+# most overdue first
+def get_overdue(statuses=ACTIVE_STATUSES, limit=None):
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    return get_commissions_due_between(None, yesterday.isoformat(), statuses, limit)
+
+# get_due_within returns unfinished commissions due from today through `days`
+# days from now (0 = due today), soonest first
+def get_due_within(days=7, statuses=ACTIVE_STATUSES, limit=None):
+    today = datetime.date.today()
+    end = today + datetime.timedelta(days=days)
+    return get_commissions_due_between(today.isoformat(), end.isoformat(), statuses, limit)
+
+# SORT_COLUMNS maps the sort_by keys accepted by get_commissions to ORDER BY
+# expressions. Each expression matches an index created in MIGRATIONS.
+SORT_COLUMNS = {
+    "id": "id",
+    "client": "client COLLATE NOCASE",
+    "title": "title COLLATE NOCASE",
+    "type": "type COLLATE NOCASE",
+    "price": "price",
+    "deadline": "deadline",
+    "status": "status COLLATE NOCASE",
+}
+
+def _commissions_query(status, sort_by, columns=", ".join(LIST_COLUMNS), include_archived=False, **filters):
+    order_clause = SORT_COLUMNS.get(sort_by, "deadline")
+    clauses, params = _filter_where(status, **filters)
+    select, params = _with_archived(f"SELECT {columns} FROM commissions", clauses, params, include_archived)
+    if sort_by == "status" and not (status is None or status == "All"):
+        # every row has the same status, so fall back to id order instead of sorting
+        order_clause = "id"
+    return f"{select} ORDER BY {order_clause} ASC", tuple(params)
+
+# _with_archived adds the WHERE clauses to select and, with include_archived
+# (and an archive to read), a UNION ALL of the same query over archived rows.
+# An ORDER BY appended afterwards sorts the combined rows.
+def _with_archived(select, clauses, params, include_archived):
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    if include_archived and _attach_archive(get_connection()):
+        archived = select.replace(" FROM commissions", " FROM archive.commissions", 1)
+        return f"{select}{where} UNION ALL {archived}{where}", list(params) * 2
+    return select + where, list(params)
+
+@_cached()
+def get_commissions(status=None, sort_by="deadline", include_archived=False):
     """
     status: None or "All" or one of STATUS_OPTIONS
     sort_by: one of: id, client, title, type, price, deadline, status
+    include_archived: also return archived commissions
     """
-    allowed = {
-        "id": "id",
-        "client": "client COLLATE NOCASE",
-        "title": "title COLLATE NOCASE",
-        "type": "type COLLATE NOCASE",
-        "price": "price",
-        "deadline": "deadline",
-        "status": "status COLLATE NOCASE",
-    }
+    rows = _fetch_commissions(*_commissions_query(status, sort_by, include_archived=include_archived))
+    return rows
 
-    order_clause = allowed.get(sort_by, "deadline")
+PAGE_SIZE = 200
 
-    conn = get_connection()
-    cursor = conn.cursor()
+# get_commissions_page returns one page of get_commissions(status, sort_by) using
+# keyset pagination: after_key is the (sort value, id) of the last row already
+# shown, or None for the first page. Each page is a bounded index range scan,
+# so late pages cost the same as the first one (unlike OFFSET).
+# Returns (rows, next_key); next_key is None once the last page has been read.
+# filters narrow the rows down further, like mark_complete_where, and
+# include_archived adds archived commissions.
+def get_commissions_page(status=None, sort_by="deadline", after_key=None, limit=PAGE_SIZE,
+                         include_archived=False, **filters):
+    sort_by = _page_sort_by(status, sort_by)
+    where, base_params = _filter_where(status, **filters)
+    column = sort_by if sort_by != "id" else None
+    order_expr = SORT_COLUMNS[sort_by]
+
+    def fetch(extra_where, params, order_clause, n):
+        sql, params = _with_archived(_LIST_SELECT, where + extra_where, base_params + params, include_archived)
+        return _fetch_commissions(f"{sql} ORDER BY {order_clause} LIMIT ?", params + [n])
 
-    if status is None or status == "All":
-        cursor.execute(f"SELECT * FROM commissions ORDER BY {order_clause} ASC")
+    if column is None:
+        if after_key is None:
+            rows = fetch([], [], "id", limit)
+        else:
+            rows = fetch(["id > ?"], [after_key[1]], "id", limit)
+    elif after_key is None:
+        rows = fetch([], [], f"{order_expr}, id", limit)
+    elif after_key[0] is None:
+        # NULLs sort first: finish the NULL run by id, then continue with the rest
+        rows = fetch([f"{column} IS NULL", "id > ?"], [after_key[1]], "id", limit)
+        if len(rows) < limit:
+            rows += fetch([f"{column} IS NOT NULL"], [], f"{order_expr}, id", limit - len(rows))
     else:
-        cursor.execute(f"SELECT * FROM commissions WHERE status = ? ORDER BY {order_clause} ASC", (status,))
+        # written as a >= range plus a tie-break so the index can seek straight
+        # to the key, which a row-value comparison behind "status = ?" does not do
+        value, last_id = after_key
+        rows = fetch([f"{order_expr} >= ?", f"({order_expr} > ? OR id > ?)"],
+                     [value, value, last_id], f"{order_expr}, id", limit)
 
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    if len(rows) < limit:
+        return rows, None
+    last = rows[-1]
+    return rows, (getattr(last, sort_by), last.id)
 
+def _page_sort_by(status, sort_by):
+    if sort_by not in SORT_COLUMNS:
+        return "deadline"
+    if sort_by == "status" and not (status is None or status == "All"):
+        return "id"
+    return sort_by
 
-# get_summary calculates total comissions, completed comissions, and total income
-def get_summary():
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# sort_key returns a Python value that orders rows exactly like
+# get_commissions_page(status, sort_by) does: NULLs first, then numbers, then
+# text (ASCII-only case folding for the NOCASE columns), ties broken by id
+def sort_key(row, status=None, sort_by="deadline"):
+    sort_by = _page_sort_by(status, sort_by)
+    if sort_by == "id":
+        return ((1, row.id), row.id)
+    value = getattr(row, sort_by)
+    if value is None:
+        return ((0, 0), row.id)
+    if isinstance(value, str):
+        if "NOCASE" in SORT_COLUMNS[sort_by]:
+            value = value.translate(_ASCII_LOWER)
+        return ((2, value), row.id)
+    return ((1, value), row.id)
+
+# count_commissions returns how many commissions match a status filter;
+# include_archived adds archived ones (from archive_stats, no scan)
+@_cached()
+def count_commissions(status=None, include_archived=False):
     conn = get_connection()
-    cursor = conn.cursor()
+    filtered = not (status is None or status == "All")
+    archived = count_archived(status) if include_archived else 0
+    if stats_table_enabled():
+        sql = "SELECT IFNULL(SUM(count), 0) FROM commission_stats"
+    else:
+        sql = "SELECT COUNT(*) FROM commissions"
+    if filtered:
+        return conn.execute(sql + " WHERE status = ?", (status,)).fetchone()[0] + archived
+    return conn.execute(sql).fetchone()[0] + archived
+
+# bm25 column weights for commissions_fts: a hit in client counts most, then title, then notes
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+
+# _fts_query turns what the user typed into an FTS5 query: every word must
+# match, and the last one as a prefix so results update while typing
+def _fts_query(text):
+    words = text.split()
+    if not words:
+        return None
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+# search_commissions returns commissions whose client, title or notes match
+# `query`, best matches first (bm25). status limits results like get_commissions.
+def search_commissions(query, status=None, limit=100):
+    match = _fts_query(query)
+    if match is None:
+        return []
+
+    weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+    sql = f"""
+        SELECT {", ".join("c." + name for name in LIST_COLUMNS)} FROM commissions_fts
+        JOIN commissions c ON c.id = commissions_fts.rowid
+        WHERE commissions_fts MATCH ?
+    """
+    params = [match]
+    if not (status is None or status == "All"):
+        sql += " AND c.status = ?"
+        params.append(status)
+    sql += f" ORDER BY bm25(commissions_fts, {weights}) LIMIT ?"
+    params.append(limit)
+    return _fetch_commissions(sql, params)
+
+# explain_query_plan returns SQLite's EXPLAIN QUERY PLAN detail lines for a query
+def explain_query_plan(sql, params=()):
+    conn = get_connection()
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+# get_commissions_plan returns the query plan get_commissions would use,
+# handy for checking that a filter/sort combination is served by an index
+def get_commissions_plan(status=None, sort_by="deadline"):
+    return explain_query_plan(*_commissions_query(status, sort_by))
+
+
+# STATS_TABLE_SQL creates commission_stats, a small table with one row per
+# (status, type) pair that triggers keep in step with commissions. Reading the
+# dashboard numbers from it costs the same no matter how big commissions gets.
+STATS_TABLE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS commission_stats (
+        status TEXT NOT NULL,
+        type TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        income REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (status, type)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_commission_stats_insert
+    AFTER INSERT ON commissions
+    BEGIN
+        INSERT INTO commission_stats (status, type, count, income)
+        VALUES (IFNULL(NEW.status, ''), COALESCE(NEW.type, 'Other'), 1, IFNULL(NEW.price, 0))
+        ON CONFLICT (status, type) DO UPDATE
+        SET count = count + 1, income = income + excluded.income;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_commission_stats_delete
+    AFTER DELETE ON commissions
+    BEGIN
+        UPDATE commission_stats
+        SET count = count - 1, income = income - IFNULL(OLD.price, 0)
+        WHERE status = IFNULL(OLD.status, '') AND type = COALESCE(OLD.type, 'Other');
+        DELETE FROM commission_stats WHERE count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_commission_stats_update
+    AFTER UPDATE OF status, type, price ON commissions
+    BEGIN
+        UPDATE commission_stats
+        SET count = count - 1, income = income - IFNULL(OLD.price, 0)
+        WHERE status = IFNULL(OLD.status, '') AND type = COALESCE(OLD.type, 'Other');
+        INSERT INTO commission_stats (status, type, count, income)
+        VALUES (IFNULL(NEW.status, ''), COALESCE(NEW.type, 'Other'), 1, IFNULL(NEW.price, 0))
+        ON CONFLICT (status, type) DO UPDATE
+        SET count = count + 1, income = income + excluded.income;
+        DELETE FROM commission_stats WHERE count <= 0;
+    END
+    """,
+]
+
+# USE_STATS_TABLE turns the trigger-maintained commission_stats table on or off
+# when initialize_database runs
+USE_STATS_TABLE = True
+
+# The same (status, type, count, income) rows commission_stats holds, computed
+# straight from commissions in one grouped pass
+STATS_AGGREGATE_SQL = """
+    SELECT IFNULL(status, ''), COALESCE(type, 'Other'), COUNT(*), TOTAL(price)
+    FROM commissions
+    GROUP BY IFNULL(status, ''), COALESCE(type, 'Other')
+"""
+
+# stats_table_enabled reports whether commission_stats and its triggers exist
+def stats_table_enabled():
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_commission_stats_%'"
+    ).fetchone()
+    return row[0] == 3
 
-    cursor.execute("SELECT COUNT(*) FROM commissions")
-    total = cursor.fetchone()[0]
+# enable_commission_stats creates commission_stats and its triggers and fills it.
+# Does nothing if it is already enabled.
+def enable_commission_stats():
+    if stats_table_enabled():
+        return
+    conn = get_connection()
+    with transaction():
+        # checked again under the write lock, in case another process got here first
+        if stats_table_enabled():
+            return
+        for statement in STATS_TABLE_SQL:
+            conn.execute(statement)
+        _fill_commission_stats(conn)
+
+# disable_commission_stats drops commission_stats and its triggers; summaries
+# then fall back to aggregating commissions directly
+def disable_commission_stats():
+    conn = get_connection()
+    with transaction():
+        conn.execute("DROP TRIGGER IF EXISTS trg_commission_stats_insert")
+        conn.execute("DROP TRIGGER IF EXISTS trg_commission_stats_delete")
+        conn.execute("DROP TRIGGER IF EXISTS trg_commission_stats_update")
+        conn.execute("DROP TABLE IF EXISTS commission_stats")
+
+def _fill_commission_stats(conn):
+    conn.execute("DELETE FROM commission_stats")
+    conn.execute(f"INSERT INTO commission_stats (status, type, count, income) {STATS_AGGREGATE_SQL}")
+
+# rebuild_commission_stats recomputes commission_stats from scratch
+def rebuild_commission_stats():
+    conn = get_connection()
+    with transaction():
+        _fill_commission_stats(conn)
+
+# check_commission_stats recomputes the stats from commissions and compares them
+# with commission_stats. Returns a list of (status, type, stored, expected)
+# mismatches, empty when the two agree.
+def check_commission_stats(tolerance=0.005):
+    conn = get_connection()
+    stored = {(s, t): (c, inc) for s, t, c, inc in
+              conn.execute("SELECT status, type, count, income FROM commission_stats")}
+    expected = {(s, t): (c, inc) for s, t, c, inc in conn.execute(STATS_AGGREGATE_SQL)}
 
-    cursor.execute("SELECT COUNT(*) FROM commissions WHERE status='Completed'")
-    completed = cursor.fetchone()[0]
+    mismatches = []
+    for key in sorted(stored.keys() | expected.keys()):
+        have = stored.get(key, (0, 0.0))
+        want = expected.get(key, (0, 0.0))
+        if have[0] != want[0] or abs(have[1] - want[1]) > tolerance:
+            mismatches.append((key[0], key[1], have, want))
+    return mismatches
 
-    cursor.execute("SELECT COUNT(*) FROM commissions WHERE status='In Progress'")
-    in_progress = cursor.fetchone()[0]
+def _stats_rows(include_archived=False):
+    conn = get_connection()
+    if stats_table_enabled():
+        rows = conn.execute("SELECT status, type, count, income FROM commission_stats").fetchall()
+    else:
+        rows = conn.execute(STATS_AGGREGATE_SQL).fetchall()
+    if include_archived and _attach_archive(conn):
+        rows += conn.execute("SELECT status, type, count, income FROM archive.archive_stats").fetchall()
+    return rows
 
-    cursor.execute("SELECT COUNT(*) FROM commissions WHERE status='Not Started'")
-    not_started = cursor.fetchone()[0]
+# get_dashboard_stats returns (get_summary(), get_income_by_type()) from a single
+# read, so the dashboard does not have to query twice. include_archived adds
+# the archived commissions' precomputed totals.
+def get_dashboard_stats(include_archived=False):
+    summary, income_by_type = _dashboard_stats(include_archived)
+    return summary, list(income_by_type)
 
-    cursor.execute("SELECT SUM(price) FROM commissions WHERE status='Completed'")
-    income = cursor.fetchone()[0] or 0
+@_cached()
+def _dashboard_stats(include_archived=False):
+    total = completed = in_progress = not_started = 0
+    income = 0.0
+    by_type = {}
 
-    conn.close()
-    return total, completed, in_progress, not_started, income
+    for status, type_, count, type_income in _stats_rows(include_archived):
+        total += count
+        if status == "Completed":
+            completed += count
+            income += type_income
+            by_type[type_] = by_type.get(type_, 0.0) + type_income
+        elif status == "In Progress":
+            in_progress += count
+        elif status == "Not Started":
+            not_started += count
+
+    income_by_type = tuple(sorted(((t, v) for t, v in by_type.items() if v > 0),
+                                  key=lambda item: item[1], reverse=True))
+    return (total, completed, in_progress, not_started, income), income_by_type
+
+# get_summary calculates total comissions, completed comissions, and total income
+def get_summary(include_archived=False):
+    return get_dashboard_stats(include_archived)[0]
 
 # get_income_by_type 
-def get_income_by_type():
+def get_income_by_type(include_archived=False):
     """
     Returns [(type, total_income), ...] for Completed commissions only
     """
+    return get_dashboard_stats(include_archived)[1]
+
+
+# Archive. Completed commissions older than ARCHIVE_AFTER_DAYS can be moved out
+# of commissions into a second database file, attached to connections as
+# "archive" when needed. Day-to-day lists, sorts and summaries then only touch
+# active work; functions that take include_archived=True add the archived rows
+# back in. archive_stats holds per (status, type) counts and income of the
+# archived rows, kept by triggers like commission_stats, so archived totals
+# never need a scan. Ids are never reused (AUTOINCREMENT), so an archived
+# commission keeps its id.
+ARCHIVE_AFTER_DAYS = 365
+# rows moved per transaction, so writers are only held up briefly
+ARCHIVE_BATCH = 1000
+# archive file; None means next to DB_NAME, e.g. commissions_archive.db
+ARCHIVE_NAME = None
+
+ARCHIVE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.commissions (
+        id INTEGER PRIMARY KEY,
+        client TEXT NOT NULL,
+        title TEXT NOT NULL,
+        type TEXT,
+        price REAL,
+        deadline TEXT,
+        status TEXT,
+        notes TEXT,
+        created_at TEXT,
+        completed_at TEXT,
+        archived_at TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_deadline ON commissions(deadline)",
+    """
+    CREATE TABLE IF NOT EXISTS archive.archive_stats (
+        status TEXT NOT NULL,
+        type TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        income REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (status, type)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS archive.trg_archive_stats_insert
+    AFTER INSERT ON commissions
+    BEGIN
+        INSERT INTO archive_stats (status, type, count, income)
+        VALUES (IFNULL(NEW.status, ''), COALESCE(NEW.type, 'Other'), 1, IFNULL(NEW.price, 0))
+        ON CONFLICT (status, type) DO UPDATE
+        SET count = count + 1, income = income + excluded.income;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS archive.trg_archive_stats_delete
+    AFTER DELETE ON commissions
+    BEGIN
+        UPDATE archive_stats
+        SET count = count - 1, income = income - IFNULL(OLD.price, 0)
+        WHERE status = IFNULL(OLD.status, '') AND type = COALESCE(OLD.type, 'Other');
+        DELETE FROM archive_stats WHERE count <= 0;
+    END
+    """,
+]
+
+# archive_path returns the archive file for the current DB_NAME
+def archive_path():
+    if ARCHIVE_NAME is not None:
+        return ARCHIVE_NAME
+    root, ext = os.path.splitext(DB_NAME)
+    return f"{root}_archive{ext or '.db'}"
+
+# _attach_archive attaches the archive to conn (once per connection) and
+# returns True, or returns False when there is no archive file yet and create
+# is False, so read-only callers never create an empty one
+def _attach_archive(conn, create=False):
+    if any(row[1] == "archive" for row in conn.execute("PRAGMA database_list")):
+        return True
+    path = archive_path()
+    if not create and not os.path.exists(path):
+        return False
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    conn.execute("PRAGMA archive.journal_mode = WAL")
+    for statement in ARCHIVE_SQL:
+        conn.execute(statement)
+    return True
+
+_ARCHIVE_COPY_COLUMNS = ", ".join(COLUMNS) + ", created_at, completed_at"
+
+# archive_completed moves Completed commissions finished more than
+# older_than_days ago (by completion date, or deadline for commissions
+# completed before completion dates were recorded) into the archive.
+# Returns how many were moved.
+#
+# Each batch is copied into the archive in one transaction and then deleted
+# from commissions in a second one, so a crash in between leaves a row in both
+# places rather than in neither. _settle_archive clears such leftovers first.
+def archive_completed(older_than_days=None, batch_size=ARCHIVE_BATCH):
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
     conn = get_connection()
-    cursor = conn.cursor()
+    _attach_archive(conn, create=True)
+    _settle_archive(conn)
 
-    cursor.execute("""
-        SELECT COALESCE(type, 'Other') as type, SUM(price)
-        FROM commissions
-        WHERE status='Completed'
-        GROUP BY COALESCE(type, 'Other')
-        HAVING SUM(price) > 0
-        ORDER BY SUM(price) DESC
-    """)
-
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    moved = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in conn.execute("""
+            SELECT c.id FROM commissions c LEFT JOIN commission_dates d ON d.id = c.id
+            WHERE c.status = 'Completed' AND COALESCE(d.completed_at, c.deadline) < ? AND c.id > ?
+            ORDER BY c.id LIMIT ?
+        """, (cutoff, last_id, batch_size))]
+        if not ids:
+            break
+        placeholders = ", ".join("?" * len(ids))
+        with transaction():
+            conn.execute(f"""
+                INSERT INTO archive.commissions ({_ARCHIVE_COPY_COLUMNS}, archived_at)
+                SELECT {", ".join("c." + name for name in COLUMNS)}, d.created_at, d.completed_at,
+                       datetime('now', 'localtime')
+                FROM commissions c LEFT JOIN commission_dates d ON d.id = c.id
+                WHERE c.id IN ({placeholders})
+            """, ids)
+        with transaction():
+            conn.execute(f"DELETE FROM main.commissions WHERE id IN ({placeholders})", ids)
+            _invalidate(ids)
+        moved += len(ids)
+        last_id = ids[-1]
+    return moved
+
+# unarchive_commissions moves archived commissions back into commissions.
+# Returns how many were moved. They are copied back first and then removed
+# from the archive; if that is interrupted, _settle_archive keeps the archived
+# copy, so the commission simply stays archived.
+def unarchive_commissions(comm_ids):
+    comm_ids = list(comm_ids)
+    conn = get_connection()
+    if not _attach_archive(conn):
+        return 0
+    _settle_archive(conn)
+
+    moved = 0
+    for start in range(0, len(comm_ids), ARCHIVE_BATCH):
+        chunk = comm_ids[start:start + ARCHIVE_BATCH]
+        placeholders = ", ".join("?" * len(chunk))
+        with transaction():
+            ids = [row[0] for row in conn.execute(f"""
+                INSERT INTO main.commissions ({", ".join(COLUMNS)})
+                SELECT {", ".join(COLUMNS)} FROM archive.commissions WHERE id IN ({placeholders})
+                RETURNING id
+            """, chunk)]
+            # the insert trigger stamped today as the creation date; put the real dates back
+            conn.execute(f"""
+                INSERT OR REPLACE INTO commission_dates (id, created_at, completed_at)
+                SELECT id, created_at, completed_at FROM archive.commissions WHERE id IN ({placeholders})
+            """, chunk)
+            _invalidate(ids, inserted=True)
+        with transaction():
+            conn.execute(f"DELETE FROM archive.commissions WHERE id IN ({placeholders})", chunk)
+            # archived totals changed, and the change log doesn't see the archive
+            _invalidate()
+        moved += len(ids)
+    return moved
+
+# _settle_archive finishes a move that was interrupted between its two
+# transactions: a commission found in both places keeps its archived copy
+def _settle_archive(conn):
+    with transaction():
+        ids = [row[0] for row in conn.execute(
+            "DELETE FROM main.commissions WHERE id IN (SELECT id FROM archive.commissions) RETURNING id"
+        )]
+        if ids:
+            _invalidate(ids)
+
+# count_archived returns how many commissions are archived (with one status, if given)
+def count_archived(status=None):
+    conn = get_connection()
+    if not _attach_archive(conn):
+        return 0
+    sql = "SELECT IFNULL(SUM(count), 0) FROM archive.archive_stats"
+    if not (status is None or status == "All"):
+        return conn.execute(sql + " WHERE status = ?", (status,)).fetchone()[0]
+    return conn.execute(sql).fetchone()[0]
+
+
+# Optional instrumentation. enable_instrumentation() swaps every function in
+# INSTRUMENTED_FUNCTIONS for a timing wrapper and installs a trace callback on
+# each connection to count the SQL statements a call runs. Calls slower than
+# slow_query_ms are logged (to the "database.slow" logger and the in-memory
+# slow log) with the EXPLAIN QUERY PLAN of each SELECT they ran.
+# disable_instrumentation() puts the original functions back, so when it is
+# off there is no overhead at all.
+#
+# INSTRUMENTED_FUNCTIONS is every public function of this module (it is filled
+# in at the bottom of the file) except the ones below, which either don't
+# query the database or are the plumbing the wrapper itself relies on.
+NOT_INSTRUMENTED = {
+    "get_connection", "close_connections", "transaction",
+    "clear_cache", "get_cache_stats", "reset_cache_stats",
+    "validate_commission", "sort_key", "archive_path",
+    "enable_instrumentation", "disable_instrumentation", "instrumentation_enabled",
+    "get_metrics", "export_metrics",
+}
+# these return a number of rows written rather than rows read
+_ROWCOUNT_FUNCTIONS = {
+    "add_commissions_many", "update_commissions_many", "delete_commissions", "mark_complete_many",
+    "mark_complete_where", "delete_where", "archive_completed", "unarchive_commissions",
+}
+
+slow_query_log = logging.getLogger("database.slow")
+
+_metrics = None
+_uninstrumented = {}
+
+
+def _trace_statement(sql):
+    statements = getattr(_local, "statements", None)
+    if statements is not None:
+        statements.append(sql)
+
+
+def _row_count(name, result):
+    if result is None:
+        return 0
+    if name in _ROWCOUNT_FUNCTIONS:
+        return max(result, 0)
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])  # (rows, next_key) from get_commissions_page
+    return 1
+
+
+def _timed(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        metrics = _metrics
+        if metrics is None:
+            return fn(*args, **kwargs)
+
+        outer = getattr(_local, "statements", None)
+        statements = _local.statements = []
+        result = None
+        error = False
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, types.GeneratorType):
+                result = _timed_rows(metrics, name, result)
+            return result
+        except BaseException:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _local.statements = outer
+            if outer is not None:
+                outer.extend(statements)  # nested calls also count towards the caller
+            if not isinstance(result, types.GeneratorType):
+                metrics.record(name, elapsed, _row_count(name, result), len(statements), error)
+                if elapsed >= metrics.slow_query_s and outer is None:
+                    _log_slow_call(metrics, name, elapsed, statements)
+    wrapper.__wrapped_uninstrumented__ = fn
+    return wrapper
+
+
+# _timed_rows times a streaming function (iter_commissions and the like) while
+# its rows are pulled, and records the call once the stream is finished or
+# closed. Only the time spent fetching counts, not the caller's work between rows.
+def _timed_rows(metrics, name, rows):
+    statements = []
+    elapsed = 0.0
+    count = 0
+    error = False
+    try:
+        while True:
+            outer = getattr(_local, "statements", None)
+            _local.statements = statements
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+                _local.statements = outer
+            count += 1
+            yield row
+    except Exception:
+        error = True
+        raise
+    finally:
+        rows.close()
+        metrics.record(name, elapsed, count, len(statements), error)
+
+
+def _log_slow_call(metrics, name, elapsed, statements):
+    conn = get_connection()
+    explained = []
+    for sql in statements:
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if head not in ("SELECT", "WITH"):
+            explained.append((sql, []))
+            continue
+        try:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        except sqlite3.Error as e:
+            plan = [f"(could not explain: {e})"]
+        explained.append((sql, plan))
+
+    metrics.record_slow(name, elapsed, explained)
+    if slow_query_log.isEnabledFor(logging.WARNING):
+        details = "\n".join(f"  {sql}\n" + "".join(f"    {line}\n" for line in plan) for sql, plan in explained)
+        slow_query_log.warning("slow call %s took %.1f ms\n%s", name, elapsed * 1000, details)
+
+# enable_instrumentation starts collecting metrics (restarting from zero if it was
+# already on) and returns the db_metrics.Metrics object
+def enable_instrumentation(slow_query_ms=100.0):
+    global _metrics
+    import db_metrics
+
+    _metrics = db_metrics.Metrics(slow_query_ms=slow_query_ms)
+    module = globals()
+    for name in INSTRUMENTED_FUNCTIONS:
+        if name not in _uninstrumented:
+            _uninstrumented[name] = module[name]
+            module[name] = _timed(name, _uninstrumented[name])
+    with _connections_lock:
+        for conn in _all_connections:
+            conn.set_trace_callback(_trace_statement)
+    return _metrics
+
+# disable_instrumentation stops collecting and restores the plain functions
+def disable_instrumentation():
+    global _metrics
+    _metrics = None
+    module = globals()
+    for name, fn in _uninstrumented.items():
+        module[name] = fn
+    _uninstrumented.clear()
+    with _connections_lock:
+        for conn in _all_connections:
+            conn.set_trace_callback(None)
+
+def instrumentation_enabled():
+    return _metrics is not None
+
+# get_metrics returns a snapshot dict of the collected metrics, or None when off
+def get_metrics():
+    metrics = _metrics
+    return metrics.snapshot() if metrics is not None else None
 
+# export_metrics writes the metrics to path as "json" or "prometheus" text
+def export_metrics(path, fmt="json"):
+    if _metrics is None:
+        raise RuntimeError("instrumentation is not enabled")
+    return _metrics.export(path, fmt)
 
 
-# Initialize
-initialize_database()
\ No newline at end of file
+INSTRUMENTED_FUNCTIONS = tuple(
+    name for name, fn in list(globals().items())
+    if isinstance(fn, types.FunctionType) and fn.__module__ == __name__
+    and not name.startswith("_") and name not in NOT_INSTRUMENTED
+)
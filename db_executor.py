@@ -0,0 +1,117 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+# How often (ms) the Tk thread checks for finished queries while any are pending
+POLL_INTERVAL_MS = 15
+
+
+# DatabaseExecutor runs database calls off the Tk thread.
+#
+# Reads go to a small pool of reader threads (each gets its own connection from
+# database.get_connection), writes go to a single writer thread so they are
+# applied one at a time in the order they were submitted. Slow work that
+# doesn't need the database (drawing charts) goes to its own worker thread via
+# compute, so it never holds up a read. Results are handed back to Tk by
+# polling a queue from root.after, because Tk widgets must only be touched
+# from the thread running mainloop.
+#
+#   db.read(database.get_summary, callback=show_summary, key="summary")
+#   db.write(database.delete_commissions, ids, callback=lambda _: refresh())
+#
+# Passing a `key` makes the request replace any earlier one with the same key:
+# the earlier one is cancelled if it has not started, and its result is
+# dropped if it has.
+class DatabaseExecutor:
+    def __init__(self, root, readers=2, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compute")
+        self._done = queue.Queue()
+        self._latest = {}     # key -> future of the newest request with that key
+        self._pending = 0
+        self._polling = False
+        self._closed = False
+
+    def read(self, fn, *args, callback=None, errback=None, key=None):
+        return self._submit(self._readers, fn, args, callback, errback, key)
+
+    def write(self, fn, *args, callback=None, errback=None, key=None):
+        return self._submit(self._writer, fn, args, callback, errback, key)
+
+    def compute(self, fn, *args, callback=None, errback=None, key=None):
+        return self._submit(self._worker, fn, args, callback, errback, key)
+
+    def busy(self):
+        return self._pending > 0
+
+    def shutdown(self, wait=False):
+        self._closed = True
+        self._readers.shutdown(wait=wait, cancel_futures=True)
+        self._worker.shutdown(wait=wait, cancel_futures=True)
+        # queued writes are still applied so nothing the user saved is lost
+        self._writer.shutdown(wait=wait)
+
+    # Called on the Tk thread
+    def _submit(self, pool, fn, args, callback, errback, key):
+        if self._closed:
+            raise RuntimeError("DatabaseExecutor has been shut down")
+
+        future = pool.submit(fn, *args)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = future
+
+        self._set_pending(self._pending + 1)
+        future.add_done_callback(lambda f: self._done.put((f, callback, errback, key)))
+        self._start_polling()
+        return future
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._drain)
+
+    def _drain(self):
+        while True:
+            try:
+                future, callback, errback, key = self._done.get_nowait()
+            except queue.Empty:
+                break
+
+            self._set_pending(self._pending - 1)
+            if key is not None:
+                if self._latest.get(key) is not future:
+                    continue  # superseded by a newer request
+                del self._latest[key]
+
+            try:
+                result = future.result()
+            except CancelledError:
+                continue
+            except Exception as e:
+                if errback is not None:
+                    errback(e)
+                else:
+                    self.root.report_callback_exception(type(e), e, e.__traceback__)
+                continue
+
+            if callback is not None:
+                try:
+                    callback(result)
+                except Exception as e:
+                    self.root.report_callback_exception(type(e), e, e.__traceback__)
+
+        if self._pending > 0:
+            self.root.after(POLL_INTERVAL_MS, self._drain)
+        else:
+            self._polling = False
+
+    def _set_pending(self, count):
+        was_busy = self._pending > 0
+        self._pending = count
+        if self.on_busy is not None and was_busy != (count > 0):
+            self.on_busy(count > 0)
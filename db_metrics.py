@@ -0,0 +1,146 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+
+# Latencies are counted in log-spaced buckets (about 5% apart) from 1 microsecond
+# to ~100 seconds, so a histogram is a fixed few hundred counters however many
+# calls it records, and percentiles are accurate to within a bucket.
+BUCKET_GROWTH = 1.05
+MIN_LATENCY_S = 1e-6
+BUCKET_COUNT = int(math.log(1e8) / math.log(BUCKET_GROWTH)) + 2
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds <= MIN_LATENCY_S:
+            index = 0
+        else:
+            index = min(BUCKET_COUNT - 1, int(math.log(seconds / MIN_LATENCY_S) / math.log(BUCKET_GROWTH)) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    # quantile returns the upper edge of the bucket holding the q-th latency
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(self.max, MIN_LATENCY_S * BUCKET_GROWTH ** index)
+        return self.max
+
+
+class FunctionStats:
+    __slots__ = ("latency", "rows", "statements", "errors")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.rows = 0
+        self.statements = 0
+        self.errors = 0
+
+
+# Metrics collects per-function call statistics plus a bounded log of slow calls.
+# All methods are thread-safe.
+class Metrics:
+    def __init__(self, slow_query_ms=100.0, slow_log_size=200):
+        self.slow_query_s = slow_query_ms / 1000.0
+        self.functions = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, rows, statements, error=False):
+        with self._lock:
+            stats = self.functions.get(name)
+            if stats is None:
+                stats = self.functions[name] = FunctionStats()
+            stats.latency.record(seconds)
+            stats.rows += rows
+            stats.statements += statements
+            if error:
+                stats.errors += 1
+
+    def record_slow(self, name, seconds, statements):
+        # statements: [(sql, [query plan lines]), ...]
+        with self._lock:
+            self.slow_log.append({
+                "function": name,
+                "ms": round(seconds * 1000, 3),
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "statements": [{"sql": sql, "plan": plan} for sql, plan in statements],
+            })
+
+    def snapshot(self):
+        with self._lock:
+            functions = {}
+            for name, stats in sorted(self.functions.items()):
+                h = stats.latency
+                functions[name] = {
+                    "calls": h.count,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "statements": stats.statements,
+                    "total_ms": round(h.total * 1000, 3),
+                    "max_ms": round(h.max * 1000, 3),
+                    **{f"p{int(q * 100)}_ms": round(h.quantile(q) * 1000, 3) for q in QUANTILES},
+                }
+            return {
+                "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "slow_query_ms": self.slow_query_s * 1000,
+                "functions": functions,
+                "slow_queries": list(self.slow_log),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    # to_prometheus renders the metrics in the Prometheus text exposition format
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = [
+            "# HELP commission_db_call_seconds Latency of database.py functions.",
+            "# TYPE commission_db_call_seconds summary",
+        ]
+        for name, f in snap["functions"].items():
+            for q in QUANTILES:
+                value = f[f"p{int(q * 100)}_ms"] / 1000
+                lines.append(f'commission_db_call_seconds{{function="{name}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'commission_db_call_seconds_sum{{function="{name}"}} {f["total_ms"] / 1000:.6f}')
+            lines.append(f'commission_db_call_seconds_count{{function="{name}"}} {f["calls"]}')
+        for metric, field, help_text in (
+            ("commission_db_rows_total", "rows", "Rows returned or written."),
+            ("commission_db_statements_total", "statements", "SQL statements executed."),
+            ("commission_db_errors_total", "errors", "Calls that raised."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, f in snap["functions"].items():
+                lines.append(f'{metric}{{function="{name}"}} {f[field]}')
+        lines.append("# HELP commission_db_slow_queries Slow calls currently in the log.")
+        lines.append("# TYPE commission_db_slow_queries gauge")
+        lines.append(f"commission_db_slow_queries {len(snap['slow_queries'])}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, fmt="json"):
+        text = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        with open(path, "w") as f:
+            f.write(text)
+        return path
@@ -0,0 +1,151 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+import database
+
+# Streaming import and export of commissions as CSV or JSON Lines, optionally
+# gzip-compressed. Neither side ever holds more than one chunk of rows, so
+# archives of any size move in constant memory.
+#
+#   export_commissions("archive.jsonl.gz")
+#   import_commissions("archive.jsonl.gz", progress=lambda read, added: print(read, added))
+
+FIELDS = database.COLUMNS
+CHUNK_SIZE = 1000
+# at most this many invalid rows are reported back in detail
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Can't tell the format of {path!r}; use .csv or .jsonl (optionally .gz) or pass fmt")
+
+
+def _open_text(path, mode, compress):
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return io.TextIOWrapper(gzip.open(path, mode + "b"), encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+# export_commissions streams every commission (optionally only one status) to
+# path and returns how many were written. The file is written under a temporary
+# name and renamed at the end, so a failed export never leaves a torn file.
+def export_commissions(path, fmt=None, status=None, compress=None, chunk_size=CHUNK_SIZE, progress=None):
+    fmt = fmt or detect_format(path)
+    partial = path + ".partial"
+    count = 0
+    try:
+        with _open_text(partial, "w", compress if compress is not None else path.endswith(".gz")) as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(FIELDS)
+                write = writer.writerow
+            else:
+                def write(row):
+                    f.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+                    f.write("\n")
+
+            for row in database.iter_commissions(status=status, sort_by="id", chunk_size=chunk_size):
+                write(row)
+                count += 1
+                if progress is not None and count % chunk_size == 0:
+                    progress(count)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    if progress is not None:
+        progress(count)
+    return count
+
+
+def _read_records(path, fmt, compress):
+    with _open_text(path, "r", compress) as f:
+        if fmt == "csv":
+            for record in csv.DictReader(f):
+                yield record
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f"Invalid JSON: {e}")
+                    continue
+                yield record if isinstance(record, dict) else ValueError("Expected a JSON object")
+
+
+# import_commissions streams records from path into the database in chunked
+# transactions. Every record is checked with database.validate_commission, the
+# same rules as the add form; invalid ones are skipped and reported (or raise
+# ValueError with on_error="raise"). Ids in the file are ignored, new ones are
+# assigned.
+#
+# Progress is committed together with each chunk, so if an import is
+# interrupted, running it again on the same file carries on after the last
+# committed chunk (pass resume=False to start over). Once an import finishes
+# its progress record is removed.
+#
+# progress(rows_read, rows_imported) is called after every chunk. Returns a dict
+# with imported, skipped, errors [(row_number, message)] and resumed_from.
+def import_commissions(path, fmt=None, compress=None, chunk_size=CHUNK_SIZE, progress=None,
+                       resume=True, on_error="skip"):
+    fmt = fmt or detect_format(path)
+    source = os.path.abspath(path)
+    if resume:
+        done = database.get_import_progress(source)
+    else:
+        database.clear_import_progress(source)
+        done = 0
+
+    imported = skipped = 0
+    errors = []
+    batch = []
+    number = 0
+    for number, record in enumerate(_read_records(path, fmt, compress), start=1):
+        if number <= done:
+            continue
+
+        try:
+            if isinstance(record, Exception):
+                raise record
+            batch.append(database.validate_commission(
+                record.get("client"), record.get("title"), record.get("type"), record.get("price"),
+                record.get("deadline"), record.get("status") or "Not Started", record.get("notes"),
+            ))
+        except ValueError as e:
+            if on_error == "raise":
+                raise ValueError(f"Row {number}: {e}") from None
+            skipped += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((number, str(e)))
+
+        if (number - done) % chunk_size == 0:
+            database.add_import_chunk(source, batch, number)
+            imported += len(batch)
+            batch = []
+            if progress is not None:
+                progress(number - done, imported)
+
+    if batch:
+        database.add_import_chunk(source, batch, number)
+        imported += len(batch)
+    database.clear_import_progress(source)
+    if progress is not None:
+        progress(max(number - done, 0), imported)
+
+    return {"imported": imported, "skipped": skipped, "errors": errors, "resumed_from": done}
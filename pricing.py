@@ -0,0 +1,278 @@
+import datetime
+import json
+import os
+import statistics
+import threading
+
+import database
+
+# Commission quotes from a rate table.
+#
+# A quote is the base price for the commission type, plus EXTRA_CHARACTER of
+# that base for every character after the first, times a rush multiplier when
+# the deadline is close, plus a flat fee for the background:
+#
+#   quote = base[type] * (1 + extra_character * (characters - 1)) * rush + background_fee
+#
+# rounded to the nearest QUOTE_STEP. Base prices can be calibrated from what
+# completed commissions actually cost (the median per type); the modifiers
+# stay as configured, since the database doesn't record characters or
+# backgrounds. Tables load from and save to a JSON file (RATES_FILE).
+#
+#   rates = pricing.get_rate_table()
+#   rates.quote("Chibi", characters=2, background="simple", deadline="2025-07-01")
+#   rates.quote_many(["Chibi", "Portrait"], characters=[2, 1])    # NumPy array of quotes
+#
+# Lookups are memoized per rate table; changing the table through its set_*
+# methods or calibrate() clears the memo, so quotes always follow the table.
+
+# types without an entry in the table are quoted at this type's base price
+FALLBACK_TYPE = "Other"
+_STARTING_PRICES = {
+    "Portrait": 45.0, "Half Body": 60.0, "Full Body": 90.0, "Chibi": 30.0,
+    "Emote": 20.0, "Environment": 140.0, "Other": 50.0,
+}
+# one per database.TYPE_OPTIONS entry; a type added there starts at the fallback's price
+DEFAULT_BASE_PRICES = {
+    type_: _STARTING_PRICES.get(type_, _STARTING_PRICES[FALLBACK_TYPE]) for type_ in database.TYPE_OPTIONS
+}
+# share of the base price each character after the first adds
+EXTRA_CHARACTER = 0.5
+DEFAULT_BACKGROUND_FEES = {"none": 0.0, "simple": 15.0, "detailed": 40.0}
+# (due within this many days, price multiplier), tightest first; a deadline
+# already past counts as due today
+DEFAULT_RUSH_TIERS = ((3, 1.5), (7, 1.25))
+QUOTE_STEP = 1.0
+# types with fewer completed commissions than this keep their configured base
+CALIBRATION_MIN_SAMPLES = 5
+
+RATES_FILE = "pricing_rates.json"
+
+
+class RateTable:
+    def __init__(self, base_prices=None, extra_character=EXTRA_CHARACTER, background_fees=None,
+                 rush_tiers=DEFAULT_RUSH_TIERS):
+        self.base_prices = dict(DEFAULT_BASE_PRICES if base_prices is None else base_prices)
+        self.extra_character = float(extra_character)
+        self.background_fees = dict(DEFAULT_BACKGROUND_FEES if background_fees is None else background_fees)
+        self.rush_tiers = tuple(sorted((int(days), float(m)) for days, m in rush_tiers))
+        self.version = 0
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    # Changing the table
+
+    def set_base_price(self, type_, price):
+        self.base_prices[type_] = float(price)
+        self._changed()
+
+    def set_extra_character(self, share):
+        self.extra_character = float(share)
+        self._changed()
+
+    def set_background_fee(self, background, fee):
+        self.background_fees[background] = float(fee)
+        self._changed()
+
+    def set_rush_tiers(self, tiers):
+        self.rush_tiers = tuple(sorted((int(days), float(m)) for days, m in tiers))
+        self._changed()
+
+    def _changed(self):
+        with self._lock:
+            self.version += 1
+            self._memo.clear()
+
+    # calibrate sets each type's base price to the median price of its completed
+    # commissions (archived ones included), where there are at least min_samples
+    # of them. Returns {type: (old base, new base)} for the types it changed.
+    def calibrate(self, min_samples=CALIBRATION_MIN_SAMPLES, include_archived=True):
+        samples = {}
+        for type_, price in database.get_completed_prices(include_archived):
+            samples.setdefault(type_ or FALLBACK_TYPE, []).append(price)
+
+        changes = {}
+        for type_, prices in samples.items():
+            if len(prices) < min_samples:
+                continue
+            median = round(statistics.median(prices), 2)
+            old = self.base_prices.get(type_)
+            if old != median:
+                changes[type_] = (old, median)
+                self.base_prices[type_] = median
+        if changes:
+            self._changed()
+        return changes
+
+    # Lookups
+
+    # _memoized returns the memo entry for key, computing it on a miss. The
+    # result is only stored if the table didn't change while it was being
+    # computed, so a value from the old table never outlives the invalidation.
+    def _memoized(self, key, compute):
+        with self._lock:
+            value = self._memo.get(key)
+            version = self.version
+        if value is None:
+            value = compute()
+            with self._lock:
+                if self.version == version:
+                    self._memo[key] = value
+        return value
+
+    def base_price(self, type_):
+        prices = self.base_prices
+        if type_ in prices:
+            return prices[type_]
+        if FALLBACK_TYPE in prices:
+            return prices[FALLBACK_TYPE]
+        raise ValueError(f"No rate for commission type {type_!r}")
+
+    def background_fee(self, background):
+        try:
+            return self.background_fees[background or "none"]
+        except KeyError:
+            raise ValueError(f"Unknown background {background!r}") from None
+
+    # rush_multiplier returns the multiplier for a deadline `days` away (None = no deadline)
+    def rush_multiplier(self, days):
+        if days is None:
+            return 1.0
+        for limit, multiplier in self.rush_tiers:
+            if days <= limit:
+                return multiplier
+        return 1.0
+
+    # rate returns the unrounded price for one combination, memoized
+    def rate(self, type_, characters=1, background="none", rush=1.0):
+        key = (type_, characters, background, rush)
+        return self._memoized(key, lambda: (
+            self.base_price(type_) * (1 + self.extra_character * (max(1, characters) - 1)) * rush
+            + self.background_fee(background)
+        ))
+
+    # quote prices one commission; deadline is YYYY-MM-DD (or None) and today
+    # defaults to the current date
+    def quote(self, type_, characters=1, background="none", deadline=None, today=None):
+        rush = self.rush_multiplier(_days_until(deadline, today or datetime.date.today()))
+        return _round_step(self.rate(type_, int(characters), background, rush))
+
+    # quote_many prices many commissions at once and returns a NumPy array.
+    # types is a sequence; characters, backgrounds and deadlines are sequences
+    # of the same length or None for the defaults. The table is turned into
+    # arrays once per version, then the whole batch is a few array operations.
+    def quote_many(self, types, characters=None, backgrounds=None, deadlines=None, today=None):
+        import numpy as np
+
+        types = list(types)
+        n = len(types)
+        type_codes, base, background_codes, fees = self._arrays()
+
+        fallback = type_codes.get(FALLBACK_TYPE)
+        try:
+            codes = np.fromiter((type_codes[t] if t in type_codes else fallback for t in types), np.intp, n)
+        except TypeError:
+            missing = next(t for t in types if t not in type_codes)
+            raise ValueError(f"No rate for commission type {missing!r}") from None
+        price = base[codes]
+
+        if characters is not None:
+            extra = np.maximum(np.asarray(characters, np.float64), 1) - 1
+            price = price * (1 + self.extra_character * extra)
+
+        if deadlines is not None:
+            today = today or datetime.date.today()
+            days = np.fromiter((_days_until(d, today, NO_DEADLINE) for d in deadlines), np.int64, n)
+            rush = np.ones(n)
+            # loosest tier first, so tighter tiers overwrite it
+            for limit, multiplier in reversed(self.rush_tiers):
+                rush[days <= limit] = multiplier
+            price = price * rush
+
+        if backgrounds is not None:
+            try:
+                price = price + fees[[background_codes[b or "none"] for b in backgrounds]]
+            except KeyError as e:
+                raise ValueError(f"Unknown background {e.args[0]!r}") from None
+
+        return np.round(price / QUOTE_STEP) * QUOTE_STEP
+
+    def _arrays(self):
+        def build():
+            import numpy as np
+            types = list(self.base_prices)
+            backgrounds = list(self.background_fees)
+            return (
+                {t: i for i, t in enumerate(types)},
+                np.array([self.base_prices[t] for t in types], np.float64),
+                {b: i for i, b in enumerate(backgrounds)},
+                np.array([self.background_fees[b] for b in backgrounds], np.float64),
+            )
+        return self._memoized("arrays", build)
+
+    # Saving and loading
+
+    def to_dict(self):
+        return {
+            "base_prices": self.base_prices,
+            "extra_character": self.extra_character,
+            "background_fees": self.background_fees,
+            "rush_tiers": [list(tier) for tier in self.rush_tiers],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            base_prices=data.get("base_prices"),
+            extra_character=data.get("extra_character", EXTRA_CHARACTER),
+            background_fees=data.get("background_fees"),
+            rush_tiers=data.get("rush_tiers", DEFAULT_RUSH_TIERS),
+        )
+
+    def save(self, path=None):
+        with open(path or RATES_FILE, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path=None):
+        with open(path or RATES_FILE, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+# deadlines this far away (or missing) never count as rush
+NO_DEADLINE = 10 ** 6
+
+
+def _days_until(deadline, today, missing=None):
+    if not deadline:
+        return missing
+    if isinstance(deadline, str):
+        try:
+            deadline = datetime.date.fromisoformat(deadline)
+        except ValueError:
+            raise ValueError("Deadline must be in YYYY-MM-DD format.") from None
+    return max(0, (deadline - today).days)
+
+
+def _round_step(price):
+    return round(price / QUOTE_STEP) * QUOTE_STEP
+
+
+_rates = None
+_rates_lock = threading.Lock()
+
+
+# get_rate_table returns the shared RateTable: RATES_FILE as configured if it
+# exists, otherwise the defaults calibrated from the database on first use.
+# (To keep calibrated rates, calibrate() a table and save() it.)
+def get_rate_table():
+    global _rates
+    with _rates_lock:
+        if _rates is None:
+            if os.path.exists(RATES_FILE):
+                rates = RateTable.load()
+            else:
+                rates = RateTable()
+                rates.calibrate()
+            _rates = rates
+        return _rates
@@ -0,0 +1,389 @@
+# A small HTTP/JSON API over database.py, so several people can share one
+# commissions.db. Built on asyncio streams from the standard library.
+#
+#   python server.py --port 8765
+#
+#   GET    /commissions?status=&type=&client=&due_before=&overdue=1&sort=&limit=&after=
+#   POST   /commissions                  body: {"client": ..., "title": ..., ...}
+#   GET    /commissions/<id>
+#   PUT    /commissions/<id>             replace every field
+#   PATCH  /commissions/<id>             change only the fields given
+#   POST   /commissions/<id>/complete
+#   DELETE /commissions/<id>
+#   GET    /summary
+#   GET    /income-by-type
+#
+# Lists are paginated with keyset pagination: every page carries a "next"
+# cursor to pass back as ?after= until it is null.
+#
+# Database work never runs on the event loop. Reads go to a fixed pool of
+# reader threads (one SQLite connection each) and writes to a single writer
+# thread, so writes are applied one at a time in arrival order. When more
+# than MAX_QUEUED_WRITES writes are waiting the server answers 503.
+#
+# Every GET response has an ETag (a hash of the body). A client sending it back
+# in If-None-Match gets 304 Not Modified. The server remembers which ETag it
+# last served for each URL at which change log revision, so while nothing has
+# been written since, the 304 costs one index seek and the query isn't run.
+# After a write the query runs again but still ends in a 304 if this
+# particular response didn't change.
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import sqlite3
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import database
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+READERS = 4
+MAX_QUEUED_WRITES = 1000
+MAX_BODY_BYTES = 1 << 20
+MAX_PAGE_SIZE = 1000
+KEEP_ALIVE_TIMEOUT_S = 30
+# how many URLs' (revision, ETag) pairs are remembered
+ETAG_CACHE_SIZE = 4096
+
+log = logging.getLogger("server")
+
+REASONS = {
+    200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified",
+    400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# encode_cursor / decode_cursor turn a get_commissions_page key into an opaque
+# URL-safe string and back
+def encode_cursor(key):
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(text):
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(text + "=" * (-len(text) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPError(400, "Invalid cursor") from None
+    # a key is (sort column value, id); anything else would only fail in SQLite
+    if (isinstance(value, bool) or not isinstance(value, (str, int, float, type(None)))
+            or isinstance(last_id, bool) or not isinstance(last_id, int)):
+        raise HTTPError(400, "Invalid cursor")
+    return value, last_id
+
+
+def record_json(row):
+    return dict(zip(row.FIELDS, row))
+
+
+class CommissionServer:
+    def __init__(self, readers=READERS, max_queued_writes=MAX_QUEUED_WRITES):
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="api-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-write")
+        self.max_queued_writes = max_queued_writes
+        self._queued_writes = 0
+        self._etags = OrderedDict()   # url -> (revision, etag)
+        self._server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        database.initialize_database()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self._readers.shutdown(wait=True, cancel_futures=True)
+        # writes already accepted are still applied
+        self._writer.shutdown(wait=True)
+
+    async def read(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, lambda: fn(*args, **kwargs))
+
+    async def write(self, fn, *args, **kwargs):
+        if self._queued_writes >= self.max_queued_writes:
+            raise HTTPError(503, "Too many writes queued, try again shortly")
+        self._queued_writes += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._writer, lambda: fn(*args, **kwargs))
+        finally:
+            self._queued_writes -= 1
+
+    # revision returns the current change log revision. Writes by other
+    # processes (the GUI, the CLI) move it too, and database.py's query cache
+    # catches up with them on its own.
+    async def revision(self):
+        return await self.read(database.get_revision)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT_S)
+                except HTTPError as e:
+                    await send(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload, extra = await self.dispatch(method, path, query, headers, body)
+                await send(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            log.exception("Error while serving a connection")
+        finally:
+            writer.close()
+
+    # dispatch returns (status, payload, extra_headers) for one request
+    async def dispatch(self, method, path, query, headers, body):
+        parts = [p for p in path.split("/") if p]
+        try:
+            if method == "GET":
+                return await self.conditional_get(parts, path, query, headers)
+            data = parse_body(body)
+            if method == "POST" and parts == ["commissions"]:
+                row = database.validate_commission(*fields_from(data, {}))
+                comm_id = await self.write(database.add_commission, *row)
+                return 201, {"id": comm_id}, {"Location": f"/commissions/{comm_id}"}
+            if len(parts) >= 2 and parts[0] == "commissions":
+                comm_id = parse_id(parts[1])
+                if method in ("PUT", "PATCH") and len(parts) == 2:
+                    return await self.update(comm_id, data, partial=method == "PATCH")
+                if method == "DELETE" and len(parts) == 2:
+                    count = await self.write(database.delete_commissions, [comm_id])
+                    if not count:
+                        raise HTTPError(404, f"Commission {comm_id} not found")
+                    return 204, None, {}
+                if method == "POST" and parts[2:] == ["complete"]:
+                    count = await self.write(database.mark_complete_many, [comm_id])
+                    if not count:
+                        raise HTTPError(404, f"Commission {comm_id} not found")
+                    return 200, {"id": comm_id, "status": "Completed"}, {}
+            raise HTTPError(405 if parts and parts[0] in ("commissions", "summary", "income-by-type") else 404,
+                            f"No route for {method} {path}")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}, {}
+        except ValueError as e:
+            return 400, {"error": str(e)}, {}
+        except sqlite3.Error as e:
+            return 500, {"error": f"Database error: {e}"}, {}
+        except Exception:
+            # a bug shouldn't take the connection down with it
+            log.exception("Error handling %s %s", method, path)
+            return 500, {"error": "Internal server error"}, {}
+
+    async def conditional_get(self, parts, path, query, headers):
+        revision = await self.revision()
+        url = path + "?" + urlencode(sorted(query.items()), doseq=True)
+        wanted = {tag.strip() for tag in headers.get("if-none-match", "").split(",")}
+        known = self._etags.get(url)
+        if known is not None and known[0] == revision and known[1] in wanted:
+            return 304, None, {"ETag": known[1]}
+
+        status, payload = await self.get(parts, query)
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self._etags[url] = (revision, etag)
+        self._etags.move_to_end(url)
+        if len(self._etags) > ETAG_CACHE_SIZE:
+            self._etags.popitem(last=False)
+        if etag in wanted:
+            return 304, None, {"ETag": etag}
+        return status, body, {"ETag": etag}
+
+    async def get(self, parts, query):
+        if parts == ["commissions"]:
+            return 200, await self.read(list_page, query)
+        if parts == ["summary"]:
+            total, completed, in_progress, not_started, income = await self.read(database.get_summary)
+            return 200, {
+                "total": total, "completed": completed, "in_progress": in_progress,
+                "not_started": not_started, "income": income,
+            }
+        if parts == ["income-by-type"]:
+            rows = await self.read(database.get_income_by_type)
+            return 200, [{"type": type_, "income": income} for type_, income in rows]
+        if len(parts) == 2 and parts[0] == "commissions":
+            comm_id = parse_id(parts[1])
+            row = await self.read(database.get_commission_by_id, comm_id)
+            if row is None:
+                raise HTTPError(404, f"Commission {comm_id} not found")
+            return 200, record_json(row)
+        raise HTTPError(404, "Not found")
+
+    async def update(self, comm_id, data, partial):
+        values = await self.write(update_row, comm_id, data, partial)
+        if values is None:
+            raise HTTPError(404, f"Commission {comm_id} not found")
+        return 200, dict(zip(database.COLUMNS, (comm_id, *values))), {}
+
+
+# update_row runs on the writer thread and returns the commission's new values,
+# or None if it doesn't exist. A PATCH reads, merges and writes in one
+# transaction there, so two PATCHes to different fields of one commission
+# can't undo each other.
+def update_row(comm_id, data, partial):
+    with database.transaction():
+        current = {}
+        if partial:
+            row = database.get_commission_by_id(comm_id)
+            if row is None:
+                return None
+            current = record_json(row)
+        values = database.validate_commission(*fields_from(data, current))
+        if not database.update_commissions_many([(comm_id, *values)]):
+            return None
+    return values
+
+
+# list_page runs on a reader thread and returns one page of the list endpoint
+def list_page(query):
+    def one(name, default=None):
+        values = query.get(name)
+        return values[-1] if values else default
+
+    sort_by = one("sort", "deadline")
+    if sort_by not in database.SORT_COLUMNS:
+        raise HTTPError(400, f"sort must be one of {', '.join(database.SORT_COLUMNS)}")
+    try:
+        limit = min(int(one("limit", database.PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise HTTPError(400, "limit must be a number") from None
+    after = one("after")
+    rows, next_key = database.get_commissions_page(
+        one("status"), sort_by, decode_cursor(after) if after else None, max(limit, 1),
+        type_=one("type"), client=one("client"), due_before=one("due_before"),
+        overdue=one("overdue", "") in ("1", "true", "yes"),
+    )
+    return {"items": [record_json(r) for r in rows], "next": encode_cursor(next_key)}
+
+
+def parse_id(text):
+    try:
+        return int(text)
+    except ValueError:
+        raise HTTPError(404, f"Commission {text!r} not found") from None
+
+
+def parse_body(body):
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Body must be JSON") from None
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    return data
+
+
+# fields_from returns validate_commission's arguments from a request body,
+# falling back to `current` (and then to blanks) for fields it leaves out
+def fields_from(data, current):
+    defaults = {"status": "Not Started"}
+    return [data.get(name, current.get(name, defaults.get(name))) for name in database.COLUMNS[1:]]
+
+
+# read_request reads one request off the stream; returns None at a clean EOF
+async def read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length") from None
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Body too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return method.upper(), url.path, parse_qs(url.query), headers, body
+
+
+# send writes one response; payload is None, already-encoded JSON bytes or a
+# value to encode
+async def send(writer, status, payload, extra_headers=None, keep_alive=True):
+    if payload is None or isinstance(payload, bytes):
+        body = payload or b""
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    if payload is not None:
+        head.append("Content-Type: application/json; charset=utf-8")
+    if status != 304:
+        head.append(f"Content-Length: {len(body)}")
+    for name, value in (extra_headers or {}).items():
+        head.append(f"{name}: {value}")
+    head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def main_async(args):
+    if args.db:
+        database.DB_NAME = args.db
+    server = CommissionServer(readers=args.readers)
+    host, port = await server.start(args.host, args.port)
+    # the load test reads this line to find the port when started with --port 0
+    print(f"listening on http://{host}:{port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the commissions database as a JSON API.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", help=f"database file (default {database.DB_NAME})")
+    parser.add_argument("--readers", type=int, default=READERS, help="reader threads/connections")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
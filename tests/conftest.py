@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# the app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+# db points database.py at a fresh database file for one test
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "commissions.db"))
+    database.clear_cache()
+    yield database
+    database.close_connections()
+    database.clear_cache()
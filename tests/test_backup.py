@@ -0,0 +1,106 @@
+import os
+import sqlite3
+
+import backup
+
+
+def _write_elsewhere(db, title):
+    conn = sqlite3.connect(db.DB_NAME)
+    with conn:
+        conn.execute("UPDATE commissions SET title = ? WHERE id = 1", (title,))
+    conn.close()
+
+
+def test_restore_brings_the_snapshot_back(db, tmp_path):
+    db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+    snap = backup.snapshot(str(tmp_path / "backups"))
+    db.update_commission(1, "Ana", "Changed", "Chibi", 30.0, None, "Completed", "")
+    backup.restore(snap)
+    assert db.get_commission_by_id(1).title == "Fox"
+    assert db.get_summary() == (1, 0, 0, 1, 0.0)
+
+
+def test_readers_reload_after_restore(db, tmp_path, monkeypatch):
+    db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+    snap = backup.snapshot(str(tmp_path / "backups"))
+    before = db.get_revision()
+
+    # another process writes while the restore is under way; a reader sees it
+    seen = {}
+    copy_back = backup._copy_back
+
+    def racing_copy_back(snapshot_path, live_path):
+        for i in range(3):
+            _write_elsewhere(db, f"race {i}")
+        seen["rev"] = db.get_revision()
+        copy_back(snapshot_path, live_path)
+
+    monkeypatch.setattr(backup, "_copy_back", racing_copy_back)
+    backup.restore(snap)
+
+    # neither an old reader nor the one that saw the racing writes may patch
+    assert db.get_changes_since(before) is None
+    assert db.get_changes_since(seen["rev"]) is None
+    db.update_commission(1, "Ana", "After", "Chibi", 30.0, None, "Not Started", "")
+    assert db.get_changes_since(seen["rev"]) is None
+    # a reader that reloads afterwards follows the log normally again
+    rev = db.get_revision()
+    db.update_commission(1, "Ana", "Later", "Chibi", 30.0, None, "Not Started", "")
+    assert [r.title for r in db.get_changes_since(rev)[1]] == ["Later"]
+
+
+def test_log_moving_backwards_means_reload(db):
+    db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+    rev = db.get_revision()
+    assert db.get_changes_since(rev) == (rev, [], [])
+    assert db.get_changes_since(rev + 5) is None
+
+
+def _archivable(db, title):
+    comm_id = db.add_commission("Ana", title, "Chibi", 30.0, "2020-01-15", "Completed", "")
+    db.get_connection().execute("UPDATE commission_dates SET completed_at = '2020-02-01'")
+    db.get_connection().commit()
+    return comm_id
+
+
+def test_restore_of_snapshot_without_archive_empties_it(db, tmp_path):
+    first = _archivable(db, "Fox")
+    db.add_commission("Bo", "Owl", "Emote", 5.0, None, "In Progress", "")
+    snap = backup.snapshot(str(tmp_path / "backups"))
+    assert db.archive_completed(older_than_days=30) == 1
+
+    backup.restore(snap)
+    assert db.count_archived() == 0
+    assert db.get_summary(include_archived=True)[0] == 2
+    assert sorted(r.id for r in db.get_commissions(include_archived=True)) == [1, 2]
+
+    # an edit made after the restore survives the next archive run
+    db.update_commission(first, "Ana", "Fox v2", "Chibi", 30.0, "2020-01-15", "In Progress", "")
+    assert db.archive_completed(older_than_days=30) == 0
+    assert db.get_commission_by_id(first).title == "Fox v2"
+
+
+def test_failed_restore_puts_the_archive_back(db, tmp_path, monkeypatch):
+    _archivable(db, "Fox")
+    db.archive_completed(older_than_days=30)
+    snap = backup.snapshot(str(tmp_path / "backups"))
+    _archivable(db, "Owl")
+    db.archive_completed(older_than_days=30)
+    copy_back = backup._copy_back
+
+    def failing_copy_back(snapshot_path, live_path):
+        if live_path == db.DB_NAME:
+            raise sqlite3.OperationalError("disk I/O error")
+        copy_back(snapshot_path, live_path)
+
+    monkeypatch.setattr(backup, "_copy_back", failing_copy_back)
+    try:
+        backup.restore(snap)
+    except sqlite3.OperationalError:
+        pass
+    else:
+        raise AssertionError("restore should have failed")
+    db.clear_cache()
+    assert db.count_archived() == 2
+    assert db.get_summary(include_archived=True)[0] == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith((".restore", ".previous"))]
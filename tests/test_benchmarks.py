@@ -0,0 +1,18 @@
+import random
+import types
+
+from benchmarks import run
+
+
+# the benchmark suite claims every public database.py function outside
+# NOT_BENCHMARKED; a new function has to be added to one or the other
+def test_every_public_function_is_benchmarked(db):
+    db.add_commissions_many([("Ana", "Fox", "Chibi", 30.0, None, "Completed", "")] * 8)
+    rng = random.Random(0)
+    benches = run.read_benchmarks(8, rng) + run.write_benchmarks(8, rng)
+    timed = {bench[0].split("[")[0] for bench in benches}
+    public = {name for name, value in vars(db).items()
+              if isinstance(value, types.FunctionType) and value.__module__ == "database"
+              and not name.startswith("_")}
+    assert public - run.NOT_BENCHMARKED == timed
+    assert not timed & run.NOT_BENCHMARKED
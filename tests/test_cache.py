@@ -0,0 +1,44 @@
+import sqlite3
+
+
+def _other_process_update(db, sql, params=()):
+    # a separate connection, as the CLI or the server would have
+    conn = sqlite3.connect(db.DB_NAME)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def test_cache_hit(db):
+    cid = db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+    db.get_commission_by_id(cid)
+    db.reset_cache_stats()
+    assert db.get_commission_by_id(cid).title == "Fox"
+    assert db.get_cache_stats()["hits"] == 1
+
+
+def test_write_from_another_connection_invalidates(db):
+    cid = db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Completed", "")
+    assert db.get_commission_by_id(cid).status == "Completed"
+    assert db.get_summary() == (1, 1, 0, 0, 30.0)
+
+    _other_process_update(db, "UPDATE commissions SET title = 'CHANGED', status = 'In Progress' WHERE id = ?", (cid,))
+
+    row = db.get_commission_by_id(cid)
+    assert (row.title, row.status) == ("CHANGED", "In Progress")
+    assert db.get_summary() == (1, 0, 1, 0, 0.0)
+
+
+def test_insert_from_another_connection_replaces_not_found(db):
+    assert db.get_commission_by_id(1) is None
+    _other_process_update(db, "INSERT INTO commissions (client, title, status) VALUES ('Bo', 'Owl', 'Not Started')")
+    assert db.get_commission_by_id(1).title == "Owl"
+
+
+def test_pruned_log_clears_everything(db):
+    cid = db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+    db.get_commission_by_id(cid)
+    _other_process_update(db, "UPDATE commissions SET title = 'CHANGED' WHERE id = ?", (cid,))
+    _other_process_update(db, "DELETE FROM changes")
+    _other_process_update(db, "INSERT INTO changes (commission_id, op) VALUES (999, 'U')")
+    assert db.get_commission_by_id(cid).title == "CHANGED"
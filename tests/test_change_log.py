@@ -0,0 +1,20 @@
+def _log_size(db):
+    return db.get_connection().execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+
+
+def test_change_log_is_pruned_while_running(db, monkeypatch):
+    monkeypatch.setattr(db, "CHANGE_LOG_KEEP", 20)
+    monkeypatch.setattr(db, "PRUNE_EVERY", 10)
+    comm_id = db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+    rev = db.get_revision()
+    for i in range(200):
+        db.update_commission(comm_id, "Ana", f"Fox {i}", "Chibi", 30.0, None, "Not Started", "")
+        with db.transaction():
+            db.mark_complete(comm_id)
+    assert _log_size(db) <= 20 + 10
+
+    # a reader left behind the kept window reloads; a recent one still patches
+    assert db.get_changes_since(rev) is None
+    recent = db.get_revision()
+    db.update_commission(comm_id, "Ana", "Last", "Chibi", 30.0, None, "Not Started", "")
+    assert [row.title for row in db.get_changes_since(recent)[1]] == ["Last"]
@@ -0,0 +1,23 @@
+import json
+
+import cli
+
+
+def _run(capsys, *argv):
+    code = cli.main(list(argv))
+    out, err = capsys.readouterr()
+    return code, [json.loads(line) for line in out.splitlines()], err
+
+
+def test_status_all_is_not_a_filter(db, capsys):
+    db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+    db.add_commission("Bo", "Owl", "Emote", 5.0, None, "In Progress", "")
+
+    for command in ("delete", "mark-complete"):
+        code, out, err = _run(capsys, command, "--status", "All")
+        assert code == cli.EXIT_ERROR and not out
+        assert "--all" in json.loads(err)["error"]
+    assert db.get_summary() == (2, 0, 1, 1, 0.0)
+
+    assert _run(capsys, "mark-complete", "--status", "All", "--all")[1] == [{"updated": 2}]
+    assert _run(capsys, "delete", "--status", "Completed")[1] == [{"deleted": 2}]
@@ -0,0 +1,34 @@
+import inspect
+
+import database
+
+
+def test_every_public_function_is_instrumented_or_excluded():
+    public = {
+        name for name, fn in vars(database).items()
+        if inspect.isfunction(fn) and fn.__module__ == "database" and not name.startswith("_")
+    }
+    assert public - database.NOT_INSTRUMENTED == set(database.INSTRUMENTED_FUNCTIONS)
+    assert database.NOT_INSTRUMENTED <= public
+
+
+def test_calls_are_recorded(db):
+    db.add_commissions_many([("Ana", f"T{i}", "Chibi", 10.0, None, "Completed", "") for i in range(25)])
+    db.enable_instrumentation()
+    try:
+        db.get_overdue()
+        db.count_archived()
+        rows = list(db.iter_commissions(chunk_size=10))
+        db.mark_complete_where(client="Nobody")
+        functions = db.get_metrics()["functions"]
+    finally:
+        db.disable_instrumentation()
+
+    assert len(rows) == 25
+    assert functions["iter_commissions"]["calls"] == 1
+    assert functions["iter_commissions"]["rows"] == 25
+    assert functions["iter_commissions"]["statements"] >= 1
+    assert functions["get_overdue"]["calls"] == 1
+    assert functions["count_archived"]["calls"] == 1
+    assert functions["mark_complete_where"]["rows"] == 0
+    assert db.get_metrics() is None
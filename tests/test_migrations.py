@@ -0,0 +1,88 @@
+import sqlite3
+
+
+# _at_version writes a database file upgraded only to `version`
+def _at_version(db, version):
+    conn = sqlite3.connect(db.DB_NAME)
+    for target, statements in enumerate(db.MIGRATIONS[:version], start=1):
+        for statement in statements:
+            if callable(statement):
+                statement(conn)
+            else:
+                conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {target}")
+    conn.commit()
+    return conn
+
+
+def test_deadlines_are_made_strict_without_losing_dates(db):
+    conn = _at_version(db, 7)
+    deadlines = ["2025-3-4", " 2025-12-01 ", "2025-06-07", "next friday", "2025-02-30", ""]
+    conn.executemany(
+        "INSERT INTO commissions (client, title, deadline, status, notes) VALUES ('Ana', 'Fox', ?, 'Not Started', ?)",
+        [(deadline, "") for deadline in deadlines],
+    )
+    conn.commit()
+    conn.close()
+
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    rows = db.get_connection().execute("SELECT deadline, notes FROM commissions ORDER BY id").fetchall()
+    assert rows == [
+        ("2025-03-04", ""),
+        ("2025-12-01", ""),
+        ("2025-06-07", ""),
+        (None, "Deadline: next friday"),
+        (None, "Deadline: 2025-02-30"),
+        (None, ""),
+    ]
+
+
+def test_failed_migration_rolls_back_and_can_run_again(db, monkeypatch):
+    version = db.get_schema_version()
+
+    def fail(conn):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(db, "MIGRATIONS", db.MIGRATIONS + [[
+        "CREATE TABLE t_new (id INTEGER PRIMARY KEY)",
+        "ALTER TABLE commissions ADD COLUMN extra TEXT",
+        fail,
+    ]])
+    monkeypatch.setattr(db, "SCHEMA_VERSION", version + 1)
+    try:
+        db.migrate()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("the migration should have failed")
+
+    conn = db.get_connection()
+    assert db.get_schema_version() == version
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 't_new'").fetchone()[0] == 0
+    assert "extra" not in [row[1] for row in conn.execute("PRAGMA table_info(commissions)")]
+
+    db.MIGRATIONS[-1].pop()
+    assert db.migrate() == version + 1
+
+
+def test_stats_table_is_created_and_filled_together(db, monkeypatch):
+    db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Completed", "")
+    db.disable_commission_stats()
+    fill = db._fill_commission_stats
+
+    def fail(conn):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(db, "_fill_commission_stats", fail)
+    try:
+        db.enable_commission_stats()
+    except RuntimeError:
+        pass
+    assert not db.stats_table_enabled()
+    assert db.get_connection().execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'commission_stats'"
+    ).fetchone()[0] == 0
+
+    monkeypatch.setattr(db, "_fill_commission_stats", fill)
+    db.enable_commission_stats()
+    assert db.check_commission_stats() == []
@@ -0,0 +1,24 @@
+import database
+import pricing
+
+
+def test_defaults_cover_every_type():
+    assert set(pricing.DEFAULT_BASE_PRICES) == set(database.TYPE_OPTIONS)
+
+
+def test_quote():
+    rates = pricing.RateTable()
+    assert rates.quote("Chibi", characters=2, background="simple") == 30.0 * 1.5 + 15.0
+
+
+def test_change_during_compute_is_not_memoized():
+    rates = pricing.RateTable()
+
+    def stale():
+        value = rates.base_price("Chibi")
+        rates.set_base_price("Chibi", 99.0)   # the table changes mid-compute
+        return value
+
+    assert rates._memoized("key", stale) == 30.0
+    assert "key" not in rates._memo
+    assert rates.quote("Chibi") == 99.0
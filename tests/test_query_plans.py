@@ -0,0 +1,42 @@
+import pytest
+
+import database
+
+STATUSES = (None, "All", "Not Started", "In Progress", "Completed")
+
+
+def _fill(db):
+    db.add_commissions_many(
+        (f"Client {i % 37}", f"Title {i}", ("Chibi", "Portrait", "Emote")[i % 3], float(i % 90),
+         f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}" if i % 5 else None,
+         ("Not Started", "In Progress", "Completed")[i % 3], "")
+        for i in range(500)
+    )
+
+
+# every sort_by option, with and without a status filter, is read in order
+# from an index rather than sorted afterwards
+@pytest.mark.parametrize("status", STATUSES)
+@pytest.mark.parametrize("sort_by", sorted(database.SORT_COLUMNS))
+def test_get_commissions_sorts_by_index(db, status, sort_by):
+    _fill(db)
+    plan = db.get_commissions_plan(status, sort_by)
+    assert not any("USE TEMP B-TREE" in line for line in plan), plan
+    if sort_by == "id" and status in (None, "All"):
+        # a plain SCAN walks the table's own b-tree, which is in id order
+        assert plan == ["SCAN commissions"], plan
+    else:
+        assert any("USING INDEX" in line or "USING COVERING INDEX" in line for line in plan), plan
+
+
+@pytest.mark.parametrize("sort_by", sorted(database.SORT_COLUMNS))
+def test_plans_hold_after_analyze(db, sort_by):
+    _fill(db)
+    db.get_connection().execute("ANALYZE")
+    for status in STATUSES:
+        plan = db.get_commissions_plan(status, sort_by)
+        assert not any("USE TEMP B-TREE" in line for line in plan), (status, plan)
+
+
+def test_migrations_reach_schema_version(db):
+    assert db.get_schema_version() == db.SCHEMA_VERSION
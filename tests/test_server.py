@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import server
+
+
+def _request(raw):
+    async def run():
+        api = server.CommissionServer(readers=1)
+        host, port = await api.start("127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(raw)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return response
+        finally:
+            api._server.close()
+            await api._server.wait_closed()
+            api.close()
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1]) if head else None
+    return status, json.loads(body) if body else None
+
+
+def _post(path, body, headers=""):
+    data = body.encode()
+    return _request(
+        f"POST {path} HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(data)}\r\n{headers}\r\n".encode() + data
+    )
+
+
+def test_create_and_read(db):
+    status, body = _post("/commissions", '{"client": "Ana", "title": "Fox", "price": "30"}')
+    assert status == 201
+    status, body = _request(f"GET /commissions/{body['id']} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    assert status == 200 and body["client"] == "Ana" and body["price"] == 30.0
+
+
+def test_wrong_field_types_are_bad_requests(db):
+    for payload in ('{"client": 5, "title": "T"}', '{"client": "A", "title": ["T"]}',
+                    '{"client": "A", "title": "T", "price": {"x": 1}}', '{"client": "A", "title": "T", "price": true}',
+                    '{"client": "A", "title": "T", "deadline": 20250101}'):
+        status, body = _post("/commissions", payload)
+        assert status == 400, payload
+        assert "error" in body
+
+
+def test_bad_content_length(db):
+    for length in ("abc", "-5"):
+        raw = f"POST /commissions HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+        status, body = _request(raw)
+        assert status == 400 and body["error"] == "Invalid Content-Length"
+
+
+def test_bad_cursors(db):
+    for cursor in (server.encode_cursor({"a": 1}), server.encode_cursor([[1], 2]), server.encode_cursor(["x", "y"]),
+                   server.encode_cursor([None, True]), "!!!"):
+        status, _ = _request(f"GET /commissions?after={cursor} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+        assert status == 400, cursor
+
+
+def test_unexpected_errors_are_500(db, monkeypatch):
+    def broken(query):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(server, "list_page", broken)
+    status, body = _request(b"GET /commissions HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert status == 500 and body == {"error": "Internal server error"}
+
+
+def test_concurrent_patches_keep_both_fields(db):
+    comm_id = db.add_commission("Ana", "Fox", "Chibi", 30.0, None, "Not Started", "")
+
+    async def run():
+        api = server.CommissionServer(readers=4)
+        try:
+            patches = [("PATCH", f"/commissions/{comm_id}", {}, {}, json.dumps(body).encode())
+                       for body in ({"title": "Fox v2"}, {"status": "In Progress"})] * 10
+            return await asyncio.gather(*(api.dispatch(*patch) for patch in patches))
+        finally:
+            api.close()
+
+    assert all(status == 200 for status, _, _ in asyncio.run(run()))
+    row = db.get_commission_by_id(comm_id)
+    assert (row.title, row.status) == ("Fox v2", "In Progress")
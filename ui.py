@@ -1,13 +1,16 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
+import backup
+import charts
 import database
+import pricing
+from db_executor import DatabaseExecutor
+from bisect import bisect_left, insort
 import datetime
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-STATUS_OPTIONS = ["Not Started", "In Progress", "Completed"]
-TYPE_OPTIONS = ["Portrait", "Half Body", "Full Body", "Chibi", "Emote", "Environment", "Other"]
+STATUS_OPTIONS = database.STATUS_OPTIONS
+TYPE_OPTIONS = database.TYPE_OPTIONS
 
 CREME = "#F5EFE6"
 CREME_2 = "#EDE3D2"
@@ -15,6 +18,14 @@ BROWN = "#5A3E2B"
 BROWN_DARK = "#3E2A1D"
 ACCENT = "#B08968"
 TEXT_DARK = "#2B1B12"
+OVERDUE_RED = "#A63D2F"
+
+# search-as-you-type waits this long after the last key press before querying
+SEARCH_DELAY_MS = 200
+SEARCH_LIMIT = 500
+
+# most rows each half of the main menu's overdue / due this week panel shows
+DUE_PANEL_ROWS = 20
 
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
@@ -26,8 +37,21 @@ class App:
         self.root.title("Art Commission Tracker")
         self.root.geometry("1000x700")
         self.root.configure(fg_color=CREME)
+        # all database calls go through this so the window never waits on SQLite
+        self.db = DatabaseExecutor(root, on_busy=self.set_loading)
+        self.loading_labels = []
+        # shared quote rates, loaded on a reader thread the first time the add form opens
+        self.rate_table = None
         self.configure_treeview_style()
         self.create_main_menu()
+        # hidden diagnostics window for database instrumentation
+        self.root.bind("<Control-Shift-D>", lambda e: self.open_diagnostics())
+
+    # set_loading shows or hides the "Loading..." hint while queries are running
+    def set_loading(self, busy):
+        self.loading_labels = [lab for lab in self.loading_labels if lab.winfo_exists()]
+        for lab in self.loading_labels:
+            lab.configure(text="Loading..." if busy else "")
 
     def setup_popup(self, win, w=900, h=600):
         win.configure(fg_color=CREME)
@@ -103,6 +127,10 @@ class App:
         )
         subtitle.pack(anchor="w", padx=10, pady=(0, 10))
 
+        loading = ctk.CTkLabel(header, text="", font=("Arial", 13), text_color=ACCENT)
+        loading.pack(anchor="w", padx=10)
+        self.loading_labels.append(loading)
+
         card = ctk.CTkFrame(container, fg_color=CREME_2, corner_radius=18)
         card.pack(fill="both", expand=True, padx=10, pady=10)
 
@@ -128,9 +156,15 @@ class App:
         styled_btn("Summary Report", self.open_summary).grid(row=1, column=0, padx=18, pady=18)
         styled_btn("Exit", self.root.destroy).grid(row=1, column=1, padx=18, pady=18)
 
+        lists = ctk.CTkFrame(card, fg_color="transparent")
+        lists.pack(fill="both", expand=True, padx=18, pady=(10, 18))
+        lists.grid_columnconfigure(0, weight=3)
+        lists.grid_columnconfigure(1, weight=2)
+        lists.grid_rowconfigure(0, weight=1)
+
         # Current Commissions section 
-        current_frame = ctk.CTkFrame(card, fg_color=CREME, corner_radius=16)
-        current_frame.pack(fill="both", expand=True, padx=18, pady=(10, 18))
+        current_frame = ctk.CTkFrame(lists, fg_color=CREME, corner_radius=16)
+        current_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 9))
 
         ctk.CTkLabel(
             current_frame,
@@ -150,27 +184,100 @@ class App:
         self.current_list.heading("title", text="Title")
         self.current_list.heading("status", text="Status")
 
-        self.current_list.column("deadline", width=140)
-        self.current_list.column("client", width=180)
-        self.current_list.column("title", width=380)
-        self.current_list.column("status", width=140)
+        self.current_list.column("deadline", width=100)
+        self.current_list.column("client", width=120)
+        self.current_list.column("title", width=200)
+        self.current_list.column("status", width=100)
 
         self.current_list.pack(fill="both", expand=True, padx=12, pady=(0, 12))
 
+        # Overdue / Due This Week section
+        due_frame = ctk.CTkFrame(lists, fg_color=CREME, corner_radius=16)
+        due_frame.grid(row=0, column=1, sticky="nsew", padx=(9, 0))
+
+        ctk.CTkLabel(
+            due_frame,
+            text="Overdue / Due This Week",
+            font=("Arial", 20, "bold"),
+            text_color=BROWN_DARK
+        ).pack(anchor="w", padx=12, pady=(12, 6))
+
+        self.due_list = ttk.Treeview(
+            due_frame,
+            columns=("due", "client", "title"),
+            show="headings",
+            height=8
+        )
+        self.due_list.heading("due", text="Due")
+        self.due_list.heading("client", text="Client")
+        self.due_list.heading("title", text="Title")
+
+        self.due_list.column("due", width=110)
+        self.due_list.column("client", width=110)
+        self.due_list.column("title", width=160)
+        self.due_list.tag_configure("overdue", foreground=OVERDUE_RED)
+
+        self.due_list.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+
         self.refresh_current_commissions()
 
     def refresh_current_commissions(self):
-        for row in self.current_list.get_children():
-            self.current_list.delete(row)
+        self.db.read(database.get_active_commissions, 10,
+                     callback=self.show_current_commissions, key="current")
+        self.db.read(self.fetch_due_soon, callback=self.show_due_soon, key="due_soon")
+
+    def show_current_commissions(self, active):
+        if not self.current_list.winfo_exists():
+            return
 
-        rows = database.get_commissions(status="All", sort_by="deadline")
+        items = []
+        for r in active:
+            deadline = r.deadline if r.deadline else ""
+            items.append((str(r.id), (deadline, r.client, r.title, r.status)))
+        self.sync_tree(self.current_list, items)
 
-        active = [r for r in rows if r[6] in ("Not Started", "In Progress")]
+    # Runs on a reader thread
+    @staticmethod
+    def fetch_due_soon():
+        return database.get_overdue(limit=DUE_PANEL_ROWS), database.get_due_within(7, limit=DUE_PANEL_ROWS)
 
-        for r in active[:10]:
-            # r = (id, client, title, type, price, deadline, status, notes)
-            deadline = r[5] if r[5] else ""
-            self.current_list.insert("", "end", values=(deadline, r[1], r[2], r[6]))
+    def show_due_soon(self, result):
+        if not self.due_list.winfo_exists():
+            return
+
+        overdue, due = result
+        today = datetime.date.today()
+        items = []
+        for r in overdue + due:
+            days = (datetime.date.fromisoformat(r.deadline) - today).days
+            if days < 0:
+                when = f"{-days} day{'s' if days < -1 else ''} late"
+            elif days == 0:
+                when = "Today"
+            else:
+                when = f"In {days} day{'s' if days > 1 else ''}"
+            items.append((str(r.id), (when, r.client, r.title)))
+        self.sync_tree(self.due_list, items)
+        late = {str(r.id) for r in overdue}
+        for iid, _ in items:
+            self.due_list.item(iid, tags=("overdue",) if iid in late else ())
+
+    # sync_tree makes tree show exactly `items` [(iid, values), ...] in order,
+    # touching only the rows that actually changed so selection and scroll stay put
+    def sync_tree(self, tree, items):
+        wanted = {iid for iid, _ in items}
+        stale = [iid for iid in tree.get_children() if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+
+        for index, (iid, values) in enumerate(items):
+            if tree.exists(iid):
+                if tuple(str(v) for v in tree.item(iid, "values")) != tuple(str(v) for v in values):
+                    tree.item(iid, values=values)
+                if tree.index(iid) != index:
+                    tree.move(iid, "", index)
+            else:
+                tree.insert("", index, iid=iid, values=values)
 
     # ADD / EDIT Commissions
     def open_add_form(self, edit_id=None):
@@ -192,7 +299,8 @@ class App:
                 entry = ctk.CTkTextbox(card, width=420, height=140, fg_color=CREME, text_color=TEXT_DARK)
             elif label_text == "Type":
                 var = ctk.StringVar(value=TYPE_OPTIONS[0])
-                entry = ctk.CTkComboBox(card, values=TYPE_OPTIONS, variable=var, state="readonly", width=420)
+                entry = ctk.CTkComboBox(card, values=TYPE_OPTIONS, variable=var, state="readonly", width=420,
+                                        command=lambda _: self.suggest_price())
             elif label_text == "Status":
                 var = ctk.StringVar(value=STATUS_OPTIONS[0])
                 entry = ctk.CTkComboBox(card, values=STATUS_OPTIONS, variable=var, state="readonly", width=420)
@@ -202,7 +310,7 @@ class App:
             entry.grid(row=i, column=1, padx=12, pady=10, sticky="w")
             self.entries[label_text] = entry
 
-        save_button = ctk.CTkButton(
+        self.save_button = save_button = ctk.CTkButton(
             card,
             text="Save",
             command=lambda: self.save_commission(edit_id),
@@ -219,16 +327,50 @@ class App:
         card.grid_columnconfigure(0, weight=0)
         card.grid_columnconfigure(1, weight=1)
 
+        self.suggested_price = None
+        self.quote_prices = edit_id is None
         if edit_id is not None:
             self.prefill_form(edit_id)
+        else:
+            # new commissions start with a quote for the chosen type and deadline
+            self.entries["Deadline (YYYY-MM-DD)"].bind("<FocusOut>", lambda _: self.suggest_price())
+            self.db.read(pricing.get_rate_table, callback=self.set_rate_table, key="rates")
+
+    def set_rate_table(self, rates):
+        self.rate_table = rates
+        self.suggest_price()
+
+    # suggest_price fills Price with a quote, unless the user has typed their own
+    def suggest_price(self):
+        if not self.quote_prices or self.rate_table is None or not self.form.winfo_exists():
+            return
+        price_entry = self.entries["Price ($)"]
+        current = price_entry.get().strip()
+        if current and current != self.suggested_price:
+            return
+        deadline = self.entries["Deadline (YYYY-MM-DD)"].get().strip() or None
+        try:
+            price = self.rate_table.quote(self.entries["Type"].get(), deadline=deadline)
+        except ValueError:
+            # not a valid deadline (yet); quote without a rush
+            price = self.rate_table.quote(self.entries["Type"].get())
+        self.suggested_price = f"{price:.2f}"
+        price_entry.delete(0, tk.END)
+        price_entry.insert(0, self.suggested_price)
 
     def prefill_form(self, comm_id):
-        row = database.get_commission_by_id(comm_id)
+        self.db.read(database.get_commission_by_id, comm_id, callback=self.fill_form, key="prefill")
+
+    def fill_form(self, row):
+        if not self.form.winfo_exists():
+            return
         if not row:
             messagebox.showerror("Error", "Record not found.")
             return
 
-        _, client, title, type_, price, deadline, status, notes = row
+        # the lists leave notes out, so the form always loads the full record
+        client, title, type_, price = row.client, row.title, row.type, row.price
+        deadline, status, notes = row.deadline, row.status, row.notes
 
         self.entries["Client Name"].delete(0, tk.END)
         self.entries["Client Name"].insert(0, client)
@@ -257,49 +399,45 @@ class App:
 
     def save_commission(self, edit_id=None):
         try:
-            client = self.entries["Client Name"].get().strip()
-            title = self.entries["Title"].get().strip()
-            type_ = self.entries["Type"].get().strip()
-            price_text = self.entries["Price ($)"].get().strip()
-            price = float(price_text) if price_text else 0.0
-            deadline = self.entries["Deadline (YYYY-MM-DD)"].get().strip()
-            status = self.entries["Status"].get().strip()
-            notes = self.entries["Notes"].get("1.0", tk.END).strip()
-
-            if not client or not title:
-                messagebox.showerror("Validation Error", "Client and Title are required fields.")
+            try:
+                client, title, type_, price, deadline, status, notes = database.validate_commission(
+                    self.entries["Client Name"].get(),
+                    self.entries["Title"].get(),
+                    self.entries["Type"].get(),
+                    self.entries["Price ($)"].get(),
+                    self.entries["Deadline (YYYY-MM-DD)"].get(),
+                    self.entries["Status"].get(),
+                    self.entries["Notes"].get("1.0", tk.END),
+                )
+            except ValueError as e:
+                messagebox.showerror("Validation Error", str(e))
                 return
 
-            if deadline:
-                try:
-                    datetime.datetime.strptime(deadline, "%Y-%m-%d")
-                except ValueError:
-                    messagebox.showerror("Validation Error", "Deadline must be in YYYY-MM-DD format.")
-                    return
-
+            # the write runs on the writer thread; keep the form until it lands
+            self.save_button.configure(state="disabled")
             if edit_id is None:
-                database.add_commission(client, title, type_, price, deadline, status, notes)
-                messagebox.showinfo("Saved", "Commission added successfully.")
+                self.db.write(database.add_commission, client, title, type_, price, deadline, status, notes,
+                              callback=lambda _: self.on_saved("Saved", "Commission added successfully."),
+                              errback=self.on_save_failed)
             else:
-                database.update_commission(edit_id, client, title, type_, price, deadline, status, notes)
-                messagebox.showinfo("Updated", "Commission updated successfully.")
+                self.db.write(database.update_commission, edit_id, client, title, type_, price, deadline, status, notes,
+                              callback=lambda _: self.on_saved("Updated", "Commission updated successfully."),
+                              errback=self.on_save_failed)
 
-            self.form.destroy()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save commission: {e}")
 
-            # refresh lists if open
-            try:
-                self.refresh_table()
-            except Exception:
-                pass
+    def on_saved(self, title, message):
+        messagebox.showinfo(title, message)
+        self.form.destroy()
 
-            # refresh main menu current list (if visible)
-            try:
-                self.refresh_current_commissions()
-            except Exception:
-                pass
+        # patch the open lists with just this change
+        self.refresh_views()
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save commission: {e}")
+    def on_save_failed(self, e):
+        if self.form.winfo_exists():
+            self.save_button.configure(state="normal")
+        messagebox.showerror("Error", f"Failed to save commission: {e}")
 
     # VIEW PAGE
     def open_view_page(self):
@@ -336,19 +474,88 @@ class App:
         self.themed_button(top_frame, "Edit Selected", self.edit_selected, width=150).pack(side="left", padx=8)
         self.themed_button(top_frame, "Delete Selected", self.delete_selected, width=150).pack(side="left", padx=8)
 
+        loading = ctk.CTkLabel(top_frame, text="", text_color=ACCENT, font=("Arial", 13))
+        loading.pack(side="left", padx=8)
+        self.loading_labels.append(loading)
+
+        search_frame = ctk.CTkFrame(self.view_win, fg_color="transparent")
+        search_frame.pack(fill="x", padx=12)
+
+        ctk.CTkLabel(search_frame, text="Search:", text_color=BROWN_DARK, font=("Arial", 15, "bold")).pack(side="left")
+
+        self.search_var = ctk.StringVar(value="")
+        self.search_after = None
+        search_entry = ctk.CTkEntry(
+            search_frame, textvariable=self.search_var, width=420, fg_color=CREME, text_color=TEXT_DARK,
+            placeholder_text="client, title or notes"
+        )
+        search_entry.pack(side="left", padx=8)
+        search_entry.bind("<KeyRelease>", self.on_search_typed)
+
+        self.count_label = ctk.CTkLabel(search_frame, text="", text_color=BROWN, font=("Arial", 13))
+        self.count_label.pack(side="left", padx=14)
+
+        table_frame = ctk.CTkFrame(self.view_win, fg_color="transparent")
+        table_frame.pack(fill="both", expand=True, padx=12, pady=12)
+
         cols = ("id", "client", "title", "type", "price", "deadline", "status")
-        self.tree = ttk.Treeview(self.view_win, columns=cols, show="headings")
+        self.tree = ttk.Treeview(table_frame, columns=cols, show="headings", selectmode="extended")
 
         for c in cols:
             self.tree.heading(c, text=c.title())
             self.tree.column(c, minwidth=60, width=160)
 
-        self.tree.pack(fill="both", expand=True, padx=12, pady=12)
+        self.tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
+        self.tree_scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
         self.refresh_table()
 
+    # Rows are loaded a page at a time as the user scrolls towards the bottom
+    def on_tree_scroll(self, first, last):
+        self.tree_scroll.set(first, last)
+        if float(last) > 0.9:
+            self.load_next_page()
+
+    def load_next_page(self):
+        if self.page_key is None or self.page_loading:
+            return
+        self.page_loading = True
+        self.db.read(database.get_commissions_page, self.page_status, self.page_sort_by,
+                     self.page_key, database.PAGE_SIZE, callback=self.on_next_page, key="table")
+
+    def on_next_page(self, result):
+        if not self.view_is_open():
+            return
+        rows, self.page_key = result
+        self.page_loading = False
+        self.insert_rows(rows)
+
+    def table_values(self, r):
+        price_display = f"${r.price:.2f}" if r.price is not None else ""
+        return (r.id, r.client, r.title, r.type, price_display, r.deadline or "", r.status)
+
+    def insert_rows(self, rows):
+        for r in rows:
+            iid = str(r.id)
+            self.tree.insert("", "end", iid=iid, values=self.table_values(r))
+            key = database.sort_key(r, self.page_status, self.page_sort_by)
+            self.row_keys[iid] = key
+            insort(self.row_order, key)
+        if rows:
+            self.last_loaded_key = self.row_keys[str(rows[-1].id)]
+        self.update_count_label()
+
+    def update_count_label(self):
+        self.count_label.configure(text=f"Showing {len(self.row_keys)} of {self.page_total} commissions")
+
     def refresh_table(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+        if self.search_var.get().strip():
+            self.run_search()
+            return
+
+        self.tree.delete(*self.tree.get_children())
 
         status = self.status_var.get() if hasattr(self, "status_var") else "All"
 
@@ -365,11 +572,153 @@ class App:
         }
         sort_by = sort_map.get(sort_display, "deadline")
 
-        rows = database.get_commissions(status=status, sort_by=sort_by)
+        self.page_status = status
+        self.page_sort_by = sort_by
+        # row_keys maps each shown row to its sort key; row_order holds the
+        # same keys sorted, i.e. in the order the rows sit in the tree
+        self.row_keys = {}
+        self.row_order = []
+        self.last_loaded_key = None
+        self.page_key = None
+        self.page_loading = False
+        self.table_rev = None
+        self.changes_missed = False
+        self.count_label.configure(text="")
+
+        # a newer filter/sort supersedes any page still loading for the old one
+        self.db.read(self.fetch_first_page, status, sort_by, callback=self.on_first_page, key="table")
+
+    # fetch_first_page runs on a reader thread
+    @staticmethod
+    def fetch_first_page(status, sort_by):
+        # take the revision before reading so nothing written meanwhile is missed
+        rev = database.get_revision()
+        total = database.count_commissions(status)
+        rows, key = database.get_commissions_page(status, sort_by, None, database.PAGE_SIZE)
+        return rev, total, rows, key
+
+    def on_first_page(self, result):
+        if not self.view_is_open():
+            return
+        self.table_rev, self.page_total, rows, self.page_key = result
+        self.insert_rows(rows)
+        if self.changes_missed:
+            self.apply_table_changes()
+
+    # SEARCH
+    def on_search_typed(self, event=None):
+        if self.search_after is not None:
+            self.view_win.after_cancel(self.search_after)
+        self.search_after = self.view_win.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self.search_after = None
+        query = self.search_var.get().strip()
+        if not query:
+            self.refresh_table()
+            return
 
-        for r in rows:
-            price_display = f"${r[4]:.2f}" if r[4] is not None else ""
-            self.tree.insert("", "end", values=(r[0], r[1], r[2], r[3], price_display, r[5], r[6]))
+        status = self.status_var.get()
+        # shares the "table" key so a newer search or filter drops stale results
+        self.db.read(database.search_commissions, query, status, SEARCH_LIMIT,
+                     callback=lambda rows: self.show_search_results(status, rows), key="table")
+
+    def show_search_results(self, status, rows):
+        if not self.view_is_open():
+            return
+        self.tree.delete(*self.tree.get_children())
+        self.page_status = status
+        self.row_keys = {}
+        self.row_order = []
+        self.page_key = None
+        self.page_loading = False
+        self.table_rev = None
+        self.changes_missed = False
+        self.page_total = len(rows)
+        self.insert_rows(rows)
+        self.count_label.configure(text=f"{len(rows)} matches")
+
+    def view_is_open(self):
+        return hasattr(self, "view_win") and self.view_win.winfo_exists()
+
+    # refresh_views patches the open lists with whatever was written since they
+    # were last loaded, instead of reloading them
+    def refresh_views(self):
+        if self.view_is_open():
+            if self.search_var.get().strip():
+                self.run_search()
+            else:
+                self.apply_table_changes()
+        try:
+            self.refresh_current_commissions()
+        except Exception:
+            pass
+
+    def apply_table_changes(self):
+        if self.table_rev is None:
+            # first page still loading; apply once it is in
+            self.changes_missed = True
+            return
+        self.changes_missed = False
+        since = self.table_rev
+        self.db.read(self.fetch_changes, since, self.page_status,
+                     callback=lambda result: self.on_table_changes(since, result), key="changes")
+
+    # fetch_changes runs on a reader thread
+    @staticmethod
+    def fetch_changes(since, status):
+        return database.get_changes_since(since), database.count_commissions(status)
+
+    def on_table_changes(self, since, result):
+        if not self.view_is_open() or self.table_rev != since:
+            return  # table was reloaded in the meantime
+        changes, self.page_total = result
+        if changes is None:
+            # change log was pruned past our revision
+            self.refresh_table()
+            return
+
+        self.table_rev, changed, deleted = changes
+        for cid in deleted:
+            self.remove_row(str(cid))
+        for r in changed:
+            self.place_row(r)
+
+        self.update_count_label()
+
+    def remove_row(self, iid):
+        if iid in self.row_keys:
+            self.forget_key(iid)
+            self.tree.delete(iid)
+
+    def forget_key(self, iid):
+        key = self.row_keys.pop(iid)
+        del self.row_order[bisect_left(self.row_order, key)]
+
+    def place_row(self, r):
+        iid = str(r.id)
+        key = database.sort_key(r, self.page_status, self.page_sort_by)
+        matches = self.page_status in (None, "All") or r.status == self.page_status
+        # rows past the last loaded one will arrive with a later page
+        not_loaded_yet = self.page_key is not None and self.last_loaded_key is not None and key > self.last_loaded_key
+
+        if not matches or not_loaded_yet:
+            self.remove_row(iid)
+            return
+
+        if iid in self.row_keys:
+            self.tree.detach(iid)
+            self.forget_key(iid)
+            self.tree.item(iid, values=self.table_values(r))
+        else:
+            self.tree.insert("", "end", iid=iid, values=self.table_values(r))
+            self.tree.detach(iid)
+
+        # row_order mirrors the tree, so the new position is a bisect, not a walk over every row
+        index = bisect_left(self.row_order, key)
+        self.tree.move(iid, "", index)
+        self.row_order.insert(index, key)
+        self.row_keys[iid] = key
 
     # Row Actions
     def get_selected_id(self):
@@ -380,28 +729,27 @@ class App:
         item = self.tree.item(sel[0])
         return item["values"][0]
 
+    def get_selected_ids(self):
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showwarning("No selection", "Please select at least one commission first.")
+            return []
+        return [self.tree.item(iid)["values"][0] for iid in sel]
+
     def delete_selected(self):
-        cid = self.get_selected_id()
-        if not cid:
+        ids = self.get_selected_ids()
+        if not ids:
             return
-        if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this commission?"):
-            database.delete_commission(cid)
-            self.refresh_table()
-            try:
-                self.refresh_current_commissions()
-            except Exception:
-                pass
+        prompt = ("Are you sure you want to delete this commission?" if len(ids) == 1
+                  else f"Are you sure you want to delete these {len(ids)} commissions?")
+        if messagebox.askyesno("Confirm Delete", prompt):
+            self.db.write(database.delete_commissions, ids, callback=lambda _: self.refresh_views())
 
     def mark_selected_complete(self):
-        cid = self.get_selected_id()
-        if not cid:
+        ids = self.get_selected_ids()
+        if not ids:
             return
-        database.mark_complete(cid)
-        self.refresh_table()
-        try:
-            self.refresh_current_commissions()
-        except Exception:
-            pass
+        self.db.write(database.mark_complete_many, ids, callback=lambda _: self.refresh_views())
 
     def edit_selected(self):
         cid = self.get_selected_id()
@@ -409,14 +757,127 @@ class App:
             return
         self.open_add_form(edit_id=cid)
 
+    # DIAGNOSTICS (Ctrl+Shift+D)
+    def open_diagnostics(self):
+        if getattr(self, "diag_win", None) is not None and self.diag_win.winfo_exists():
+            self.diag_win.lift()
+            return
+
+        self.diag_win = ctk.CTkToplevel(self.root)
+        self.diag_win.title("Database Diagnostics")
+        self.setup_popup(self.diag_win, 1100, 680)
+
+        top_frame = ctk.CTkFrame(self.diag_win, fg_color="transparent")
+        top_frame.pack(fill="x", padx=12, pady=10)
+
+        self.diag_enabled = ctk.BooleanVar(value=database.instrumentation_enabled())
+        ctk.CTkSwitch(
+            top_frame, text="Instrumentation", variable=self.diag_enabled,
+            command=self.toggle_instrumentation, text_color=BROWN_DARK, progress_color=BROWN
+        ).pack(side="left", padx=8)
+
+        ctk.CTkLabel(top_frame, text="Slow query (ms):", text_color=BROWN_DARK, font=("Arial", 14, "bold")).pack(side="left", padx=(12, 0))
+        self.diag_threshold = ctk.CTkEntry(top_frame, width=80, fg_color=CREME, text_color=TEXT_DARK)
+        self.diag_threshold.insert(0, "100")
+        self.diag_threshold.pack(side="left", padx=8)
+
+        self.themed_button(top_frame, "Reset", self.reset_instrumentation, width=100).pack(side="left", padx=8)
+        self.themed_button(top_frame, "Export JSON", lambda: self.export_metrics("json"), width=140).pack(side="left", padx=8)
+        self.themed_button(top_frame, "Export Prometheus", lambda: self.export_metrics("prometheus"), width=180).pack(side="left", padx=8)
+
+        cols = ("function", "calls", "p50_ms", "p95_ms", "p99_ms", "max_ms", "rows", "statements", "errors")
+        self.diag_tree = ttk.Treeview(self.diag_win, columns=cols, show="headings", height=12)
+        for c in cols:
+            self.diag_tree.heading(c, text=c)
+            self.diag_tree.column(c, width=260 if c == "function" else 95, anchor="w" if c == "function" else "e")
+        self.diag_tree.pack(fill="both", expand=True, padx=12, pady=(0, 8))
+
+        ctk.CTkLabel(self.diag_win, text="Slow calls", text_color=BROWN_DARK, font=("Arial", 15, "bold")).pack(anchor="w", padx=14)
+        self.diag_slow = ctk.CTkTextbox(self.diag_win, height=200, fg_color=CREME, text_color=TEXT_DARK, font=("Courier", 12))
+        self.diag_slow.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+
+        self.refresh_diagnostics()
+
+    def slow_threshold_ms(self):
+        try:
+            return float(self.diag_threshold.get().strip())
+        except ValueError:
+            return 100.0
+
+    def toggle_instrumentation(self):
+        if self.diag_enabled.get():
+            database.enable_instrumentation(slow_query_ms=self.slow_threshold_ms())
+        else:
+            database.disable_instrumentation()
+        self.refresh_diagnostics(reschedule=False)
+
+    def reset_instrumentation(self):
+        if database.instrumentation_enabled():
+            database.enable_instrumentation(slow_query_ms=self.slow_threshold_ms())
+        self.refresh_diagnostics(reschedule=False)
+
+    def export_metrics(self, fmt):
+        if not database.instrumentation_enabled():
+            messagebox.showwarning("Diagnostics", "Turn instrumentation on first.")
+            return
+        ext = ".prom" if fmt == "prometheus" else ".json"
+        path = filedialog.asksaveasfilename(parent=self.diag_win, defaultextension=ext,
+                                            initialfile=f"commission_metrics{ext}")
+        if path:
+            database.export_metrics(path, fmt)
+
+    # metrics live in memory, so this reads them on the Tk thread once a second
+    def refresh_diagnostics(self, reschedule=True):
+        if not self.diag_win.winfo_exists():
+            return
+
+        snap = database.get_metrics()
+        functions = snap["functions"] if snap else {}
+        items = []
+        for name, f in functions.items():
+            items.append((name, (name, f["calls"], f"{f['p50_ms']:.3f}", f"{f['p95_ms']:.3f}",
+                                 f"{f['p99_ms']:.3f}", f"{f['max_ms']:.3f}", f["rows"], f["statements"], f["errors"])))
+        self.sync_tree(self.diag_tree, items)
+
+        lines = []
+        for entry in reversed(snap["slow_queries"] if snap else []):
+            lines.append(f"{entry['at']}  {entry['function']}  {entry['ms']:.1f} ms")
+            for stmt in entry["statements"]:
+                lines.append(f"    {stmt['sql']}")
+                lines.extend(f"        {line}" for line in stmt["plan"])
+        text = "\n".join(lines) if lines else ("No slow calls yet." if snap else "Instrumentation is off.")
+        if self.diag_slow.get("1.0", tk.END).strip() != text.strip():
+            self.diag_slow.delete("1.0", tk.END)
+            self.diag_slow.insert("1.0", text)
+
+        if reschedule:
+            self.diag_win.after(1000, self.refresh_diagnostics)
+
     # SUMMARY 
     def open_summary(self):
-        total, completed, in_progress, not_started, income = database.get_summary()
-        income_by_type = database.get_income_by_type()
+        self.db.read(self.fetch_summary, callback=self.show_summary, key="summary")
+
+    # Runs on a reader thread
+    @staticmethod
+    def fetch_summary():
+        # archived commissions are history too; their totals come precomputed
+        dashboard_stats = database.get_dashboard_stats(include_archived=True)
+        try:
+            # numpy is only loaded once the dashboard is first opened
+            import analytics
+        except ImportError:
+            # numpy is optional; without it the dashboard shows the plain counts
+            return dashboard_stats, None, None
+        report = analytics.get_engine().report()
+        return dashboard_stats, report, charts.dashboard_data(dashboard_stats, report)
+
+    def show_summary(self, result):
+        dashboard_stats, report, chart_data = result
+        (total, completed, in_progress, not_started, income), income_by_type = dashboard_stats
 
         summary_win = ctk.CTkToplevel(self.root)
         summary_win.title("Summary Dashboard")
-        self.setup_popup(summary_win, 650, 720)
+        self.setup_popup(summary_win, 900, 860)
 
         card = ctk.CTkFrame(summary_win, fg_color=CREME_2, corner_radius=18)
         card.pack(fill="both", expand=True, padx=20, pady=20)
@@ -437,28 +898,82 @@ class App:
         stat_line(f"Completed: {completed}")
         stat_line(f"Total Income (Completed): ${income:.2f}", bold=True)
 
-        chart_holder = ctk.CTkFrame(card, fg_color=CREME, corner_radius=14)
+        if report is not None:
+            percentiles = report["price_percentiles"]
+            if percentiles:
+                stat_line(f"Typical Price: ${percentiles[50]:.2f} "
+                          f"(middle half ${percentiles[25]:.2f} - ${percentiles[75]:.2f})")
+            if report["average_turnaround"] is not None:
+                stat_line(f"Average Turnaround: {report['average_turnaround']:.1f} days")
+            overdue, open_with_deadline, overdue_rate = report["overdue"]
+            stat_line(f"Overdue: {overdue} of {open_with_deadline} open ({overdue_rate:.0%})")
+
+        chart_holder = ctk.CTkScrollableFrame(card, fg_color=CREME, corner_radius=14)
         chart_holder.pack(fill="both", expand=True, padx=15, pady=10)
 
-        if not income_by_type:
-            ctk.CTkLabel(chart_holder, text="No completed commissions to chart yet.",
+        if chart_data is None:
+            ctk.CTkLabel(chart_holder, text="Install numpy for statistics and charts.",
                          text_color=BROWN, font=("Arial", 14)).pack(pady=25)
             return
 
-        labels = [row[0] for row in income_by_type]
-        values = [row[1] for row in income_by_type]
+        # charts are drawn on the worker thread (or come straight from the
+        # chart cache) and dropped in once ready; each chart with nothing to
+        # show comes back as None
+        placeholder = ctk.CTkLabel(chart_holder, text="Drawing charts...", text_color=BROWN, font=("Arial", 14))
+        placeholder.pack(pady=25)
+        self.db.compute(charts.render_dashboard, chart_data,
+                        callback=lambda images: self.show_charts(chart_holder, images),
+                        errback=lambda e: self.show_chart_error(chart_holder, e), key="charts")
+
+    def show_chart_message(self, chart_holder, text):
+        for widget in chart_holder.winfo_children():
+            widget.destroy()
+        ctk.CTkLabel(chart_holder, text=text, text_color=BROWN, font=("Arial", 14)).pack(pady=25)
 
-        fig = Figure(figsize=(5.2, 4.6), dpi=100)
-        ax = fig.add_subplot(111)
-        ax.pie(values, labels=labels, autopct="%1.1f%%", startangle=90)
-        ax.set_title("Income by Commission Type")
+    def show_chart_error(self, chart_holder, error):
+        if not chart_holder.winfo_exists():
+            return
+        if isinstance(error, ImportError):
+            self.show_chart_message(chart_holder, "Install matplotlib for charts.")
+            return
+        self.show_chart_message(chart_holder, "Charts could not be drawn.")
+        self.root.report_callback_exception(type(error), error, error.__traceback__)
 
-        canvas = FigureCanvasTkAgg(fig, master=chart_holder)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+    def show_charts(self, chart_holder, images):
+        if not chart_holder.winfo_exists():
+            return
+        if all(png is None for png in images.values()):
+            self.show_chart_message(chart_holder, "No commissions to chart yet.")
+            return
+        for widget in chart_holder.winfo_children():
+            widget.destroy()
 
+        # PhotoImages vanish once nothing references them, so the holder keeps them
+        chart_holder.chart_images = []
+        wide = [name for name in images if charts.CHARTS[name][1][0] > 5]
+        position = 0
+        for name, png in images.items():
+            if png is None:
+                continue
+            image = tk.PhotoImage(master=chart_holder, data=charts.png_to_base64(png))
+            chart_holder.chart_images.append(image)
+            label = tk.Label(chart_holder, image=image, bd=0, bg=CREME)
+            if name in wide:
+                # wide charts take a row of their own
+                position += position % 2
+                label.grid(row=position // 2, column=0, columnspan=2, padx=5, pady=5)
+                position += 2
+            else:
+                label.grid(row=position // 2, column=position % 2, padx=5, pady=5)
+                position += 1
 
 if __name__ == "__main__":
+    database.initialize_database()
+    # rotating snapshots in backups/ while the app is open
+    backups = backup.BackupScheduler(backup.BACKUP_INTERVAL_S)
     root = ctk.CTk()
     app = App(root)
     root.mainloop()
+    # let any queued writes finish before exiting
+    app.db.shutdown(wait=True)
+    backups.stop()
@@ -0,0 +1,170 @@
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import database
+
+# Group commit for concurrent writers.
+#
+# Writes submitted from any number of threads are queued and applied by one
+# flusher thread in batches. Every write in a batch shares one transaction, so
+# one write lock and one WAL sync serve them all instead of one per call.
+# By default a batch is whatever is queued when the flusher gets to it (writes
+# that arrive during a commit form the next batch), capped at max_batch. With
+# max_delay_ms > 0 the flusher also waits up to that long after a batch's first
+# write for more to arrive, which suits callers that don't wait on each result.
+#
+#   writes = GroupCommitQueue()
+#   future = writes.submit(database.update_commission, 12, "Ana", "Fox OC", "Chibi", 30.0, "", "In Progress", "")
+#   future.result()          # returns once the batch holding it has committed
+#
+# Each write runs inside its own SAVEPOINT, so one that raises fails only its
+# own future and the rest of the batch still commits. If another connection
+# holds the write lock ("database is locked"), the whole batch is retried with
+# exponential backoff and jitter, up to max_retries times.
+#
+# The flusher's connection uses synchronous=FULL by default, so a resolved
+# future means the write is on disk, not just in the WAL.
+
+MAX_BATCH = 256
+MAX_DELAY_MS = 0.0
+MAX_RETRIES = 8
+BACKOFF_BASE_S = 0.002
+BACKOFF_MAX_S = 0.25
+
+_STOP = object()
+
+
+def _is_locked(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class GroupCommitQueue:
+    def __init__(self, max_batch=MAX_BATCH, max_delay_ms=MAX_DELAY_MS, max_retries=MAX_RETRIES,
+                 synchronous="FULL"):
+        self.max_batch = max_batch
+        self.max_delay_s = max_delay_ms / 1000.0
+        self.max_retries = max_retries
+        self.synchronous = synchronous
+        self.stats = {"writes": 0, "batches": 0, "retries": 0, "failed": 0}
+        self._queue = queue.Queue()
+        self._conn = None
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    # submit queues fn(*args, **kwargs) (normally a database.py write function)
+    # and returns a Future with its return value, or its exception
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitQueue has been closed")
+            self._queue.put((future, fn, args, kwargs))
+        return future
+
+    # flush blocks until everything submitted so far has been committed
+    def flush(self):
+        self.submit(lambda: None).result()
+
+    # close commits whatever is still queued and stops the flusher thread
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay_s
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit_batch([entry for entry in batch if entry[0].set_running_or_notify_cancel()])
+
+    def _commit_batch(self, batch):
+        if not batch:
+            return
+        for attempt in range(self.max_retries + 1):
+            try:
+                results = self._apply(batch)
+            except sqlite3.OperationalError as e:
+                if not _is_locked(e) or attempt == self.max_retries:
+                    self._fail(batch, e)
+                    return
+                self.stats["retries"] += 1
+                delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                continue
+            except BaseException as e:
+                self._fail(batch, e)
+                return
+
+            self.stats["writes"] += len(batch)
+            self.stats["batches"] += 1
+            for (future, _, _, _), (ok, value) in zip(batch, results):
+                if ok:
+                    future.set_result(value)
+                else:
+                    self.stats["failed"] += 1
+                    future.set_exception(value)
+            return
+
+    # _apply runs the whole batch in one transaction and returns [(ok, result
+    # or exception), ...]. Lock errors propagate so the batch can be retried.
+    def _apply(self, batch):
+        conn = database.get_connection()
+        if conn is not self._conn:
+            # a new connection (first batch, or DB_NAME changed)
+            if self.synchronous:
+                conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+            self._conn = conn
+        # take the write lock up front; a deferred BEGIN could fail halfway through
+        conn.execute("BEGIN IMMEDIATE")
+        results = []
+        try:
+            with database.transaction():
+                for future, fn, args, kwargs in batch:
+                    conn.execute("SAVEPOINT group_write")
+                    try:
+                        value = fn(*args, **kwargs)
+                    except sqlite3.OperationalError as e:
+                        if _is_locked(e):
+                            raise
+                        conn.execute("ROLLBACK TO group_write")
+                        results.append((False, e))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO group_write")
+                        results.append((False, e))
+                    else:
+                        results.append((True, value))
+                    conn.execute("RELEASE group_write")
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        return results
+
+    def _fail(self, batch, error):
+        self.stats["failed"] += len(batch)
+        for future, _, _, _ in batch:
+            future.set_exception(error)